@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Response payload size and spec/encode latency with and without chart data reduction"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.agents.visualization_agent import create_vega_lite_spec
+from src.api.routes import encode_body
+
+# (label, mark, x field, y field) over every paper in the year range
+CHARTS = [
+    ("citations per year (bar)", "bar", "year", "citation_count"),
+    ("citations per year (line)", "line", "year", "citation_count"),
+    ("citations by paper id (bar)", "bar", "paper_id", "citation_count"),
+    ("citations by paper id (line)", "line", "paper_id", "citation_count"),
+    ("citations by title (bar)", "bar", "title", "citation_count"),
+    ("year vs citations (point)", "point", "year", "citation_count"),
+]
+
+def no_reduction(data, viz_type, x_field, y_field, max_points=None):
+    return data, {"input_rows": len(data), "output_rows": len(data), "steps": []}
+
+def build_and_encode(data, mark, x_field, y_field, repeat):
+    best, payload = float("inf"), b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spec = create_vega_lite_spec(data, {"viz_type": mark, "x_field": x_field, "y_field": y_field}, "bench")
+        payload = encode_body({"query": "bench", "vega_spec": spec, "data_count": len(data)})
+        best = min(best, time.perf_counter() - start)
+    return best, len(payload)
+
+async def main(papers: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        database.DATABASE_PATH = path
+        data = await database.get_papers_by_year_range(1900, 2100, columnar=True)
+
+    print(f"{len(data):,} rows (best of {repeat})\n")
+    print(f"{'chart':<30} {'full KB':>10} {'reduced KB':>11} {'full ms':>9} {'reduced ms':>11} {'speedup':>8}")
+    for label, mark, x_field, y_field in CHARTS:
+        with patch("src.agents.visualization_agent.reduce_for_chart", no_reduction):
+            full_time, full_size = build_and_encode(data, mark, x_field, y_field, repeat)
+        reduced_time, reduced_size = build_and_encode(data, mark, x_field, y_field, repeat)
+        print(
+            f"{label:<30} {full_size / 1024:10.0f} {reduced_size / 1024:11.1f} "
+            f"{full_time * 1000:9.1f} {reduced_time * 1000:11.1f} {full_time / reduced_time:7.0f}x"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.repeat))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Dict-per-row vs columnar results: fetch, profile, chart and encode latency plus memory"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.profiling import profile_columns
+from src.agents.visualization_agent import create_vega_lite_spec, infer_encoding
+from src.api.routes import encode_body
+
+QUERY = database.QUERIES["year_range"]
+PARAMS = (1900, 2100)
+
+async def fetch_dicts():
+    """The previous execute_query: one aiosqlite.Row, then one dict, per record"""
+    async with aiosqlite.connect(database.DATABASE_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(QUERY, PARAMS) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+async def fetch_columnar():
+    return await database.execute_query_columnar(QUERY, PARAMS)
+
+def downstream(data):
+    """What the agents and the API do with a result set"""
+    profile = profile_columns(data)
+    spec = create_vega_lite_spec(data, infer_encoding(data), "bench")
+    body = {"query": "bench", "query_type": "year_range", "analysis": {"profile": profile}, "vega_spec": spec, "data_count": len(data)}
+    return encode_body(body)
+
+async def time_variant(fetch, repeat: int):
+    best = {"fetch": float("inf"), "profile+chart+encode": float("inf")}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = await fetch()
+        fetched = time.perf_counter()
+        downstream(data)
+        done = time.perf_counter()
+        best["fetch"] = min(best["fetch"], fetched - start)
+        best["profile+chart+encode"] = min(best["profile+chart+encode"], done - fetched)
+    return best
+
+async def measure_memory(fetch):
+    """Bytes retained by the result while it sits in the workflow state, and peak through encoding"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    data = await fetch()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.reset_peak()
+    downstream(data)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return retained, peak
+
+async def main(papers: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        database.DATABASE_PATH = path
+
+        variants = [("dict rows", fetch_dicts), ("columnar", fetch_columnar)]
+        results = {}
+        for name, fetch in variants:
+            timings = await time_variant(fetch, repeat)
+            retained, peak = await measure_memory(fetch)
+            results[name] = (timings, retained, peak)
+
+    print(f"{papers:,} rows (best of {repeat})\n")
+    print(f"{'variant':<10} {'fetch ms':>10} {'downstream ms':>14} {'total ms':>10} {'retained MB':>12} {'peak MB':>9}")
+    for name, (timings, retained, peak) in results.items():
+        total = timings["fetch"] + timings["profile+chart+encode"]
+        print(
+            f"{name:<10} {timings['fetch'] * 1000:10.1f} {timings['profile+chart+encode'] * 1000:14.1f} "
+            f"{total * 1000:10.1f} {retained / 2**20:12.1f} {peak / 2**20:9.1f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.repeat))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Per-query latency before and after creating the recommended indexes"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_db import generate
+from src.utils.database import QUERIES
+from src.utils.index_advisor import SAMPLE_PARAMS, create_indexes
+
+def time_queries(conn: sqlite3.Connection, repeat: int):
+    timings = {}
+    for name, query in QUERIES.items():
+        params = SAMPLE_PARAMS.get(name, ())
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(query, params).fetchall()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+def main(papers: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        conn = sqlite3.connect(path)
+        before = time_queries(conn, repeat)
+        for name, seconds in create_indexes(conn):
+            print(f"created {name:<30} {seconds:6.2f}s")
+        after = time_queries(conn, repeat)
+        conn.close()
+    
+    print(f"\n{'query':<16} {'before ms':>10} {'after ms':>10} {'speedup':>9}")
+    for name in QUERIES:
+        print(f"{name:<16} {before[name] * 1000:10.2f} {after[name] * 1000:10.2f} {before[name] / after[name]:8.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.papers, args.repeat)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Per-call ChatAnthropic construction vs the shared pooled provider, against a local stub API"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import HumanMessage
+from benchmarks.stub_anthropic import run_stub_server
+from src.utils.llm import LLMClientProvider
+
+MESSAGES = [HumanMessage(content="Classify into one of these categories: papers_by_year")]
+
+async def per_call(base_url: str, calls: int):
+    for _ in range(calls):
+        llm = ChatAnthropic(model="claude-sonnet-4-5", temperature=0, base_url=base_url)
+        await llm.ainvoke(MESSAGES)
+
+async def shared(provider: LLMClientProvider, calls: int):
+    for _ in range(calls):
+        await provider.get(0).ainvoke(MESSAGES)
+
+async def measure(label, app, fn):
+    app.state.requests = 0
+    app.state.connections = set()
+    start = time.perf_counter()
+    await fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed / app.state.requests * 1000:10.2f} {len(app.state.connections):12}")
+
+async def main(calls: int, latency: float):
+    with run_stub_server(latency=latency) as (base_url, app):
+        provider = LLMClientProvider(base_url=base_url)
+        print(f"{calls} sequential calls, stub latency {latency * 1000:.0f} ms")
+        print(f"{'client':<22} {'ms/call':>10} {'connections':>12}")
+        await measure("new ChatAnthropic", app, lambda: per_call(base_url, calls))
+        await measure("shared provider", app, lambda: shared(provider, calls))
+        stats = provider.stats()
+        print(f"provider: {stats['connections_opened']} opened, {stats['connections_reused']} reused, "
+              f"avg {stats['avg_latency_ms']} ms")
+        await provider.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.latency))
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Concurrent load against the full API served with a stub LLM and a synthetic database.
+
+Starts the FastAPI app in a uvicorn subprocess pointed at a generated
+SciSciNet-shaped database and at `stub_anthropic`, then drives each
+scenario closed-loop at every concurrency level. Reports throughput,
+latency percentiles and the server's resident memory per scenario, and
+writes the same figures as JSON with `--output` for regression tracking.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_anthropic import free_port, run_stub_server
+from benchmarks.synthetic_db import generate
+from src.utils.index_advisor import create_indexes
+from src.utils.summary_tables import build_summaries
+
+QUERIES = [
+    "Show me papers by year",
+    "Papers by field",
+    "Top cited papers",
+    "Collaboration trends by year",
+    "Papers from 2013 to 2022",
+    # Matches no routing rule, so it is classified by the (stub) LLM
+    "How has the lab's output developed",
+]
+
+# Unique suffixes defeat the response and classification caches across scenarios and levels
+_nonce = itertools.count()
+
+Request = Tuple[str, str, Optional[dict], Optional[dict]]
+
+SCENARIOS: Dict[str, Callable[[int], Request]] = {
+    "health": lambda i: ("GET", "/api/v1/health", None, None),
+    "query_cached": lambda i: ("POST", "/api/v1/query", None, {"query": QUERIES[i % len(QUERIES)]}),
+    "query_uncached": lambda i: (
+        "POST", "/api/v1/query", None, {"query": f"{QUERIES[i % len(QUERIES)]} run{next(_nonce)}"}
+    ),
+    "query_ndjson": lambda i: (
+        "POST", "/api/v1/query", {"format": "ndjson"}, {"query": f"Papers from 2013 to 2022 run{next(_nonce)}"}
+    ),
+    "query_stream": lambda i: (
+        "POST", "/api/v1/query/stream", None, {"query": f"{QUERIES[i % len(QUERIES)]} run{next(_nonce)}"}
+    ),
+    "metrics": lambda i: ("GET", "/metrics", None, None),
+}
+
+def read_rss(pid: int) -> Dict[str, Optional[float]]:
+    """Current and peak resident memory of a process in MB (Linux /proc only)"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if ":" in line)
+    except OSError:
+        return {"rss": None, "hwm": None}
+    return {key: int(fields[name].split()[0]) / 1024 for key, name in (("rss", "VmRSS"), ("hwm", "VmHWM"))}
+
+@contextmanager
+def run_api_server(db_path: str, llm_url: str, startup_timeout: float = 60.0):
+    """Serve src.main:app in a subprocess; yields (base_url, pid)"""
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_PATH": db_path,
+        "ANTHROPIC_BASE_URL": llm_url,
+        "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "bench-key-placeholder"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"API server exited with status {process.returncode}")
+            try:
+                if httpx.get(f"{base_url}/api/v1/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("API server did not start in time")
+            time.sleep(0.1)
+        yield base_url, process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def send(client: httpx.AsyncClient, request: Request) -> Tuple[float, int, int]:
+    """Seconds until the last body byte, the status code and the body size"""
+    method, path, params, body = request
+    start = time.perf_counter()
+    size = 0
+    async with client.stream(method, path, params=params, json=body) as response:
+        async for chunk in response.aiter_raw():
+            size += len(chunk)
+    return time.perf_counter() - start, response.status_code, size
+
+async def sample_memory(pid: int, samples: List[float], interval: float = 0.05):
+    while True:
+        rss = read_rss(pid)["rss"]
+        if rss is not None:
+            samples.append(rss)
+        await asyncio.sleep(interval)
+
+async def run_level(client: httpx.AsyncClient, pid: int, scenario: str, concurrency: int, requests: int) -> Dict[str, Any]:
+    """Closed-loop load: `concurrency` workers issue `requests` requests back to back"""
+    make_request = SCENARIOS[scenario]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    sent = 0
+    counter = itertools.count()
+    
+    async def worker():
+        nonlocal errors, sent
+        while (i := next(counter)) < requests:
+            try:
+                seconds, status, size = await send(client, make_request(i))
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            statuses[status] = statuses.get(status, 0) + 1
+            if status >= 400:
+                errors += 1
+                continue
+            latencies.append(seconds)
+            sent += size
+    
+    rss_start = read_rss(pid)["rss"]
+    samples: List[float] = []
+    sampler = asyncio.create_task(sample_memory(pid, samples))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    memory = read_rss(pid)
+    
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "wire_bytes_per_response": round(sent / len(latencies)) if latencies else 0,
+        "latency_ms": None,
+        "rss_mb": {
+            "start": rss_start,
+            "end": memory["rss"],
+            "peak": max(samples + [memory["rss"]]) if memory["rss"] is not None else None,
+            "process_peak": memory["hwm"],
+        },
+    }
+    if latencies:
+        values = np.array(latencies) * 1000
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        result["latency_ms"] = {
+            "mean": round(float(values.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(values.max()), 3),
+        }
+    return result
+
+def prepare_database(path: str, papers: int, optimize: bool) -> float:
+    start = time.perf_counter()
+    generate(path, papers)
+    if optimize:
+        conn = sqlite3.connect(path)
+        create_indexes(conn)
+        conn.close()
+        build_summaries(path)
+    return time.perf_counter() - start
+
+def print_result(result: Dict[str, Any]):
+    latency = result["latency_ms"] or {}
+    peak = result["rss_mb"]["peak"]
+    print(
+        f"{result['scenario']:<15} {result['concurrency']:>5} {result['ok']:>6} {result['errors']:>5} "
+        f"{result['throughput_rps']:>9.1f} {latency.get('p50', 0):>9.1f} {latency.get('p95', 0):>9.1f} "
+        f"{latency.get('p99', 0):>9.1f} {peak if peak is not None else float('nan'):>9.1f}"
+    )
+
+async def drive(base_url: str, pid: int, args) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        for scenario in args.scenarios:
+            make_request = SCENARIOS[scenario]
+            for i in range(args.warmup):
+                await send(client, make_request(i))
+            for concurrency in args.concurrency:
+                result = await run_level(client, pid, scenario, concurrency, args.requests)
+                print_result(result)
+                results.append(result)
+    return results
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "synthetic.db")
+        build_seconds = prepare_database(db_path, args.papers, not args.no_optimize)
+        print(f"synthetic database: {args.papers:,} papers in {build_seconds:.1f}s")
+        print(f"stub LLM latency {args.llm_latency}s ± {args.llm_jitter}s, {args.requests} requests per level\n")
+        
+        with run_stub_server(args.llm_latency, args.llm_jitter) as (llm_url, stub):
+            with run_api_server(db_path, llm_url) as (base_url, pid):
+                print(f"{'scenario':<15} {'conc':>5} {'ok':>6} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>9}")
+                results = asyncio.run(drive(base_url, pid, args))
+            llm_requests = stub.state.requests
+    
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "papers": args.papers,
+            "optimized_database": not args.no_optimize,
+            "llm_latency_s": args.llm_latency,
+            "llm_jitter_s": args.llm_jitter,
+            "requests_per_level": args.requests,
+            "warmup": args.warmup,
+            "llm_requests": llm_requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"\nwrote {args.output}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=100_000, help="Synthetic database scale")
+    parser.add_argument("--no-optimize", action="store_true", help="Skip indexes and summary tables")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    main(parser.parse_args())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Cost of node, SQL and LLM instrumentation: workflow latency with metrics on vs off, plus raw observe time"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.llm import LLMClientProvider
+from src.utils.metrics import MetricsRegistry, metrics
+from src.workflow.graph import process_query
+
+ANALYSIS_JSON = '{"summary": "Bench", "key_findings": [], "viz_type": "bar", "x_field": "year", "y_field": "citation_count"}'
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = {"input_tokens": 800, "output_tokens": 60, "total_tokens": 860}
+
+async def run_workflow(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await process_query("papers from 2013 to 2022")
+    return (time.perf_counter() - start) / iterations
+
+def observe_cost(iterations: int) -> float:
+    histogram = MetricsRegistry().histogram("bench_seconds", "Bench", ["query", "node"])
+    start = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe(i * 1e-6, "year_range_page", "filtering")
+    return (time.perf_counter() - start) / iterations
+
+async def main(papers: int, iterations: int, rounds: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        database.DATABASE_PATH = path
+        
+        # Through the pooled wrapper, so LLM timing and token accounting run as in production
+        provider = LLMClientProvider()
+        analysis_llm = AsyncMock()
+        analysis_llm.ainvoke = AsyncMock(return_value=_Response(ANALYSIS_JSON))
+        provider.override(lambda temperature: analysis_llm)
+        
+        with patch("src.agents.analysis_agent.get_llm", return_value=provider.get(0)):
+            await run_workflow(3)
+            # Alternate rounds so drift affects both variants alike
+            timings = {True: [], False: []}
+            for _ in range(rounds):
+                for enabled in (True, False):
+                    metrics.enabled = enabled
+                    timings[enabled].append(await run_workflow(iterations))
+        metrics.enabled = True
+
+    on, off = min(timings[True]), min(timings[False])
+    print(f"workflow on {papers:,} papers, best of {rounds} rounds x {iterations} queries")
+    print(f"{'metrics off':<14} {off * 1000:9.3f} ms/query")
+    print(f"{'metrics on':<14} {on * 1000:9.3f} ms/query")
+    print(f"{'overhead':<14} {(on - off) * 1e6:9.1f} us/query ({(on - off) / off * 100:+.2f}%)")
+    print(f"{'observe()':<14} {observe_cost(1_000_000) * 1e9:9.0f} ns/call")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=50_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.iterations, args.rounds))
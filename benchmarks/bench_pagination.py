@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Peak memory and latency of a full year-range result: one fetchall vs streamed keyset batches"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.api.routes import stream_ndjson
+from src.utils.index_advisor import create_indexes
+
+async def fetchall_body():
+    """The previous path: every row in memory, then one JSON body"""
+    rows = await database.get_papers_by_year_range(1900, 2100)
+    return len(json.dumps(rows, separators=(",", ":")).encode())
+
+async def streamed_ndjson():
+    """The NDJSON response: keyset pages read in fetchmany batches, each encoded and dropped"""
+    sent = 0
+    with patch("src.agents.filtering_agent.YEAR_RANGE", (1900, 2100)):
+        async for chunk in stream_ndjson({"query_type": "year_range"}, b"{}"):
+            sent += len(chunk)
+    return sent
+
+async def measure(fn):
+    start = time.perf_counter()
+    size = await fn()
+    elapsed = time.perf_counter() - start
+    # Traced separately, since tracemalloc slows allocation-heavy code several times over
+    gc.collect()
+    tracemalloc.start()
+    await fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+async def main(sizes):
+    print(f"{'rows':>10} {'variant':<10} {'ms':>9} {'peak MB':>9} {'output MB':>10}")
+    for papers in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "synthetic.db")
+            generate(path, papers)
+            conn = sqlite3.connect(path)
+            create_indexes(conn)
+            conn.close()
+            database.DATABASE_PATH = path
+            for name, fn in (("fetchall", fetchall_body), ("streamed", streamed_ndjson)):
+                elapsed, peak, size = await measure(fn)
+                print(f"{papers:>10,} {name:<10} {elapsed * 1000:9.0f} {peak / 2**20:9.1f} {size / 2**20:10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, nargs="+", default=[50_000, 200_000, 800_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.papers))
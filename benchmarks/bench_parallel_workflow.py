@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Linear vs fan-out workflow latency with a stubbed slow analysis LLM"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from langgraph.graph import StateGraph, END
+from src.models.state import AgentState
+from src.agents.filtering_agent import filtering_agent
+from src.agents.analysis_agent import analysis_agent
+from src.agents.visualization_agent import visualization_agent
+from src.workflow.graph import create_workflow, initial_state
+
+SAMPLE_DATA = [{"year": 2013 + i, "count": 1000 + i * 50} for i in range(10)]
+ANALYSIS_JSON = '{"summary": "Bench", "key_findings": [], "viz_type": "bar", "x_field": "year", "y_field": "count"}'
+QUERY = "Show me papers by year"
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+def create_linear_workflow():
+    """The previous strictly sequential graph"""
+    workflow = StateGraph(AgentState)
+    workflow.add_node("filtering", filtering_agent)
+    workflow.add_node("analysis", analysis_agent)
+    workflow.add_node("visualization", visualization_agent)
+    workflow.set_entry_point("filtering")
+    workflow.add_edge("filtering", "analysis")
+    workflow.add_edge("analysis", "visualization")
+    workflow.add_edge("visualization", END)
+    return workflow.compile()
+
+async def time_to_chart(app):
+    """Seconds until the first Vega-Lite spec and until the run completes"""
+    start = time.perf_counter()
+    first_chart = None
+    async for update in app.astream(initial_state(QUERY), stream_mode="updates"):
+        for node in update:
+            if node in ("draft_visualization", "visualization") and first_chart is None:
+                first_chart = time.perf_counter() - start
+    return first_chart, time.perf_counter() - start
+
+async def main(llm_latency: float, deadline: float, runs: int):
+    async def slow_llm(*args, **kwargs):
+        await asyncio.sleep(llm_latency)
+        return _Response(ANALYSIS_JSON)
+    
+    analysis_llm = AsyncMock()
+    analysis_llm.ainvoke = AsyncMock(side_effect=slow_llm)
+    
+    variants = [
+        ("linear", create_linear_workflow(), None),
+        ("fan-out", create_workflow(), None),
+        (f"fan-out, {deadline}s deadline", create_workflow(), deadline),
+    ]
+    
+    print(f"analysis LLM latency {llm_latency}s, {runs} runs each")
+    print(f"{'graph':<28} {'first chart ms':>15} {'total ms':>10}")
+    with patch("src.agents.analysis_agent.get_llm", return_value=analysis_llm), \
+         patch("src.agents.filtering_agent.get_papers_by_year", AsyncMock(return_value=SAMPLE_DATA)):
+        for label, app, variant_deadline in variants:
+            with patch("src.agents.analysis_agent.ANALYSIS_DEADLINE", variant_deadline):
+                results = [await time_to_chart(app) for _ in range(runs)]
+            first = sum(r[0] for r in results) / runs
+            total = sum(r[1] for r in results) / runs
+            print(f"{label:<28} {first * 1000:15.1f} {total * 1000:10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--deadline", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.llm_latency, args.deadline, args.runs))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Filtered questions: fetching the whole decade and filtering in Python vs one compiled query-spec statement"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.encoding import dumps
+from src.utils.index_advisor import create_indexes
+from src.utils.query_spec import QuerySpec
+
+CASES = [
+    ("2018-2020 robotics papers", QuerySpec(year_from=2018, year_to=2020, fields=("Robotics",))),
+    ("papers with 500+ citations", QuerySpec(min_citations=500)),
+    ("ML papers by year since 2019", QuerySpec(group_by="year", year_from=2019, fields=("Machine Learning",))),
+]
+
+async def fetch_and_filter(spec: QuerySpec, field_papers: dict):
+    """The previous path: every row of the decade, then whatever filtering the caller does"""
+    rows = await database.get_papers_by_year_range(2013, 2022, columnar=True)
+    members = set().union(*(field_papers[name] for name in spec.fields)) if spec.fields else None
+    kept = [
+        row for row in rows
+        if (spec.year_from is None or row["year"] >= spec.year_from)
+        and (spec.year_to is None or row["year"] <= spec.year_to)
+        and (spec.min_citations is None or (row["citation_count"] or 0) >= spec.min_citations)
+        and (members is None or row["paper_id"] in members)
+    ]
+    return len(rows), kept
+
+async def uncached_spec(spec: QuerySpec):
+    # Aggregate specs go through the result cache, which would hide the query time
+    database.result_cache.clear()
+    return await database.execute_query_spec(spec, columnar=True)
+
+async def best_of(fn, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = await fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+async def main(papers: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        conn = sqlite3.connect(path)
+        create_indexes(conn)
+        field_papers = {}
+        for name in ("Robotics", "Machine Learning"):
+            field_papers[name] = {row[0] for row in conn.execute(
+                "SELECT pf.paper_id FROM paper_fields pf JOIN fields f ON f.field_id = pf.field_id WHERE f.field_name = ?", (name,)
+            )}
+        conn.close()
+        database.DATABASE_PATH = path
+        
+        print(f"{papers:,} papers, best of {repeat}\n")
+        print(f"{'question':<30} {'path':<14} {'ms':>9} {'rows fetched':>12} {'rows out':>9} {'JSON KB':>9}")
+        for label, spec in CASES:
+            old_time, (read, kept) = await best_of(lambda: fetch_and_filter(spec, field_papers), repeat)
+            new_time, (result, _) = await best_of(lambda: uncached_spec(spec), repeat)
+            print(f"{label:<30} {'fetch+filter':<14} {old_time * 1000:9.1f} {read:>12,} {len(kept):>9,} {len(dumps(kept)) / 1024:9.1f}")
+            print(f"{'':<30} {'query spec':<14} {new_time * 1000:9.1f} {len(result):>12,} {len(result):>9,} {len(dumps(result)) / 1024:9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.repeat))
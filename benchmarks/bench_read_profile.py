@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Cold, warmed-up and warm latency of each get_* helper with the read-optimized connection profile on and off.
+
+"Cold" evicts the database file from the OS page cache with
+posix_fadvise(DONTNEED) and reopens the pool before the call; "warmup"
+does the same, then runs warm_page_cache before the call; "warm" is the
+best of repeated calls on the open pool. The result cache is cleared
+before every call so aggregates hit SQLite.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.index_advisor import create_indexes
+from src.utils.pool import ConnectionPool, ReadProfile
+
+HELPERS = [
+    ("get_papers_by_year", lambda: database.get_papers_by_year(columnar=True)),
+    ("get_papers_by_field", lambda: database.get_papers_by_field(columnar=True)),
+    ("get_top_cited_papers", lambda: database.get_top_cited_papers(10, columnar=True)),
+    ("get_papers_by_year_range", lambda: database.get_papers_by_year_range(2020, 2022, columnar=True)),
+    ("get_collaboration_stats", lambda: database.get_collaboration_stats(columnar=True)),
+]
+
+def evict(path: str):
+    """Drop the file's pages from the OS page cache; no root needed once they are written back"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+async def timed(fn) -> float:
+    database.result_cache.clear()
+    start = time.perf_counter()
+    await fn()
+    return time.perf_counter() - start
+
+async def reopen(path: str, profile, warmup: bool) -> float:
+    await database.db_pool.close()
+    evict(path)
+    database.db_pool = ConnectionPool(path, size=1, profile=profile)
+    await database.db_pool.open()
+    if not warmup:
+        return 0.0
+    start = time.perf_counter()
+    await database.warm_page_cache()
+    return time.perf_counter() - start
+
+async def run(path: str, profile, repeat: int):
+    rows = []
+    warmup_seconds = 0.0
+    for name, fn in HELPERS:
+        await reopen(path, profile, warmup=False)
+        cold = await timed(fn)
+        warmup_seconds = await reopen(path, profile, warmup=True)
+        warmed = await timed(fn)
+        warm = min([await timed(fn) for _ in range(repeat)])
+        rows.append((name, cold, warmed, warm))
+    await database.db_pool.close()
+    return rows, warmup_seconds
+
+async def main(papers: int, repeat: int, cache_size_kb: int):
+    if not hasattr(os, "posix_fadvise"):
+        sys.exit("posix_fadvise is required to evict the page cache")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        conn = sqlite3.connect(path)
+        create_indexes(conn)
+        conn.close()
+        database.DATABASE_PATH = path
+
+        print(f"{papers:,} papers, {os.path.getsize(path) / 2**20:,.0f} MB file, warm = best of {repeat}\n")
+        print(f"{'helper':<26} {'profile':<8} {'cold ms':>9} {'warmup ms':>10} {'warm ms':>9}")
+        for label, profile in (("off", None), ("on", ReadProfile(cache_size_kb=cache_size_kb))):
+            rows, warmup_seconds = await run(path, profile, repeat)
+            for name, cold, warmed, warm in rows:
+                print(f"{name:<26} {label:<8} {cold * 1000:9.1f} {warmed * 1000:10.1f} {warm * 1000:9.1f}")
+            print(f"{'warm_page_cache':<26} {label:<8} {'':>9} {warmup_seconds * 1000:10.1f}\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cache-size-kb", type=int, default=database.DB_CACHE_SIZE_KB)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.repeat, args.cache_size_kb))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Canned queries from SQLite (pooled, indexed) vs the in-memory columnar replica: latency, load time and memory"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.bench_load import read_rss
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.index_advisor import create_indexes
+from src.utils.pool import ConnectionPool
+
+async def first_page():
+    return await database.get_papers_by_year_range_page(2018, 2022, limit=database.ROW_PAGE_SIZE, columnar=True)
+
+HELPERS = [
+    ("get_papers_by_year", lambda: database.get_papers_by_year(columnar=True)),
+    ("get_papers_by_field", lambda: database.get_papers_by_field(columnar=True)),
+    ("get_top_cited_papers(10)", lambda: database.get_top_cited_papers(10, columnar=True)),
+    ("get_top_cited_papers(1000)", lambda: database.get_top_cited_papers(1000, columnar=True)),
+    ("year_range page (10k rows)", first_page),
+    ("get_papers_by_year_range", lambda: database.get_papers_by_year_range(2020, 2022, columnar=True)),
+    ("get_collaboration_stats", lambda: database.get_collaboration_stats(columnar=True)),
+]
+
+async def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Aggregates are result-cached; the point is the cost of answering them
+        database.result_cache.clear()
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+async def main(papers: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        counts = generate(path, papers)
+        conn = sqlite3.connect(path)
+        create_indexes(conn)
+        conn.close()
+        database.DATABASE_PATH = path
+        database.db_pool = ConnectionPool(path, size=1, profile=database.read_profile)
+        await database.db_pool.open()
+
+        sqlite_times = {name: await best_of(fn, repeat) for name, fn in HELPERS}
+
+        rss_before = read_rss(os.getpid())["rss"]
+        database.replica = await asyncio.to_thread(database.ColumnarReplica.load, path)
+        rss_after = read_rss(os.getpid())["rss"]
+        replica_times = {name: await best_of(fn, repeat) for name, fn in HELPERS}
+        stats = database.get_replica_stats()
+        await database.db_pool.close()
+
+        print(f"{papers:,} papers, {sum(counts.values()):,} rows, {os.path.getsize(path) / 2**20:,.0f} MB file, best of {repeat}")
+        print(f"replica: loaded in {stats['load_seconds']:.1f}s, {stats['memory_mb']:,.0f} MB held", end="")
+        if rss_before is not None:
+            print(f", RSS +{rss_after - rss_before:,.0f} MB", end="")
+        print(f", {stats['fallbacks']} fallbacks\n")
+        print(f"{'helper':<28} {'SQLite ms':>10} {'replica ms':>11} {'speedup':>8}")
+        for name, _ in HELPERS:
+            old, new = sqlite_times[name], replica_times[name]
+            print(f"{name:<28} {old * 1000:10.2f} {new * 1000:11.2f} {old / new:7.0f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.repeat))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Encode time and bytes on the wire for the year-range query's response"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.columnar import records
+from src.utils.encoding import compress, dumps, supported_encodings
+from src.agents.filtering_agent import RESULT_ROW_LIMIT
+from src.agents.visualization_agent import create_vega_lite_spec, infer_encoding
+from src.api.routes import QueryResponse, response_body
+
+def no_reduction(data, viz_type, x_field, y_field, max_points=None):
+    return data, {"input_rows": len(data), "output_rows": len(data), "steps": []}
+
+def fastapi_default(result):
+    """The previous path: response_model validation, jsonable conversion, stdlib json"""
+    model = QueryResponse(**result)
+    content = model.model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def orjson_prebuilt(result):
+    return dumps(response_body(result))
+
+def best_of(fn, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+async def main(papers: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        database.DATABASE_PATH = path
+        data, _ = await database.get_papers_by_year_range_page(2013, 2022, limit=RESULT_ROW_LIMIT, columnar=True)
+
+    encoding = infer_encoding(data)
+    with patch("src.agents.visualization_agent.reduce_for_chart", no_reduction):
+        full_spec = create_vega_lite_spec(data, encoding, "papers 2013-2022")
+    specs = [("full spec", full_spec), ("reduced spec", create_vega_lite_spec(data, encoding, "papers 2013-2022"))]
+
+    print(f"year-range page of {len(data):,} rows, {encoding['viz_type']} chart (best of {repeat})\n")
+    print(f"{'response':<13} {'encoder':<16} {'encode ms':>10} {'coding':<9} {'compress ms':>12} {'bytes':>11}")
+    for label, spec in specs:
+        result = {
+            "query": "papers 2013-2022", "query_type": "year_range", "classification_source": "rules",
+            "analysis": {"summary": "bench"}, "vega_spec": spec, "data_count": len(data), "has_more": True
+        }
+        # The stdlib path cannot see columnar results, so hand it plain rows as before
+        legacy = {**result, "vega_spec": {**spec, "data": {"values": records(spec["data"]["values"])}}}
+        legacy_time, _ = best_of(lambda: fastapi_default(legacy), repeat)
+        fast_time, payload = best_of(lambda: orjson_prebuilt(result), repeat)
+        print(f"{label:<13} {'fastapi+json':<16} {legacy_time * 1000:10.2f}")
+        print(f"{'':<13} {'orjson':<16} {fast_time * 1000:10.2f} {'identity':<9} {0:12.2f} {len(payload):11,}")
+        for coding in supported_encodings()[::-1]:
+            compress_time, compressed = best_of(lambda: compress(payload, coding), repeat)
+            print(f"{'':<13} {'':<16} {'':>10} {coding:<9} {compress_time * 1000:12.2f} {len(compressed):11,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.repeat))
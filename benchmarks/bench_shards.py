@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Canned queries over one SQLite file vs year-range and institution shards: correctness, latency and throughput"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import END_YEAR, START_YEAR, generate
+from src.utils import database
+from src.utils.database import QUERIES
+from src.utils.index_advisor import create_indexes
+from src.utils.pool import ConnectionPool
+from src.utils.shards import Shard, ShardCatalog, write_shard
+
+AGGREGATES = ("papers_by_year", "papers_by_field", "collaboration")
+
+def year_shards(source: str, directory: str, count: int) -> List[Shard]:
+    shards = []
+    for index, years in enumerate(np.array_split(np.arange(START_YEAR, END_YEAR + 1), count)):
+        year_from, year_to = int(years[0]), int(years[-1])
+        path = os.path.join(directory, f"years_{count}_{index}.db")
+        write_shard(source, path, "year BETWEEN ? AND ?", (year_from, year_to), orphans=index == 0)
+        shards.append(Shard(f"{year_from}-{year_to}", path, year_from=year_from, year_to=year_to))
+    return shards
+
+def institution_shards(source: str, directory: str, count: int) -> List[Shard]:
+    """Papers go to every institution group one of their authors is affiliated with"""
+    shards = []
+    for group in range(count):
+        path = os.path.join(directory, f"institutions_{count}_{group}.db")
+        write_shard(
+            source, path,
+            "paper_id IN (SELECT paper_id FROM source.paper_author_affiliations WHERE affiliation_id % ? = ?)",
+            (count, group), orphans=group == 0
+        )
+        shards.append(Shard(f"group{group}", path, institution=str(group)))
+    return shards
+
+def workload(kind: str, requests: int, seed: int = 0) -> List[tuple]:
+    rng = random.Random(seed)
+    if kind == "aggregates":
+        return [(QUERIES[rng.choice(AGGREGATES)], ()) for _ in range(requests)]
+    # Two-year windows, the shape of a typical filtered question
+    plan = []
+    for _ in range(requests):
+        start = rng.randint(START_YEAR, END_YEAR - 1)
+        plan.append((QUERIES["year_range"], (start, start + 1)))
+    return plan
+
+async def throughput(plan: List[tuple], concurrency: int) -> float:
+    queue = iter(plan)
+
+    async def worker():
+        for query, params in queue:
+            await database.execute_query_columnar(query, params)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(plan) / (time.perf_counter() - start)
+
+async def latency(query: str, params: tuple, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await database.execute_query_columnar(query, params)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def matches(result, expected) -> bool:
+    """Whether a sharded aggregate has the same counts per key as the single file"""
+    got = dict((row[0], row[1:]) for row in zip(*result.columns))
+    want = dict((row[0], row[1:]) for row in zip(*expected.columns))
+    return got == want
+
+async def measure(catalog: Optional[ShardCatalog], args) -> Dict[str, float]:
+    if catalog is not None:
+        await catalog.open(database._fetch_columnar)
+    database.shard_catalog = catalog
+    try:
+        figures = {}
+        for name in AGGREGATES:
+            figures[name] = await latency(QUERIES[name], (), args.repeat)
+        figures["year_range(2020, 2021)"] = await latency(QUERIES["year_range"], (2020, 2021), args.repeat)
+        for kind in ("aggregates", "year_range"):
+            figures[f"{kind} req/s"] = await throughput(workload(kind, args.requests), args.concurrency)
+        return figures
+    finally:
+        database.shard_catalog = None
+        if catalog is not None:
+            await catalog.close()
+
+async def main(papers: int, shard_counts: List[int], args):
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "synthetic.db")
+        generate(source, papers)
+        conn = sqlite3.connect(source)
+        create_indexes(conn)
+        conn.close()
+        database.DATABASE_PATH = source
+        database.db_pool = ConnectionPool(source, size=args.concurrency, profile=database.read_profile)
+        await database.db_pool.open()
+        expected = {name: await database.execute_query_columnar(QUERIES[name]) for name in AGGREGATES}
+
+        layouts = {"single file": None}
+        for count in shard_counts:
+            layouts[f"{count} year shards"] = ShardCatalog(
+                year_shards(source, tmp, count), pool_size=args.pool_size, profile=database.read_profile
+            )
+        layouts[f"{args.institutions} institution shards"] = ShardCatalog(
+            institution_shards(source, tmp, args.institutions), overlapping_papers=True, pool_size=args.pool_size,
+            profile=database.read_profile
+        )
+
+        results = {}
+        for label, catalog in layouts.items():
+            results[label] = await measure(catalog, args)
+            if catalog is not None:
+                await catalog.open(database._fetch_columnar)
+                identical = [matches(await catalog.execute(name, QUERIES[name]), expected[name]) for name in AGGREGATES]
+                await catalog.close()
+                status = "identical" if all(identical) else "MISMATCH"
+                print(f"{label}: aggregates vs single file, {status}")
+        await database.db_pool.close()
+
+        print(f"\n{papers:,} papers, {os.cpu_count()} CPUs, concurrency {args.concurrency}, "
+              f"{args.pool_size} connections per shard, best of {args.repeat}")
+        columns = list(results["single file"])
+        print(f"{'layout':<24}" + "".join(f"{column:>24}" for column in columns))
+        for label, figures in results.items():
+            cells = [
+                f"{value:,.0f}" if column.endswith("req/s") else f"{value * 1000:,.1f} ms"
+                for column, value in figures.items()
+            ]
+            print(f"{label:<24}" + "".join(f"{cell:>24}" for cell in cells))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=500_000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--institutions", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.shards, args))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Repeated get_top_cited_papers calls: fresh connections vs pooled connections with and without statement reuse"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.index_advisor import create_indexes
+from src.utils.pool import ConnectionPool
+from src.utils.statements import StatementRegistry
+
+# (label, pooled, statement cache size)
+VARIANTS = [
+    ("fresh connection", False, database.STATEMENT_CACHE_SIZE),
+    ("pool, no reuse", True, 0),
+    ("pool, reuse", True, database.STATEMENT_CACHE_SIZE),
+]
+
+async def run_variant(path: str, pooled: bool, cache_size: int, calls: int, limit: int, repeat: int):
+    database.statements = StatementRegistry(cache_size)
+    database.statements.register_all(database.QUERIES)
+    database.db_pool = ConnectionPool(path, size=1, cached_statements=cache_size)
+    if pooled:
+        await database.db_pool.open()
+    try:
+        await database.get_top_cited_papers(limit, columnar=True)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(calls):
+                await database.get_top_cited_papers(limit, columnar=True)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        await database.db_pool.close()
+    return best, database.statements.stats()["statements"]["top_cited"]
+
+async def main(papers: int, calls: int, limit: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        generate(path, papers)
+        conn = sqlite3.connect(path)
+        create_indexes(conn)
+        conn.close()
+        database.DATABASE_PATH = path
+
+        print(f"{papers:,} papers, {calls:,} calls of get_top_cited_papers({limit}), best of {repeat}\n")
+        print(f"{'variant':<18} {'us/call':>9} {'calls/s':>9} {'est. prepares':>15} {'est. reuse':>11} {'avg SQL ms':>11}")
+        for label, pooled, cache_size in VARIANTS:
+            elapsed, stats = await run_variant(path, pooled, cache_size, calls, limit, repeat)
+            print(
+                f"{label:<18} {elapsed / calls * 1e6:9.1f} {calls / elapsed:9,.0f} "
+                f"{stats['estimated_prepares']:>15,} {stats['estimated_reuse_rate']:11.1%} {stats['avg_ms']:11.3f}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=200_000)
+    parser.add_argument("--calls", type=int, default=5_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.calls, args.limit, args.repeat))
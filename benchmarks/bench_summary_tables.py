@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Raw aggregate queries vs materialized summary tables on a synthetic database"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_db import generate
+from src.utils import database
+from src.utils.summary_tables import build_summaries, drop_summaries
+
+HELPERS = [
+    ("papers_by_year", database.get_papers_by_year),
+    ("papers_by_field", database.get_papers_by_field),
+    ("collaboration", database.get_collaboration_stats),
+]
+
+async def _time_helpers(repeat: int):
+    timings = {}
+    for name, helper in HELPERS:
+        best = float("inf")
+        for _ in range(repeat):
+            database.result_cache.clear()
+            start = time.perf_counter()
+            await helper()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+async def main(papers: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.db")
+        start = time.perf_counter()
+        generate(path, papers)
+        print(f"generated {papers:,} papers in {time.perf_counter() - start:.1f}s")
+        database.DATABASE_PATH = path
+        
+        drop_summaries(path)
+        raw = await _time_helpers(repeat)
+        
+        for name, rows, seconds in build_summaries(path):
+            print(f"built {name:<18} {rows:>6} rows in {seconds:.2f}s")
+        summary = await _time_helpers(repeat)
+    
+    print(f"\n{'query':<18} {'raw ms':>10} {'summary ms':>12} {'speedup':>9}")
+    for name, _ in HELPERS:
+        print(f"{name:<18} {raw[name] * 1000:10.2f} {summary[name] * 1000:12.2f} {raw[name] / summary[name]:8.0f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.papers, args.repeat))
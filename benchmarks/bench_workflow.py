@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Per-request overhead of compiling the workflow vs using the cached graph"""
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key-placeholder")
+
+from src.workflow.graph import create_workflow, workflow_registry
+
+SAMPLE_DATA = [{"year": 2013 + i, "count": 1000 + i * 50} for i in range(10)]
+ANALYSIS_JSON = '{"summary": "Bench", "key_findings": [], "viz_type": "bar", "x_field": "year", "y_field": "count"}'
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+def _initial_state():
+    return {
+        "messages": [],
+        "user_query": "Show me papers by year",
+        "query_type": None,
+        "data": None,
+        "analysis_result": None,
+        "vega_spec": None,
+        "next_step": None
+    }
+
+async def _run(label, get_app, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await get_app().ainvoke(_initial_state())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed / iterations * 1000:8.3f} ms/request")
+    return elapsed / iterations
+
+async def main(iterations: int = 200):
+    """Run the benchmark with stubbed LLM and database calls"""
+    filter_llm = AsyncMock()
+    filter_llm.ainvoke = AsyncMock(return_value=_Response("papers_by_year"))
+    analysis_llm = AsyncMock()
+    analysis_llm.ainvoke = AsyncMock(return_value=_Response(ANALYSIS_JSON))
+    
+    with patch("src.agents.filtering_agent.get_llm", return_value=filter_llm), \
+         patch("src.agents.analysis_agent.get_llm", return_value=analysis_llm), \
+         patch("src.agents.filtering_agent.get_papers_by_year", AsyncMock(return_value=SAMPLE_DATA)):
+        
+        start = time.perf_counter()
+        for _ in range(iterations):
+            create_workflow()
+        compile_cost = (time.perf_counter() - start) / iterations
+        print(f"{'compile only':<20} {compile_cost * 1000:8.3f} ms/request")
+        
+        workflow_registry.warmup()
+        uncached = await _run("compile per request", create_workflow, iterations)
+        cached = await _run("cached graph", workflow_registry.get, iterations)
+    
+    print(f"{'saved':<20} {(uncached - cached) * 1000:8.3f} ms/request")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
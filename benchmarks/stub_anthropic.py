@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Anthropic Messages API with configurable latency"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+ANALYSIS_JSON = json.dumps({
+    "summary": "Stubbed analysis",
+    "key_findings": ["Stubbed finding"],
+    "viz_type": "bar",
+    "x_field": "year",
+    "y_field": "count"
+})
+
+PLAN_JSON = json.dumps({
+    "query_type": "papers_by_year",
+    "year_from": None,
+    "year_to": None,
+    "fields": [],
+    "min_citations": None,
+    "limit": None
+})
+
+def _reply_text(prompt: str) -> str:
+    if "Classify into one of these categories" in prompt:
+        return PLAN_JSON
+    return ANALYSIS_JSON
+
+def create_stub_app(latency: float = 0.0, jitter: float = 0.0, seed: int = 0) -> FastAPI:
+    """App answering POST /v1/messages after `latency` ± uniform `jitter` seconds"""
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.connections = set()
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        app.state.connections.add((request.client.host, request.client.port))
+        delay = max(latency + rng.uniform(-jitter, jitter), 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        prompt = " ".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for message in body["messages"]
+            for part in ([message["content"]] if isinstance(message["content"], str) else message["content"])
+        )
+        text = _reply_text(prompt)
+        return {
+            "id": f"msg_stub_{app.state.requests}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+        }
+
+    return app
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def run_stub_server(latency: float = 0.0, jitter: float = 0.0, port: int = None):
+    """Serve the stub in a background thread; yields (base_url, app)"""
+    port = port or free_port()
+    app = create_stub_app(latency, jitter)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}", app
+    finally:
+        server.should_exit = True
+        thread.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(args.latency, args.jitter), host="127.0.0.1", port=args.port)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Generate a synthetic SciSciNet-shaped SQLite database for benchmarks.
+
+Distributions follow the shape of bibliometric data rather than uniform
+noise: publication volume grows year over year, citation counts are
+power-law distributed and accumulate with paper age, field membership is
+Zipf-skewed, team sizes are heavy-tailed and a minority of prolific
+authors write most papers. Rows are drawn with NumPy in large batches and
+bulk-inserted into index-free tables inside one transaction, with
+journaling and syncing switched off, so databases of hundreds of millions
+of rows build in minutes.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+SCHEMA = """
+    CREATE TABLE papers (paper_id INTEGER PRIMARY KEY, title TEXT, year INTEGER, citation_count INTEGER);
+    CREATE TABLE fields (field_id INTEGER PRIMARY KEY, field_name TEXT);
+    CREATE TABLE paper_fields (paper_id INTEGER, field_id INTEGER);
+    CREATE TABLE paper_author_affiliations (paper_id INTEGER, author_id INTEGER, affiliation_id INTEGER);
+"""
+
+# Build-time settings only: a half-built file is discarded anyway, so skip the journal and fsyncs.
+# The page size stays at the default so reads behave like the production snapshot.
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+)
+
+FIELD_NAMES = (
+    "Machine Learning", "Computer Vision", "Natural Language Processing", "Artificial Intelligence",
+    "Computer Networks", "Software Engineering", "Databases", "Human-Computer Interaction",
+    "Computer Security", "Distributed Computing", "Robotics", "Theoretical Computer Science",
+    "Computer Graphics", "Information Retrieval", "Computer Architecture", "Operating Systems",
+    "Programming Languages", "Data Mining", "Bioinformatics", "Signal Processing",
+)
+
+START_YEAR, END_YEAR = 2013, 2022
+YEARLY_GROWTH = 1.08
+CITATION_ALPHA = 1.3
+CITATION_SCALE = 3.0
+MAX_CITATIONS = 250_000
+NULL_CITATION_RATE = 0.02
+FIELD_ZIPF = 1.1
+MEAN_EXTRA_FIELDS = 0.6
+MEAN_TEAM_SIZE = 3.5
+AUTHOR_SKEW = 2.5
+
+def parse_count(text: str) -> int:
+    """Row count with an optional k/m/b suffix, e.g. "250k" or "1.5m\""""
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def field_names(fields: int) -> List[str]:
+    return [FIELD_NAMES[i] if i < len(FIELD_NAMES) else f"Field {i + 1}" for i in range(fields)]
+
+def _zipf_weights(n: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+def _paper_rows(rng: np.random.Generator, ids: np.ndarray) -> Iterator[tuple]:
+    years = np.arange(START_YEAR, END_YEAR + 1)
+    growth = YEARLY_GROWTH ** np.arange(len(years))
+    year = rng.choice(years, size=len(ids), p=growth / growth.sum())
+    # Lomax (Pareto II) draws give the heavy tail; older papers have had longer to collect citations
+    age = END_YEAR + 1 - year
+    citations = np.minimum(np.floor(rng.pareto(CITATION_ALPHA, len(ids)) * CITATION_SCALE * np.sqrt(age)), MAX_CITATIONS)
+    citations = citations.astype(np.int64).tolist()
+    for index in np.flatnonzero(rng.random(len(ids)) < NULL_CITATION_RATE).tolist():
+        citations[index] = None
+    return zip(ids.tolist(), (f"Paper {i}" for i in ids.tolist()), year.tolist(), citations)
+
+def _field_rows(rng: np.random.Generator, ids: np.ndarray, weights: np.ndarray) -> Iterator[tuple]:
+    # Up to three distinct fields per paper, each drawn from the same Zipf popularity
+    count = np.minimum(1 + rng.poisson(MEAN_EXTRA_FIELDS, len(ids)), 3)
+    drawn = rng.choice(len(weights), size=(len(ids), 3), p=weights) + 1
+    keep = np.arange(3) < count[:, None]
+    keep[:, 1] &= drawn[:, 1] != drawn[:, 0]
+    keep[:, 2] &= (drawn[:, 2] != drawn[:, 0]) & (drawn[:, 2] != drawn[:, 1])
+    papers = np.broadcast_to(ids[:, None], drawn.shape)
+    return zip(papers[keep].tolist(), drawn[keep].tolist())
+
+def _author_rows(rng: np.random.Generator, ids: np.ndarray, authors: int, affiliations: int) -> Iterator[tuple]:
+    # Team sizes are 1 + negative binomial, so most teams are small but a few are large
+    extra = MEAN_TEAM_SIZE - 1
+    team = 1 + rng.negative_binomial(1.5, 1.5 / (1.5 + extra), len(ids))
+    paper = np.repeat(ids, team)
+    # Powers of uniform draws crowd toward low ids, making those authors prolific
+    author = (authors * rng.random(len(paper)) ** AUTHOR_SKEW).astype(np.int64) + 1
+    # One author appears once per paper; rows are already grouped by paper, so this sort is cheap
+    key = np.sort(paper * (authors + 1) + author)
+    key = key[np.concatenate(([True], key[1:] != key[:-1]))]
+    paper, author = key // (authors + 1), key % (authors + 1)
+    # Each author keeps a fixed affiliation, spread by a multiplicative hash
+    affiliation = (author * 2654435761) % affiliations + 1
+    return zip(paper.tolist(), author.tolist(), affiliation.tolist())
+
+def generate(path: str, papers: int, fields: int = 50, seed: int = 0, batch: int = 1_000_000) -> Dict[str, int]:
+    """Write a database with `papers` papers plus field and author links; returns rows per table"""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = np.random.default_rng(seed)
+    authors = max(papers // 2, 1)
+    affiliations = max(authors // 50, 1)
+    weights = _zipf_weights(fields, FIELD_ZIPF)
+    counts = {"papers": papers, "fields": fields, "paper_fields": 0, "paper_author_affiliations": 0}
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        for pragma in BULK_PRAGMAS:
+            conn.execute(pragma)
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO fields VALUES (?, ?)", enumerate(field_names(fields), start=1))
+        for start in range(1, papers + 1, batch):
+            ids = np.arange(start, min(start + batch, papers + 1), dtype=np.int64)
+            conn.executemany("INSERT INTO papers VALUES (?, ?, ?, ?)", _paper_rows(rng, ids))
+            cursor = conn.executemany("INSERT INTO paper_fields VALUES (?, ?)", _field_rows(rng, ids, weights))
+            counts["paper_fields"] += cursor.rowcount
+            cursor = conn.executemany(
+                "INSERT INTO paper_author_affiliations VALUES (?, ?, ?)",
+                _author_rows(rng, ids, authors, affiliations)
+            )
+            counts["paper_author_affiliations"] += cursor.rowcount
+        conn.execute("COMMIT")
+        # Leave a normally journaled file behind for the readers
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+    return counts
+
+def describe(path: str) -> List[Tuple[str, str]]:
+    """Headline distribution statistics of a generated database"""
+    conn = sqlite3.connect(path)
+    try:
+        citations = np.array([row[0] for row in conn.execute("SELECT citation_count FROM papers WHERE citation_count IS NOT NULL")])
+        papers = conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+        per_year = conn.execute("SELECT MIN(n), MAX(n) FROM (SELECT COUNT(*) AS n FROM papers GROUP BY year)").fetchone()
+        top_field = conn.execute(
+            "SELECT MAX(n) * 1.0 / SUM(n) FROM (SELECT COUNT(*) AS n FROM paper_fields GROUP BY field_id)"
+        ).fetchone()[0]
+        team = conn.execute(
+            "SELECT AVG(n), MAX(n) FROM (SELECT COUNT(*) AS n FROM paper_author_affiliations GROUP BY paper_id)"
+        ).fetchone()
+        author_papers = np.array([row[0] for row in conn.execute(
+            "SELECT COUNT(*) FROM paper_author_affiliations GROUP BY author_id"
+        )])
+    finally:
+        conn.close()
+    top_share = np.sort(author_papers)[::-1][:max(len(author_papers) // 10, 1)].sum() / author_papers.sum()
+    p50, p90, p99 = np.percentile(citations, [50, 90, 99])
+    return [
+        ("papers", f"{papers:,} ({per_year[0]:,} to {per_year[1]:,} per year)"),
+        ("citations", f"median {p50:.0f}, p90 {p90:.0f}, p99 {p99:.0f}, max {citations.max():,}, null {1 - len(citations) / papers:.1%}"),
+        ("largest field", f"{top_field:.1%} of field links"),
+        ("authors per paper", f"mean {team[0]:.2f}, max {team[1]}"),
+        ("top 10% of authors", f"{top_share:.1%} of authorships"),
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--papers", type=parse_count, default=100_000, help="Number of papers, e.g. 250k or 50m")
+    parser.add_argument("--fields", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=parse_count, default=1_000_000, help="Papers drawn and inserted per batch")
+    parser.add_argument("--describe", action="store_true", help="Print distribution statistics afterwards")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = generate(args.path, args.papers, fields=args.fields, seed=args.seed, batch=args.batch)
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    print(f"Wrote {args.path}: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)", file=sys.stderr)
+    for table, count in counts.items():
+        print(f"  {table:<26} {count:>14,}", file=sys.stderr)
+    if args.describe:
+        for name, value in describe(args.path):
+            print(f"  {name:<26} {value}", file=sys.stderr)
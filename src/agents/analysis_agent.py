@@ -1,7 +1,14 @@
 from langchain_core.messages import AIMessage
-from langchain_anthropic import ChatAnthropic
 from src.models.state import AgentState
+from src.utils.llm import get_llm
+from src.utils.profiling import profile_columns
+from src.utils.columnar import json_default
+import asyncio
 import json
+import os
+
+# Seconds to wait for the analysis LLM before the heuristic chart is served instead
+ANALYSIS_DEADLINE = float(os.getenv("ANALYSIS_DEADLINE")) if os.getenv("ANALYSIS_DEADLINE") else None
 
 async def analysis_agent(state: AgentState) -> AgentState:
     """Analyze the fetched data and prepare insights"""
@@ -9,26 +16,28 @@ async def analysis_agent(state: AgentState) -> AgentState:
     query_type = state["query_type"]
     user_query = state["user_query"]
     
+    # Runs in parallel with draft_visualization, so only return the keys this node owns
     if not data:
         return {
-            **state,
             "analysis_result": {"error": "No data available"},
-            "messages": state["messages"] + [AIMessage(content="No data found")],
+            "messages": [AIMessage(content="No data found")],
             "next_step": "end"
         }
     
-    llm = ChatAnthropic(model="claude-sonnet-4-5", temperature=0)
+    llm = get_llm(temperature=0)
     
-    data_summary = json.dumps(data[:10], indent=2) if len(data) > 10 else json.dumps(data, indent=2)
+    profile = json.dumps(profile_columns(data), separators=(",", ":"), default=json_default)
+    sample = json.dumps(data[:3], separators=(",", ":"), default=json_default)
     
     prompt = f"""Analyze this data and provide insights for the user query.
 
 User Query: {user_query}
 Query Type: {query_type}
-Data Sample (first 10 records):
-{data_summary}
-
 Total Records: {len(data)}
+Column Profile (computed over all records):
+{profile}
+Sample Records (first 3):
+{sample}
 
 Provide a brief analysis including:
 1. Key findings
@@ -44,7 +53,21 @@ Respond in JSON format:
     "y_field": "field name for y-axis"
 }}"""
     
-    response = await llm.ainvoke([{"role": "user", "content": prompt}])
+    try:
+        response = await asyncio.wait_for(
+            llm.ainvoke([{"role": "user", "content": prompt}]),
+            timeout=ANALYSIS_DEADLINE
+        )
+    except asyncio.TimeoutError:
+        return {
+            "analysis_result": {
+                "summary": "Analysis did not finish in time",
+                "key_findings": [f"Found {len(data)} records"],
+                "timed_out": True
+            },
+            "messages": [AIMessage(content="Analysis timed out")],
+            "next_step": "visualization"
+        }
     
     try:
         analysis_result = json.loads(response.content)
@@ -58,9 +81,8 @@ Respond in JSON format:
         }
     
     return {
-        **state,
         "analysis_result": analysis_result,
-        "messages": state["messages"] + [AIMessage(content=f"Analysis: {analysis_result['summary']}")],
+        "messages": [AIMessage(content=f"Analysis: {analysis_result['summary']}")],
         "next_step": "visualization"
     }
 
@@ -1,19 +1,39 @@
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_anthropic import ChatAnthropic
 from src.models.state import AgentState
+from src.utils.llm import get_llm
 from src.utils.database import (
     get_papers_by_year,
     get_papers_by_field,
     get_top_cited_papers,
-    get_papers_by_year_range,
-    get_collaboration_stats
+    get_papers_by_year_range_page,
+    get_collaboration_stats,
+    iter_papers_by_year_range,
+    iter_query_batches,
+    get_field_names,
+    compile_query_spec,
+    execute_query_spec
 )
+from src.utils.classification_cache import classification_cache
+from src.agents.query_router import query_router
+from src.utils.streaming import emit_event
+from src.utils.columnar import ColumnarResult
+from src.utils.tracing import set_flag, span
+from src.utils.query_spec import CATEGORY_SPECS, QuerySpec, build_spec, category_of, clean_filters, extract_filters
 
-async def filtering_agent(state: AgentState) -> AgentState:
-    """Analyze user query and fetch relevant data from database"""
-    user_query = state["user_query"].lower()
-    
-    llm = ChatAnthropic(model="claude-sonnet-4-5", temperature=0)
+CATEGORIES = tuple(CATEGORY_SPECS)
+YEAR_RANGE = (2013, 2022)
+# Row-level results are loaded into the workflow one bounded keyset page at a time
+RESULT_ROW_LIMIT = int(os.getenv("RESULT_ROW_LIMIT", "10000"))
+# Keeps the prompt bounded on databases with a long tail of fields
+PROMPT_FIELD_LIMIT = int(os.getenv("PROMPT_FIELD_LIMIT", "200"))
+
+async def plan_query(user_query: str, field_names: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """Ask the LLM which data category a query needs and which filters it states"""
+    llm = get_llm(temperature=0)
     
     prompt = f"""Analyze this query and determine what type of data is needed:
 Query: {user_query}
@@ -25,30 +45,117 @@ Classify into one of these categories:
 - collaboration: queries about author collaborations
 - year_range: queries about papers in a specific time period
 
-Respond with ONLY the category name."""
+Also extract the filters the query states. Known research fields: {", ".join(field_names[:PROMPT_FIELD_LIMIT]) or "unknown"}
+
+Respond with ONLY a JSON object like the one below, using null or [] for anything the query does not state:
+{{"query_type": "papers_by_year", "year_from": null, "year_to": null, "fields": [], "min_citations": null, "limit": null}}"""
     
     response = await llm.ainvoke([HumanMessage(content=prompt)])
-    query_type = response.content.strip().lower()
-    
-    data = None
-    if "papers_by_year" in query_type:
-        data = await get_papers_by_year()
-    elif "papers_by_field" in query_type:
-        data = await get_papers_by_field()
-    elif "top_cited" in query_type:
-        data = await get_top_cited_papers()
-    elif "collaboration" in query_type:
-        data = await get_collaboration_stats()
-    elif "year_range" in query_type:
-        data = await get_papers_by_year_range(2013, 2022)
+    return parse_plan(response.content, field_names)
+
+def parse_plan(content: str, field_names: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """Category and validated filters from the planner's reply; a bare category name is accepted too"""
+    text = content.strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            plan = json.loads(text[start:end + 1])
+        except ValueError:
+            plan = None
+        if isinstance(plan, dict):
+            return str(plan.get("query_type") or "").strip().lower(), clean_filters(plan, field_names)
+    return text.lower(), {}
+
+def _is_year_range(spec: QuerySpec) -> bool:
+    # Paper rows filtered by year alone are served by keyset pages over idx_papers_year_citation
+    return spec == QuerySpec(year_from=spec.year_from, year_to=spec.year_to)
+
+def _years(spec: QuerySpec) -> Tuple[int, int]:
+    return (
+        YEAR_RANGE[0] if spec.year_from is None else spec.year_from,
+        YEAR_RANGE[1] if spec.year_to is None else spec.year_to
+    )
+
+async def fetch_data(query_type: str, spec: Optional[QuerySpec] = None) -> Tuple[ColumnarResult, bool]:
+    """Fetch the data for a query, and whether rows beyond the page limit were left out.
+
+    Canned category specs keep their tuned paths (summary tables, result
+    cache); anything with filters compiles to one statement.
+    """
+    category = category_of(query_type)
+    spec = spec or CATEGORY_SPECS[category]
+    more = False
+    if _is_year_range(spec):
+        data, after = await get_papers_by_year_range_page(*_years(spec), limit=RESULT_ROW_LIMIT, columnar=True)
+        more = after is not None
+    elif spec != CATEGORY_SPECS[category]:
+        data, more = await execute_query_spec(spec, RESULT_ROW_LIMIT, columnar=True)
+    elif category == "papers_by_field":
+        data = await get_papers_by_field(columnar=True)
+    elif category == "top_cited":
+        data = await get_top_cited_papers(columnar=True)
+    elif category == "collaboration":
+        data = await get_collaboration_stats(columnar=True)
     else:
-        data = await get_papers_by_year()
+        data = await get_papers_by_year(columnar=True)
+    return ColumnarResult.coerce(data), more
+
+async def iter_result_rows(query_type: str, spec: Optional[QuerySpec] = None) -> AsyncIterator[ColumnarResult]:
+    """Row batches of a query's complete result, streamed from the database when unbounded"""
+    category = category_of(query_type)
+    spec = spec or CATEGORY_SPECS[category]
+    if _is_year_range(spec):
+        async for batch in iter_papers_by_year_range(*_years(spec)):
+            yield batch
+        return
+    if spec != CATEGORY_SPECS[category]:
+        async for batch in iter_query_batches(*compile_query_spec(spec)):
+            yield batch
+        return
+    data, _ = await fetch_data(query_type, spec)
+    if data:
+        yield data
+
+async def filtering_agent(state: AgentState) -> AgentState:
+    """Analyze user query and fetch relevant data from database"""
+    user_query = state["user_query"].lower()
+    
+    start = time.perf_counter()
+    with span("classification"):
+        field_names = await get_field_names()
+        filters = extract_filters(user_query, field_names)
+        decision = query_router.route(user_query)
+        if decision is not None:
+            query_type, source = decision.query_type, decision.source
+        else:
+            query_type, source = await classification_cache.get(user_query), "cache"
+            set_flag("classification_cache", "miss" if query_type is None else "hit")
+            if query_type is None:
+                query_type, planned = await plan_query(user_query, field_names)
+                source = "llm"
+                # The cache holds categories alone, so plans whose filters came from the LLM are not cached
+                if any(category in query_type for category in CATEGORIES) and planned.items() <= filters.items():
+                    await classification_cache.set(user_query, query_type)
+                filters = {**filters, **planned}
+        spec = build_spec(query_type, filters)
+    query_router.record(source, time.perf_counter() - start)
+    emit_event("classification", {
+        "query_type": query_type,
+        "classification_source": source,
+        "query_spec": spec.to_dict()
+    })
+    
+    with span("db_fetch"):
+        data, more = await fetch_data(query_type, spec)
     
     return {
         **state,
         "query_type": query_type,
+        "classification_source": source,
+        "query_spec": spec.to_dict(),
         "data": data,
-        "messages": state["messages"] + [AIMessage(content=f"Fetched {len(data)} records for {query_type}")],
+        "data_has_more": more,
+        "messages": [AIMessage(content=f"Fetched {len(data)} records for {query_type}")],
         "next_step": "analysis"
     }
 
@@ -0,0 +1,185 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.text import normalize_query
+
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.75"))
+ROUTER_TRAINING_PATH = os.getenv("ROUTER_TRAINING_PATH")
+
+YEAR = r"(?:19|20)\d{2}"
+
+# (category, pattern, weight): subject keywords weigh more than temporal modifiers
+RULES: List[Tuple[str, "re.Pattern", float]] = [
+    ("top_cited", re.compile(r"\b(most|top|highly|highest)\b.*\bcit"), 2.0),
+    ("top_cited", re.compile(r"\bcit(ed|ations?)\b"), 2.0),
+    ("top_cited", re.compile(r"\b(influential|impactful)\b"), 1.0),
+    ("collaboration", re.compile(r"\bcollaborat"), 2.0),
+    ("collaboration", re.compile(r"\bco-?authors?"), 2.0),
+    ("collaboration", re.compile(r"\bauthors?\b"), 1.0),
+    ("papers_by_field", re.compile(r"\bfields?\b"), 2.0),
+    ("papers_by_field", re.compile(r"\b(research areas?|disciplines?|subfields?|topics?)\b"), 2.0),
+    ("year_range", re.compile(rf"\b{YEAR}\s*(-|–|to|through|until|and)\s*{YEAR}\b"), 2.0),
+    ("year_range", re.compile(rf"\b(between|from|since|after|before)\s+{YEAR}\b"), 2.0),
+    ("papers_by_year", re.compile(r"\b(by|per|each|every|over the)\s+years?\b"), 1.0),
+    ("papers_by_year", re.compile(r"\b(yearly|annual(ly)?|over time|trends?)\b"), 1.0),
+    ("papers_by_year", re.compile(r"\b(how many|number of|count of)\s+(papers|publications)\b"), 1.0),
+]
+
+RULE_SMOOTHING = 0.25
+
+@dataclass
+class RouteDecision:
+    query_type: str
+    confidence: float
+    source: str
+
+def score_rules(query: str) -> Dict[str, float]:
+    """Sum of matching rule weights per category"""
+    text = query.lower()
+    scores: Dict[str, float] = defaultdict(float)
+    for category, pattern, weight in RULES:
+        if pattern.search(text):
+            scores[category] += weight
+    return dict(scores)
+
+def rule_decision(query: str) -> Optional[RouteDecision]:
+    """Best rule-based category with confidence top / (total + smoothing)"""
+    scores = score_rules(query)
+    if not scores:
+        return None
+    category, top = max(scores.items(), key=lambda item: item[1])
+    confidence = top / (sum(scores.values()) + RULE_SMOOTHING)
+    return RouteDecision(category, confidence, "rules")
+
+def _ngrams(text: str) -> List[str]:
+    tokens = normalize_query(text).split()
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+class NgramClassifier:
+    """Multinomial naive Bayes over word unigrams and bigrams"""
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.class_counts: Counter = Counter()
+        self.feature_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.vocabulary: set = set()
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> "NgramClassifier":
+        for text, category in examples:
+            features = _ngrams(text)
+            self.class_counts[category] += 1
+            self.feature_counts[category].update(features)
+            self.vocabulary.update(features)
+        return self
+
+    @property
+    def trained(self) -> bool:
+        return len(self.class_counts) > 1
+
+    def predict(self, text: str) -> Optional[RouteDecision]:
+        """Most likely category and its posterior probability"""
+        if not self.trained:
+            return None
+        features = [f for f in _ngrams(text) if f in self.vocabulary]
+        if not features:
+            return None
+        total = sum(self.class_counts.values())
+        vocab = len(self.vocabulary)
+        log_probs = {}
+        for category, count in self.class_counts.items():
+            counts = self.feature_counts[category]
+            denominator = sum(counts.values()) + self.alpha * vocab
+            log_probs[category] = math.log(count / total) + sum(
+                math.log((counts[f] + self.alpha) / denominator) for f in features
+            )
+        best = max(log_probs, key=log_probs.get)
+        norm = sum(math.exp(lp - log_probs[best]) for lp in log_probs.values())
+        return RouteDecision(best, 1.0 / norm, "model")
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Labelled queries from a JSONL log or a classification cache database"""
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return [(row["query"], row["query_type"]) for row in rows]
+    conn = sqlite3.connect(path)
+    try:
+        return list(conn.execute("SELECT key, query_type FROM classifications"))
+    finally:
+        conn.close()
+
+class QueryRouter:
+    """Local classifier that lets `filtering_agent` skip the LLM when confident.
+
+    Rules run first; the optional n-gram model is consulted when the rules are
+    unsure. Every classification is recorded by path (rules, model, cache,
+    llm) so the LLM calls avoided and latency saved can be measured.
+    """
+
+    def __init__(self, threshold: float = 0.75, model: Optional[NgramClassifier] = None):
+        self.threshold = threshold
+        self.model = model
+        self.counts: Counter = Counter()
+        self.latency: Dict[str, float] = defaultdict(float)
+
+    def route(self, query: str) -> Optional[RouteDecision]:
+        """Confident local classification, or None to fall back to the LLM"""
+        decision = rule_decision(query)
+        if decision and decision.confidence >= self.threshold:
+            return decision
+        if self.model is not None:
+            decision = self.model.predict(query)
+            if decision and decision.confidence >= self.threshold:
+                return decision
+        return None
+
+    def train(self, examples: Iterable[Tuple[str, str]]):
+        self.model = NgramClassifier().fit(examples)
+
+    def train_from_logs(self, path: Optional[str] = None) -> int:
+        """Train the n-gram model from logged classifications, if any exist"""
+        path = path or ROUTER_TRAINING_PATH
+        if not path or not os.path.exists(path):
+            return 0
+        examples = load_examples(path)
+        self.train(examples)
+        return len(examples)
+
+    def record(self, source: str, seconds: float):
+        self.counts[source] += 1
+        self.latency[source] += seconds
+
+    def reset_stats(self):
+        self.counts.clear()
+        self.latency.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Classifications per path, mean latency per path and estimated savings"""
+        avg_ms = {
+            source: round(self.latency[source] * 1000 / count, 3)
+            for source, count in self.counts.items()
+        }
+        avoided = sum(count for source, count in self.counts.items() if source != "llm")
+        return {
+            "threshold": self.threshold,
+            "model_trained": bool(self.model and self.model.trained),
+            "counts": dict(self.counts),
+            "avg_latency_ms": avg_ms,
+            "llm_calls_avoided": avoided,
+            "estimated_latency_saved_ms": round(
+                sum(
+                    count * (avg_ms.get("llm", 0.0) - avg_ms[source])
+                    for source, count in self.counts.items() if source != "llm"
+                ),
+                3
+            ) if "llm" in avg_ms else None,
+        }
+
+query_router = QueryRouter(threshold=ROUTER_CONFIDENCE_THRESHOLD)
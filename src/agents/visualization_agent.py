@@ -1,5 +1,7 @@
 from langchain_core.messages import AIMessage
 from src.models.state import AgentState
+from src.utils.columnar import column_values
+from src.utils.reduction import reduce_for_chart
 from typing import Dict, Any
 
 def create_vega_lite_spec(data: list, analysis: Dict[str, Any], user_query: str) -> Dict[str, Any]:
@@ -17,12 +19,14 @@ def create_vega_lite_spec(data: list, analysis: Dict[str, Any], user_query: str)
     
     y_type = "quantitative"
     
+    values, reduction = reduce_for_chart(data, viz_type, x_field, y_field)
+    
     spec = {
         "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
         "description": user_query,
-        "data": {"values": data},
+        "data": {"values": values},
         "mark": {
-            "type": viz_type,
+            "type": "point" if viz_type == "scatter" else viz_type,
             "tooltip": True
         },
         "encoding": {
@@ -54,33 +58,95 @@ def create_vega_lite_spec(data: list, analysis: Dict[str, Any], user_query: str)
     if viz_type == "area":
         spec["mark"] = {"type": "area", "line": True, "point": True, "tooltip": True}
     
+    if {"group_by", "bin", "top_k"} & set(reduction["steps"]):
+        spec["encoding"]["y"]["title"] = f"{y_field} ({reduction['aggregate']})"
+    if "bin" in reduction["steps"]:
+        spec["encoding"]["x"]["bin"] = {"binned": True}
+        spec["encoding"]["x2"] = {"field": f"{x_field}_end"}
+    
     spec["config"] = {
         "view": {"strokeWidth": 0},
         "axis": {"grid": True}
     }
+    spec["usermeta"] = {"reduction": reduction}
     
     return spec
 
+def infer_encoding(data: list) -> Dict[str, Any]:
+    """Pick chart type and x/y fields from the data alone, without the analysis LLM"""
+    if not data:
+        return {"viz_type": "bar", "x_field": "x", "y_field": "y"}
+    
+    row = data[0]
+    fields = list(row.keys())
+    numeric = [f for f in fields if isinstance(row[f], (int, float)) and not isinstance(row[f], bool)]
+    
+    if "year" in fields:
+        x_field = "year"
+    else:
+        categorical = [f for f in fields if f not in numeric]
+        x_field = categorical[0] if categorical else fields[0]
+    
+    measures = [f for f in numeric if f != x_field and not f.endswith("_id")]
+    y_field = "count" if "count" in measures else (measures[0] if measures else fields[-1])
+    
+    distinct_x = len(set(column_values(data, x_field)))
+    if x_field == "year" and distinct_x == len(data) and len(data) > 2:
+        viz_type = "line"
+    elif distinct_x < len(data):
+        viz_type = "scatter" if x_field in numeric else "bar"
+    else:
+        viz_type = "bar"
+    
+    return {"viz_type": viz_type, "x_field": x_field, "y_field": y_field}
+
+def refine_encoding(data: list, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply the analysis' chart choices, keeping heuristic fields it got wrong"""
+    encoding = infer_encoding(data)
+    fields = set(data[0].keys()) if data else set()
+    if analysis.get("viz_type") in ("bar", "line", "area", "scatter", "point"):
+        encoding["viz_type"] = analysis["viz_type"]
+    for key in ("x_field", "y_field"):
+        if analysis.get(key) in fields:
+            encoding[key] = analysis[key]
+    return encoding
+
+async def draft_visualization_agent(state: AgentState) -> AgentState:
+    """Build a heuristic Vega-Lite spec in parallel with the analysis call"""
+    data = state["data"]
+    if not data:
+        return {"draft_vega_spec": None}
+    return {"draft_vega_spec": create_vega_lite_spec(data, infer_encoding(data), state["user_query"])}
+
 async def visualization_agent(state: AgentState) -> AgentState:
     """Generate Vega-Lite visualization specification"""
     data = state["data"]
     analysis_result = state["analysis_result"]
     user_query = state["user_query"]
+    draft_spec = state.get("draft_vega_spec")
+    
+    if data and draft_spec and (not analysis_result or analysis_result.get("timed_out")):
+        return {
+            **state,
+            "vega_spec": draft_spec,
+            "messages": [AIMessage(content="Visualization generated from data heuristics")],
+            "next_step": "end"
+        }
     
     if not data or not analysis_result:
         return {
             **state,
             "vega_spec": None,
-            "messages": state["messages"] + [AIMessage(content="Cannot generate visualization")],
+            "messages": [AIMessage(content="Cannot generate visualization")],
             "next_step": "end"
         }
     
-    vega_spec = create_vega_lite_spec(data, analysis_result, user_query)
+    vega_spec = create_vega_lite_spec(data, refine_encoding(data, analysis_result), user_query)
     
     return {
         **state,
         "vega_spec": vega_spec,
-        "messages": state["messages"] + [AIMessage(content="Visualization generated")],
+        "messages": [AIMessage(content="Visualization generated")],
         "next_step": "end"
     }
 
@@ -1,8 +1,44 @@
-from fastapi import APIRouter, HTTPException
+import hashlib
+import os
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from src.workflow.graph import process_query
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from src.workflow.graph import process_query, stream_query
+from src.agents.filtering_agent import iter_result_rows
+from src.utils.query_spec import QuerySpec, extract_filters
+from src.utils.cache import SingleFlight, TTLCache
+from src.utils.database import (
+    database_fingerprint,
+    get_pool_stats,
+    get_replica_stats,
+    get_result_cache_stats,
+    get_shard_stats,
+    get_statement_stats
+)
+from src.utils.text import normalize_query
+from src.utils.streaming import format_sse
+from src.utils.classification_cache import classification_cache
+from src.agents.query_router import query_router
+from src.utils.llm import llm_provider
+from src.utils.tracing import Trace, set_flag, span, start_trace
+from src.utils.encoding import (
+    COMPRESSION_MIN_SIZE,
+    FastJSONResponse,
+    compress,
+    compress_stream,
+    dumps,
+    negotiate_encoding
+)
 
-router = APIRouter(prefix="/api/v1", tags=["agent"])
+router = APIRouter(prefix="/api/v1", tags=["agent"], default_response_class=FastJSONResponse)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_MAX_AGE = int(os.getenv("RESPONSE_MAX_AGE", "60"))
+
+response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+query_flights = SingleFlight()
 
 class QueryRequest(BaseModel):
     query: str
@@ -13,22 +49,261 @@ class QueryResponse(BaseModel):
     analysis: dict
     vega_spec: dict
     data_count: int
+    classification_source: Optional[str] = None
+    query_spec: Optional[dict] = None
+    has_more: bool = False
+    trace_id: Optional[str] = None
+    timings: Optional[dict] = None
+
+# Only present in `debug=true` responses, which are never cached
+DEBUG_FIELDS = ("trace_id", "timings")
+
+def response_body(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Response fields from a workflow result.
+
+    The workflow already built these values, so they are not validated
+    again; validating would deep-copy the spec and its inline data.
+    """
+    return {
+        name: result.get(name, None if field.is_required() else field.default)
+        for name, field in QueryResponse.model_fields.items()
+        if name not in DEBUG_FIELDS
+    }
+
+def encode_body(body: Dict[str, Any]) -> bytes:
+    """JSON-encode a response body, expanding columnar results into row objects"""
+    return dumps(body)
+
+def compute_etag(payload: bytes) -> str:
+    """Strong ETag over the exact bytes of an encoded response body"""
+    return '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+async def _execute_query(query: str, key: tuple) -> Tuple[Dict[str, Any], str, bytes, Dict[str, bytes]]:
+    result = await process_query(query)
+    
+    if not result.get("vega_spec"):
+        raise HTTPException(status_code=500, detail="Failed to generate visualization")
+    
+    # The spec keeps its columnar data; rows are only materialized while encoding.
+    # The last slot memoizes compressed copies of the payload per content coding.
+    with span("serialization"):
+        body = response_body(result)
+        payload = encode_body(body)
+        entry = (body, compute_etag(payload), payload, {})
+    response_cache.set(key, entry)
+    return entry
+
+async def run_cached_query(query: str) -> Tuple[Dict[str, Any], bytes, str, Dict[str, bytes]]:
+    """Serve a query from the response cache, coalescing concurrent identical misses.
+
+    Returns the response body, its JSON encoding, its ETag and the
+    compressed encodings made so far.
+    """
+    # Normalization drops punctuation and "to", which can decide a year range, so the numeric filters
+    # read from the raw text are part of the key; field names survive normalization as words
+    filters = extract_filters(query, ())
+    key = (normalize_query(query), tuple(sorted(filters.items())), database_fingerprint())
+    entry = response_cache.get(key)
+    if entry is None:
+        # A coalesced request waits on another request's workflow, so its trace holds no stage spans
+        set_flag("response_cache", "coalesced" if key in query_flights else "miss")
+        entry = await query_flights.do(key, lambda: _execute_query(query, key))
+    else:
+        set_flag("response_cache", "hit")
+    body, etag, payload, compressed = entry
+    if body["query"] != query:
+        # Echoing this request's wording makes different bytes, so they get their own validator
+        with span("serialization"):
+            body = _reworded(body, query)
+            payload = encode_body(body)
+            etag, compressed = compute_etag(payload), {}
+    return body, payload, etag, compressed
+
+def _reworded(body: Dict[str, Any], query: str) -> Dict[str, Any]:
+    """A cached body for another wording of its query; the chart spec describes the query it answers"""
+    spec = body.get("vega_spec")
+    if isinstance(spec, dict) and spec.get("description") == body["query"]:
+        # Shallow copies: the spec's inline data stays shared with the cached body
+        spec = {**spec, "description": query}
+    return {**body, "query": query, "vega_spec": spec}
+
+def debug_payload(body: Dict[str, Any], trace: Trace) -> bytes:
+    """A response body extended with the request's trace ID and timing breakdown"""
+    return encode_body({**body, "trace_id": trace.trace_id, "timings": trace.timings()})
+
+async def stream_ndjson(body: Dict[str, Any], payload: bytes) -> AsyncIterator[bytes]:
+    """The response object on the first line, then every row of the full result, one per line"""
+    yield payload + b"\n"
+    spec = body.get("query_spec")
+    async for batch in iter_result_rows(body["query_type"], QuerySpec.from_dict(spec) if spec else None):
+        yield b"".join(dumps(row) + b"\n" for row in batch)
+
+def _representation_etag(etag: str, encoding: Optional[str]) -> str:
+    # Each content coding is a different representation, so it needs its own strong validator
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+def _set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"private, max-age={RESPONSE_MAX_AGE}"
+    response.headers["Vary"] = "Accept-Encoding"
+
+def _negotiate(payload: bytes, accept_encoding: Optional[str]) -> Optional[str]:
+    if len(payload) < COMPRESSION_MIN_SIZE:
+        return None
+    return negotiate_encoding(accept_encoding)
+
+def _debug_response(payload: bytes, trace: Trace, accept_encoding: Optional[str]) -> Response:
+    encoding = _negotiate(payload, accept_encoding)
+    response = Response(content=compress(payload, encoding), media_type="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["X-Trace-Id"] = trace.trace_id
+    return response
+
+def _json_response(payload: bytes, etag: str, compressed: Dict[str, bytes], accept_encoding: Optional[str]) -> Response:
+    # Pre-encoded, so FastAPI's response_model validation and re-encoding are skipped
+    encoding = _negotiate(payload, accept_encoding)
+    if encoding:
+        content = compressed.get(encoding)
+        if content is None:
+            content = compressed[encoding] = compress(payload, encoding)
+    else:
+        content = payload
+    response = Response(content=content, media_type="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    _set_cache_headers(response, _representation_etag(etag, encoding))
+    return response
 
 @router.post("/query", response_model=QueryResponse)
-async def handle_query(request: QueryRequest):
-    """Process user query through multi-agent workflow"""
-    try:
-        result = await process_query(request.query)
-        
-        if not result.get("vega_spec"):
-            raise HTTPException(status_code=500, detail="Failed to generate visualization")
-        
-        return QueryResponse(**result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def handle_query(
+    request: QueryRequest,
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    debug: bool = Query(False),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Process user query through multi-agent workflow.
+
+    With `format=ndjson` the complete data set follows the response as
+    newline-delimited JSON rows, streamed in bounded batches. Responses
+    are gzip or brotli compressed when the client accepts it. With
+    `debug=true` the response also carries a trace ID and a per-stage
+    timing breakdown with cache outcomes.
+    """
+    with start_trace(debug) as trace:
+        try:
+            body, payload, etag, compressed = await run_cached_query(request.query)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    if trace is not None:
+        payload = debug_payload(body, trace)
+    
+    if output_format == "ndjson":
+        # Row streams grow past any size threshold, so only the client's preference matters
+        encoding = negotiate_encoding(accept_encoding)
+        response = StreamingResponse(
+            compress_stream(stream_ndjson(body, payload), encoding),
+            media_type="application/x-ndjson"
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        if trace is not None:
+            response.headers["X-Trace-Id"] = trace.trace_id
+        return response
+    if trace is not None:
+        return _debug_response(payload, trace, accept_encoding)
+    return _json_response(payload, etag, compressed, accept_encoding)
+
+@router.get("/query", response_model=QueryResponse)
+async def handle_query_get(
+    query: str = Query(...),
+    debug: bool = Query(False),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Cacheable variant of the query endpoint supporting conditional requests"""
+    with start_trace(debug) as trace:
+        try:
+            body, payload, etag, compressed = await run_cached_query(query)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    if trace is not None:
+        return _debug_response(debug_payload(body, trace), trace, accept_encoding)
+    
+    if if_none_match:
+        current = _representation_etag(etag, _negotiate(payload, accept_encoding))
+        if {etag, current} & {tag.strip() for tag in if_none_match.split(",")}:
+            not_modified = Response(status_code=304)
+            _set_cache_headers(not_modified, current)
+            return not_modified
+    
+    return _json_response(payload, etag, compressed, accept_encoding)
+
+@router.post("/query/stream")
+async def handle_query_stream(request: QueryRequest):
+    """Stream per-stage results of the workflow as server-sent events"""
+    async def events():
+        try:
+            async for event, payload in stream_query(request.query):
+                yield format_sse(event, payload)
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "message": "SciSciNet Agent API"}
 
+@router.get("/stats/db-pool")
+async def db_pool_stats():
+    """Database connection pool usage"""
+    return get_pool_stats()
+
+@router.get("/stats/statements")
+async def statement_stats():
+    """Per-statement executions, time, rows and estimated prepares"""
+    return get_statement_stats()
+
+@router.get("/stats/replica")
+async def replica_stats():
+    """In-memory replica size and per-statement usage"""
+    return get_replica_stats()
+
+@router.get("/stats/shards")
+async def shard_stats():
+    """Shard catalog routing and per-shard query statistics"""
+    return get_shard_stats()
+
+@router.get("/stats/result-cache")
+async def result_cache_stats():
+    """Aggregate query result cache usage"""
+    return get_result_cache_stats()
+
+@router.get("/stats/classification-cache")
+async def classification_cache_stats():
+    """Query classification cache usage"""
+    return classification_cache.stats()
+
+@router.get("/stats/query-router")
+async def query_router_stats():
+    """Classification paths taken and LLM calls avoided"""
+    return query_router.stats()
+
+@router.get("/stats/response-cache")
+async def response_cache_stats():
+    """Full-response cache usage and coalesced requests"""
+    return {**response_cache.stats(), "coalesced": query_flights.coalesced, "inflight": len(query_flights)}
+
+@router.get("/stats/llm")
+async def llm_stats():
+    """LLM call latency and HTTP connection reuse"""
+    return llm_provider.stats()
@@ -1,15 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import os
 from src.api.routes import router
+from src.workflow.graph import workflow_registry
+from src.utils.database import init_db_pool, close_db_pool
+from src.agents.query_router import query_router
+from src.utils.llm import llm_provider
+from src.utils.metrics import metrics
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared resources once at startup and release them at shutdown"""
+    workflow_registry.warmup()
+    query_router.train_from_logs()
+    llm_provider.start()
+    await init_db_pool()
+    yield
+    await close_db_pool()
+    await llm_provider.close()
+
 app = FastAPI(
     title="SciSciNet Agent API",
     description="Multi-agent LLM framework for automated data analysis and visualization",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -31,6 +50,11 @@ async def root():
         "docs": "/docs"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Node, SQL and LLM latency histograms in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
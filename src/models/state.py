@@ -7,8 +7,12 @@ class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
     user_query: str
     query_type: Optional[str]
+    classification_source: Optional[str]
+    query_spec: Optional[Dict[str, Any]]
     data: Optional[list]
+    data_has_more: Optional[bool]
     analysis_result: Optional[Dict[str, Any]]
+    draft_vega_spec: Optional[Dict[str, Any]]
     vega_spec: Optional[Dict[str, Any]]
     next_step: Optional[str]
 
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+class TTLCache:
+    """In-memory LRU cache with an optional per-entry time-to-live"""
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.reset_stats()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or `default` if missing or expired"""
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key, _MISSING)
+        return entry is not _MISSING and (entry[0] is None or entry[0] > self._clock())
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+def file_fingerprint(path: str) -> Optional[Tuple[int, int, int]]:
+    """Identify the current version of a file by inode, size and mtime"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The shared call runs as its own task, so a cancelled caller does not
+    cancel the work the other callers are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` unless a call for `key` is already running, then share its result"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from src.utils.cache import TTLCache
+from src.utils.text import normalize_query
+
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "1024"))
+CLASSIFICATION_CACHE_TTL = float(os.getenv("CLASSIFICATION_CACHE_TTL", "86400"))
+CLASSIFICATION_CACHE_PATH = os.getenv("CLASSIFICATION_CACHE_PATH")
+
+class ClassificationCache:
+    """Two-tier cache of query classifications keyed by normalized query text.
+
+    The in-memory LRU tier answers repeat questions within a process. The
+    optional SQLite tier survives restarts; disk hits are promoted to memory.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, path: Optional[str] = None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = maxsize * 10
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._init_disk()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def _init_disk(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS classifications "
+                    "(key TEXT PRIMARY KEY, query_type TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT query_type, created_at FROM classifications WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            with conn:
+                if self.ttl is not None and row[1] + self.ttl <= now:
+                    conn.execute("DELETE FROM classifications WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE classifications SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+        finally:
+            conn.close()
+
+    def _disk_set(self, key: str, query_type: str):
+        conn = self._connect()
+        try:
+            now = time.time()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO classifications (key, query_type, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, query_type, now, now)
+                )
+                conn.execute(
+                    "DELETE FROM classifications WHERE key IN ("
+                    "SELECT key FROM classifications ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+        finally:
+            conn.close()
+
+    async def get(self, query: str) -> Optional[str]:
+        """Cached classification for a query, if any"""
+        key = normalize_query(query)
+        query_type = self.memory.get(key)
+        if query_type is not None:
+            return query_type
+        if self.path:
+            query_type = await asyncio.to_thread(self._disk_get, key)
+            if query_type is not None:
+                self.disk_hits += 1
+                self.memory.set(key, query_type)
+                return query_type
+        self.misses += 1
+        return None
+
+    async def set(self, query: str, query_type: str):
+        """Remember the classification for a query in every tier"""
+        key = normalize_query(query)
+        self.memory.set(key, query_type)
+        if self.path:
+            await asyncio.to_thread(self._disk_set, key, query_type)
+
+    def clear(self):
+        self.memory.clear()
+        if self.path:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM classifications")
+            finally:
+                conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per tier"""
+        lookups = self.memory.hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_size": len(self.memory),
+            "disk_enabled": bool(self.path),
+        }
+
+classification_cache = ClassificationCache(
+    maxsize=CLASSIFICATION_CACHE_SIZE,
+    ttl=CLASSIFICATION_CACHE_TTL,
+    path=CLASSIFICATION_CACHE_PATH
+)
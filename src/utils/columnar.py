@@ -0,0 +1,104 @@
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+class ColumnarResult(Sequence):
+    """Query result stored as one immutable tuple per column.
+
+    Behaves as a read-only sequence of row dicts, so code written against
+    `List[Dict]` keeps working, but rows are only built when indexed or
+    iterated. Consumers that care about speed read whole columns with
+    `column()` / `array()`, and the API encodes it straight to JSON.
+    """
+
+    __slots__ = ("names", "columns", "_length")
+
+    def __init__(self, names: Iterable[str], columns: Iterable[Tuple[Any, ...]], length: Optional[int] = None):
+        self.names: Tuple[str, ...] = tuple(names)
+        self.columns: Tuple[Tuple[Any, ...], ...] = tuple(tuple(col) for col in columns)
+        if len(self.names) != len(self.columns):
+            raise ValueError("Column names and columns differ in length")
+        self._length = len(self.columns[0]) if self.columns else (length or 0)
+
+    @classmethod
+    def from_rows(cls, names: Iterable[str], rows: List[Tuple[Any, ...]]) -> "ColumnarResult":
+        """Transpose row tuples (as returned by a DB cursor) into columns"""
+        names = tuple(names)
+        if not rows:
+            return cls(names, [() for _ in names])
+        return cls(names, zip(*rows))
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "ColumnarResult":
+        if not records:
+            return cls((), ())
+        names = tuple(records[0].keys())
+        return cls(names, [tuple(row.get(name) for row in records) for name in names])
+
+    @classmethod
+    def coerce(cls, data: Any) -> Any:
+        """Wrap a list of row dicts; pass through None and existing columnar results"""
+        if data is None or isinstance(data, cls):
+            return data
+        return cls.from_records(list(data))
+
+    def column(self, name: str) -> Tuple[Any, ...]:
+        return self.columns[self.names.index(name)]
+
+    def array(self, name: str, dtype=float) -> np.ndarray:
+        """Column as a NumPy array, with NULLs as NaN for numeric dtypes"""
+        values = self.column(name)
+        if np.dtype(dtype).kind == "f":
+            return np.array([np.nan if v is None else v for v in values], dtype=dtype)
+        return np.array(values, dtype=dtype)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        names = self.names
+        return [dict(zip(names, row)) for row in zip(*self.columns)]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        return {name: list(col) for name, col in zip(self.names, self.columns)}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ColumnarResult(self.names, [col[index] for col in self.columns])
+        return {name: col[index] for name, col in zip(self.names, self.columns)}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        names = self.names
+        for row in zip(*self.columns):
+            yield dict(zip(names, row))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ColumnarResult):
+            return self.names == other.names and self.columns == other.columns
+        if isinstance(other, list):
+            return self.to_records() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ColumnarResult(columns={list(self.names)}, rows={len(self)})"
+
+def column_values(data: Any, name: str) -> Sequence:
+    """One column's values for either representation"""
+    if isinstance(data, ColumnarResult):
+        return data.column(name)
+    return [row.get(name) for row in data]
+
+def records(data: Any) -> List[Dict[str, Any]]:
+    """Row dicts for either representation"""
+    if isinstance(data, ColumnarResult):
+        return data.to_records()
+    return list(data or [])
+
+def json_default(obj: Any) -> Any:
+    """`default=` hook letting JSON encoders serialize columnar results and NumPy scalars"""
+    if isinstance(obj, ColumnarResult):
+        return obj.to_records()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
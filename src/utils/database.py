@@ -1,67 +1,396 @@
 import aiosqlite
+import asyncio
+import logging
 import os
-from typing import List, Dict, Any
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
+from src.utils.pool import ConnectionPool, ReadProfile, read_only_uri
+from src.utils.statements import StatementRegistry
+from src.utils.cache import TTLCache, file_fingerprint
+from src.utils.columnar import ColumnarResult
+from src.utils.metrics import record_sql
+from src.utils.tracing import set_flag, span
+from src.utils.query_spec import AUTHOR_METRICS, QuerySpec
+from src.utils.replica import ROW_STATEMENTS, ColumnarReplica
+from src.utils.shards import ShardCatalog
+from src.utils.summary_tables import SUMMARIES, META_TABLE, meta_query, source_signature
+
+logger = logging.getLogger(__name__)
 
 DATABASE_PATH = os.getenv("DATABASE_PATH", "data/sciscinet_vt_cs_2013_2022.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "128"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+ROW_BATCH_SIZE = int(os.getenv("ROW_BATCH_SIZE", "1000"))
+ROW_PAGE_SIZE = int(os.getenv("ROW_PAGE_SIZE", "10000"))
+STATEMENT_CACHE_SIZE = int(os.getenv("STATEMENT_CACHE_SIZE", "128"))
+DB_READ_PROFILE = os.getenv("DB_READ_PROFILE", "true").lower() not in ("0", "false", "no")
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_MMAP_LIMIT = int(os.getenv("DB_MMAP_LIMIT", str(1 << 34)))
+DB_WARMUP = os.getenv("DB_WARMUP", "false").lower() not in ("0", "false", "no")
+DB_REPLICA = os.getenv("DB_REPLICA", "false").lower() not in ("0", "false", "no")
+DB_SHARD_CATALOG = os.getenv("DB_SHARD_CATALOG", "")
+DB_SHARD_POOL_SIZE = int(os.getenv("DB_SHARD_POOL_SIZE", "2"))
+DB_STREAM_CONNECTIONS = int(os.getenv("DB_STREAM_CONNECTIONS", "16"))
+# Tables the canned queries read; their summary tables are warmed too when present
+WARMUP_TABLES = ("papers", "fields", "paper_fields", "paper_author_affiliations")
+
+read_profile = ReadProfile(cache_size_kb=DB_CACHE_SIZE_KB, mmap_limit=DB_MMAP_LIMIT) if DB_READ_PROFILE else None
+db_pool = ConnectionPool(DATABASE_PATH, size=DB_POOL_SIZE, cached_statements=STATEMENT_CACHE_SIZE, profile=read_profile)
+statements = StatementRegistry(STATEMENT_CACHE_SIZE)
+# Streams are paced by their clients, so they get their own bounded set of connections
+stream_slots = asyncio.Semaphore(DB_STREAM_CONNECTIONS)
+result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+_summary_freshness: Dict[str, tuple] = {}
+replica: Optional[ColumnarReplica] = None
+shard_catalog: Optional[ShardCatalog] = None
+
+async def init_db_pool():
+    """Open the shared connection pool; queries fall back to per-call connections without it"""
+    if DB_SHARD_CATALOG:
+        await open_shard_catalog(DB_SHARD_CATALOG)
+    if not os.path.exists(DATABASE_PATH):
+        logger.warning("Database %s not found, connection pool disabled", DATABASE_PATH)
+        return
+    await db_pool.open()
+    if DB_REPLICA:
+        await load_replica()
+    if DB_WARMUP:
+        start = time.perf_counter()
+        warmed = await warm_page_cache()
+        logger.info("Warmed %d tables and indexes in %.2fs", len(warmed), time.perf_counter() - start)
+
+async def warm_page_cache(tables: Tuple[str, ...] = WARMUP_TABLES) -> Dict[str, float]:
+    """Read every page of the hot tables and their indexes once; returns seconds per b-tree.
+
+    The pages land in the OS page cache, which memory-mapped connections
+    read in place, so one pass warms every pooled connection.
+    """
+    tables = tables + tuple(summary["table"] for summary in SUMMARIES.values())
+    warmed: Dict[str, float] = {}
+    async with _connection() as db:
+        async with db.execute("SELECT name FROM sqlite_master WHERE type = 'table'") as cursor:
+            existing = {row[0] for row in await cursor.fetchall()}
+        for table in tables:
+            if table not in existing:
+                continue
+            # NOT INDEXED makes COUNT(*) walk the table itself instead of its smallest index
+            scans = {table: f'SELECT COUNT(*) FROM "{table}" NOT INDEXED'}
+            async with db.execute(f'PRAGMA index_list("{table}")') as cursor:
+                indexes = [row[1] for row in await cursor.fetchall()]
+            for index in indexes:
+                async with db.execute(f'PRAGMA index_info("{index}")') as cursor:
+                    column = (await cursor.fetchone())[2]
+                if column is not None:
+                    scans[index] = f'SELECT COUNT("{column}") FROM "{table}" INDEXED BY "{index}"'
+            for name, query in scans.items():
+                start = time.perf_counter()
+                async with db.execute(query) as cursor:
+                    await cursor.fetchall()
+                warmed[name] = time.perf_counter() - start
+    return warmed
+
+async def close_db_pool():
+    """Drain and close the shared connection pool"""
+    global replica, shard_catalog
+    replica = None
+    if shard_catalog is not None:
+        await shard_catalog.close()
+        shard_catalog = None
+    await db_pool.close()
+
+async def open_shard_catalog(path: str):
+    """Open one pool per shard listed in a catalog file; canned statements then fan out across them.
+
+    Only the canned statements are routed to shards, so the catalog is
+    refused when `DATABASE_PATH` is missing: query specs and ad-hoc SQL
+    would have nothing to run against.
+    """
+    global shard_catalog
+    if not os.path.exists(DATABASE_PATH):
+        logger.warning("Shard catalog %s disabled: query specs need the database %s", path, DATABASE_PATH)
+        return
+    try:
+        catalog = ShardCatalog.from_file(
+            path, pool_size=DB_SHARD_POOL_SIZE, cached_statements=STATEMENT_CACHE_SIZE, profile=read_profile
+        )
+        await catalog.open(_fetch_columnar)
+    except (OSError, KeyError, TypeError, ValueError, sqlite3.Error) as e:
+        logger.warning("Shard catalog %s disabled: %s", path, e)
+        return
+    shard_catalog = catalog
+    logger.info("Opened shard catalog %s with %d shards", path, len(catalog.shards))
+
+async def load_replica():
+    """Load the in-memory replica; queries keep going to SQLite if it cannot be built"""
+    global replica
+    try:
+        replica = await asyncio.to_thread(ColumnarReplica.load, DATABASE_PATH)
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning("In-memory replica disabled: %s", e)
+        replica = None
+        return
+    logger.info(
+        "Loaded in-memory replica of %d papers (%.0f MB) in %.1fs",
+        replica.papers, replica.memory_bytes / 2**20, replica.load_seconds
+    )
+
+def _live_replica() -> Optional[ColumnarReplica]:
+    """The replica, unless the database file has changed since it was loaded"""
+    current = replica
+    if current is None or current.fingerprint != file_fingerprint(DATABASE_PATH):
+        return None
+    return current
+
+def get_replica_stats() -> Dict[str, Any]:
+    """Size and per-statement usage of the in-memory replica"""
+    if replica is None:
+        return {"loaded": False}
+    return {"loaded": True, "stale": _live_replica() is None, **replica.stats()}
+
+def get_shard_stats() -> Dict[str, Any]:
+    """Per-shard queries, time and pools of the shard catalog"""
+    if shard_catalog is None:
+        return {"configured": False}
+    return {"configured": True, **shard_catalog.stats()}
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Usage statistics for the shared connection pool"""
+    return db_pool.stats()
+
+def get_statement_stats() -> Dict[str, Any]:
+    """Executions, time, rows and estimated prepares per named statement"""
+    return statements.stats()
+
+def get_result_cache_stats() -> Dict[str, Any]:
+    """Hit/miss statistics for the aggregate result cache"""
+    return result_cache.stats()
+
+def database_fingerprint():
+    """Identity of the database file, and of every shard file when a catalog is open, used to key cached results"""
+    fingerprint = file_fingerprint(DATABASE_PATH)
+    if shard_catalog is None or fingerprint is None:
+        return fingerprint
+    # Query specs and ad-hoc SQL still read the database file, so it stays part of the identity
+    shards = shard_catalog.fingerprint()
+    return None if shards is None else (fingerprint, shards)
 
 async def get_db_connection():
     """Get async database connection"""
     return await aiosqlite.connect(DATABASE_PATH)
 
-async def execute_query(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-    """Execute a query and return results as list of dicts"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+def _record(query: str, compiled: bool, seconds: float, rows: int):
+    name = query_label(query)
+    statements.record(name, seconds, rows, compiled)
+    record_sql(name, seconds, rows)
+
+async def _fetch_columnar(db: aiosqlite.Connection, query: str, params: tuple) -> ColumnarResult:
+    compiled = statements.note_execution(db, query)
+    start = time.perf_counter()
+    with span("sql"):
         async with db.execute(query, params) as cursor:
+            # Plain tuples transpose into columns without building a Row object per record
+            cursor.row_factory = None
             rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            _record(query, compiled, time.perf_counter() - start, len(rows))
+            return ColumnarResult.from_rows([column[0] for column in cursor.description], rows)
 
-async def get_papers_by_year() -> List[Dict[str, Any]]:
-    """Get count of papers by year"""
-    query = """
+@asynccontextmanager
+async def _connection() -> AsyncIterator[aiosqlite.Connection]:
+    if db_pool.is_open:
+        async with db_pool.acquire() as db:
+            yield db
+        return
+    
+    # A throwaway connection compiles every statement afresh
+    async with aiosqlite.connect(DATABASE_PATH, cached_statements=STATEMENT_CACHE_SIZE) as db:
+        yield db
+
+@asynccontextmanager
+async def _read_connection(path: str) -> AsyncIterator[aiosqlite.Connection]:
+    """A read-only connection with the read profile, outside every pool"""
+    async with aiosqlite.connect(read_only_uri(path), uri=True, cached_statements=STATEMENT_CACHE_SIZE) as db:
+        for pragma in read_profile.pragmas(path) if read_profile else ():
+            await db.execute(pragma)
+        yield db
+
+@asynccontextmanager
+async def _stream_connection() -> AsyncIterator[aiosqlite.Connection]:
+    async with stream_slots:
+        async with _read_connection(DATABASE_PATH) as db:
+            yield db
+
+async def _from_replica(query: str, params: tuple) -> Optional[ColumnarResult]:
+    current = _live_replica()
+    name = statements.name_of(query, None)
+    if current is None or not current.supports(name):
+        return None
+    with span("replica"):
+        if name in ROW_STATEMENTS:
+            return await asyncio.to_thread(current.execute, name, params)
+        return current.execute(name, params)
+
+async def _from_shards(query: str, params: tuple) -> Optional[ColumnarResult]:
+    catalog = shard_catalog
+    name = statements.name_of(query, None)
+    if catalog is None or not catalog.supports(name):
+        return None
+    with span("shard_fanout"):
+        return await catalog.execute(name, query, params)
+
+async def _answer(query: str, params: tuple) -> Optional[ColumnarResult]:
+    """A statement's result from the shards or the replica, when either can answer it"""
+    result = await _from_shards(query, params)
+    if result is None:
+        result = await _from_replica(query, params)
+    return result
+
+async def execute_query_columnar(query: str, params: tuple = ()) -> ColumnarResult:
+    """Execute a query and return results as one tuple per column, from the shards or replica when they can answer"""
+    result = await _answer(query, params)
+    if result is not None:
+        return result
+    async with _connection() as db:
+        return await _fetch_columnar(db, query, params)
+
+async def iter_query_batches(query: str, params: tuple = (), batch_size: int = ROW_BATCH_SIZE) -> AsyncIterator[ColumnarResult]:
+    """Yield a query's rows in `fetchmany` batches.
+
+    The cursor stays open while the consumer reads, so it runs on a
+    dedicated connection rather than a pooled one: a slow client then
+    holds one of `DB_STREAM_CONNECTIONS`, never a connection other
+    queries are waiting for. Ordered row statements the shards can answer
+    are merged from one such cursor per shard under a single slot, and a
+    replica year range is built one batch at a time.
+    """
+    name = statements.name_of(query, None)
+    catalog = shard_catalog
+    if catalog is not None and catalog.streams(name):
+        async with stream_slots:
+            async for batch in catalog.stream(name, query, params, _read_connection, batch_size):
+                yield batch
+        return
+    current = _live_replica()
+    batches = current.stream(name, params, batch_size) if current is not None and name in ROW_STATEMENTS else None
+    if batches is not None:
+        for batch in batches:
+            yield batch
+        return
+    result = await _answer(query, params)
+    if result is not None:
+        for start in range(0, len(result), batch_size):
+            yield result[start:start + batch_size]
+        return
+    # Only time spent in SQLite counts, not the consumer's work between batches
+    elapsed, fetched = 0.0, 0
+    async with _stream_connection() as db:
+        compiled = statements.note_execution(db, query)
+        start = time.perf_counter()
+        try:
+            async with db.execute(query, params) as cursor:
+                cursor.row_factory = None
+                names = [column[0] for column in cursor.description]
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    elapsed += time.perf_counter() - start
+                    if not rows:
+                        return
+                    fetched += len(rows)
+                    yield ColumnarResult.from_rows(names, rows)
+                    start = time.perf_counter()
+        finally:
+            _record(query, compiled, elapsed, fetched)
+
+async def execute_query(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    """Execute a query and return results as list of dicts"""
+    return (await execute_query_columnar(query, params)).to_records()
+
+async def execute_cached_query(query: str, params: tuple = (), columnar: bool = False) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    """Execute a query, serving repeats from the result cache until the database file changes"""
+    fingerprint = database_fingerprint()
+    if fingerprint is None:
+        result = await execute_query_columnar(query, params)
+    else:
+        key = (query, params, fingerprint)
+        result = result_cache.get(key)
+        set_flag("result_cache", "miss" if result is None else "hit")
+        if result is None:
+            await db_pool.reopen_if_replaced()
+            if shard_catalog is not None:
+                await shard_catalog.reopen_if_replaced()
+            result = await execute_query_columnar(query, params)
+            result_cache.set(key, result)
+    # Columnar results are immutable, so cached entries can be shared directly
+    return result if columnar else result.to_records()
+
+def _read_signature(sources: Dict[str, Tuple[str, ...]]) -> str:
+    # The checksum needs a Python function, so it runs on its own short-lived connection
+    conn = sqlite3.connect(read_only_uri(DATABASE_PATH), uri=True)
+    try:
+        return source_signature(conn, sources)
+    finally:
+        conn.close()
+
+async def summary_is_fresh(name: str) -> bool:
+    """Whether a materialized summary exists and still matches its source tables"""
+    fingerprint = file_fingerprint(DATABASE_PATH)
+    if fingerprint is None:
+        return False
+    checked = _summary_freshness.get(name)
+    if checked is None or checked[0] != fingerprint:
+        fresh = False
+        tables = await execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (META_TABLE,)
+        )
+        if tables:
+            recorded = await execute_query(meta_query(), (name,))
+            if recorded:
+                current = await asyncio.to_thread(_read_signature, SUMMARIES[name]["sources"])
+                fresh = recorded[0]["signature"] == current
+        checked = (fingerprint, fresh)
+        _summary_freshness[name] = checked
+    return checked[1]
+
+async def execute_aggregate(name: str, raw_query: str, columnar: bool = False) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    """Serve a canned aggregate from its summary table when fresh, else from the raw tables"""
+    # Shards and the replica answer the raw statement, so they come ahead of the summary tables
+    if shard_catalog is None and _live_replica() is None and await summary_is_fresh(name):
+        query = SUMMARIES[name]["select"]
+    else:
+        query = raw_query
+    return await execute_cached_query(query, columnar=columnar)
+
+QUERIES: Dict[str, str] = {
+    "papers_by_year": """
         SELECT year, COUNT(*) as count
         FROM papers
         WHERE year IS NOT NULL
         GROUP BY year
         ORDER BY year
-    """
-    return await execute_query(query)
-
-async def get_papers_by_field() -> List[Dict[str, Any]]:
-    """Get count of papers by field"""
-    query = """
+    """,
+    "papers_by_field": """
         SELECT f.field_name, COUNT(DISTINCT pf.paper_id) as count
         FROM fields f
         JOIN paper_fields pf ON f.field_id = pf.field_id
         GROUP BY f.field_name
         ORDER BY count DESC
-    """
-    return await execute_query(query)
-
-async def get_top_cited_papers(limit: int = 10) -> List[Dict[str, Any]]:
-    """Get top cited papers"""
-    query = """
+    """,
+    "top_cited": """
         SELECT paper_id, title, citation_count, year
         FROM papers
         WHERE citation_count IS NOT NULL
         ORDER BY citation_count DESC
         LIMIT ?
-    """
-    return await execute_query(query, (limit,))
-
-async def get_papers_by_year_range(start_year: int, end_year: int) -> List[Dict[str, Any]]:
-    """Get papers within a year range"""
-    query = """
+    """,
+    "year_range": """
         SELECT paper_id, title, year, citation_count
         FROM papers
         WHERE year >= ? AND year <= ?
         ORDER BY year, citation_count DESC
-    """
-    return await execute_query(query, (start_year, end_year))
-
-async def get_collaboration_stats() -> List[Dict[str, Any]]:
-    """Get collaboration statistics by year"""
-    query = """
+    """,
+    "collaboration": """
         SELECT p.year, COUNT(DISTINCT paa.author_id) as author_count,
                COUNT(DISTINCT p.paper_id) as paper_count
         FROM papers p
@@ -69,6 +398,207 @@ async def get_collaboration_stats() -> List[Dict[str, Any]]:
         WHERE p.year IS NOT NULL
         GROUP BY p.year
         ORDER BY p.year
+    """,
+}
+
+# Keyset pages of a year range in (year, citation_count DESC, paper_id) order,
+# which idx_papers_year_citation serves without sorting
+YEAR_RANGE_PAGE = """
+    SELECT paper_id, title, year, citation_count
+    FROM papers
+    WHERE year >= ? AND year <= ? {after}
+    ORDER BY year, citation_count DESC, paper_id
+    LIMIT ?
+"""
+# NULL citation counts sort last within a year, so continuing from one needs its own predicate
+YEAR_RANGE_AFTER = "AND (year > ? OR (year = ? AND (citation_count < ? OR citation_count IS NULL OR (citation_count = ? AND paper_id > ?))))"
+YEAR_RANGE_AFTER_NULL = "AND (year > ? OR (year = ? AND citation_count IS NULL AND paper_id > ?))"
+
+# Every keyset statement, named for the index advisor
+PAGED_QUERIES: Dict[str, str] = {
+    "year_range_page": YEAR_RANGE_PAGE.format(after=""),
+    "year_range_page_after": YEAR_RANGE_PAGE.format(after=YEAR_RANGE_AFTER),
+    "year_range_page_after_null": YEAR_RANGE_PAGE.format(after=YEAR_RANGE_AFTER_NULL),
+}
+
+FIELD_NAMES = "SELECT field_name FROM fields ORDER BY field_name"
+
+YearRangeKey = Tuple[int, Optional[int], int]
+
+# Named statements; anything else is reported as "adhoc" to bound metric label cardinality
+statements.register_all(QUERIES)
+statements.register_all({f"{name}_summary": summary["select"] for name, summary in SUMMARIES.items()})
+for query in PAGED_QUERIES.values():
+    statements.register("year_range_page", query)
+statements.register("field_names", FIELD_NAMES)
+
+def query_label(query: str) -> str:
+    """Low-cardinality name of a statement for metrics"""
+    return statements.name_of(query, "query_spec" if query.startswith(SPEC_MARKER) else "adhoc")
+
+def _year_range_page(start_year: int, end_year: int, after: Optional[YearRangeKey], limit: int) -> Tuple[str, tuple]:
+    if after is None:
+        return YEAR_RANGE_PAGE.format(after=""), (start_year, end_year, limit)
+    year, citations, paper_id = after
+    start = max(start_year, year)
+    if citations is None:
+        return YEAR_RANGE_PAGE.format(after=YEAR_RANGE_AFTER_NULL), (start, end_year, year, year, paper_id, limit)
+    return (
+        YEAR_RANGE_PAGE.format(after=YEAR_RANGE_AFTER),
+        (start, end_year, year, year, citations, citations, paper_id, limit)
+    )
+
+async def _execute(query: str, params: tuple, columnar: bool) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    result = await execute_query_columnar(query, params)
+    return result if columnar else result.to_records()
+
+async def get_papers_by_year(columnar: bool = False) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    """Get count of papers by year"""
+    return await execute_aggregate("papers_by_year", QUERIES["papers_by_year"], columnar)
+
+async def get_papers_by_field(columnar: bool = False) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    """Get count of papers by field"""
+    return await execute_aggregate("papers_by_field", QUERIES["papers_by_field"], columnar)
+
+async def get_top_cited_papers(limit: int = 10, columnar: bool = False) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    """Get top cited papers"""
+    return await _execute(QUERIES["top_cited"], (limit,), columnar)
+
+async def get_papers_by_year_range(start_year: int, end_year: int, columnar: bool = False) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    """Get papers within a year range"""
+    return await _execute(QUERIES["year_range"], (start_year, end_year), columnar)
+
+async def get_papers_by_year_range_page(
+    start_year: int,
+    end_year: int,
+    after: Optional[YearRangeKey] = None,
+    limit: int = ROW_PAGE_SIZE,
+    columnar: bool = False
+) -> Tuple[Union[List[Dict[str, Any]], ColumnarResult], Optional[YearRangeKey]]:
+    """One keyset page of a year range and the key to continue after, or None on the last page"""
+    query, params = _year_range_page(start_year, end_year, after, limit)
+    page = await execute_query_columnar(query, params)
+    next_after = None
+    if len(page) == limit:
+        last = page[-1]
+        next_after = (last["year"], last["citation_count"], last["paper_id"])
+    return (page if columnar else page.to_records()), next_after
+
+async def iter_papers_by_year_range(
+    start_year: int,
+    end_year: int,
+    batch_size: int = ROW_BATCH_SIZE,
+    page_size: int = ROW_PAGE_SIZE,
+    after: Optional[YearRangeKey] = None
+) -> AsyncIterator[ColumnarResult]:
+    """Yield a year range in row batches, one keyset page at a time.
+
+    Each page is fetched whole and its connection returned to the pool
+    before the first batch is yielded, so a slow consumer holds at most
+    `page_size` rows and never a connection.
+    """
+    while True:
+        query, params = _year_range_page(start_year, end_year, after, page_size)
+        page = await execute_query_columnar(query, params)
+        for start in range(0, len(page), batch_size):
+            yield page[start:start + batch_size]
+        if len(page) < page_size:
+            return
+        last = page[-1]
+        after = (last["year"], last["citation_count"], last["paper_id"])
+
+async def get_collaboration_stats(columnar: bool = False) -> Union[List[Dict[str, Any]], ColumnarResult]:
+    """Get collaboration statistics by year"""
+    return await execute_aggregate("collaboration", QUERIES["collaboration"], columnar)
+
+async def get_field_names() -> List[str]:
+    """Names of all research fields, used to recognise field filters in queries"""
+    if database_fingerprint() is None:
+        return []
+    return list((await execute_cached_query(FIELD_NAMES, columnar=True)).column("field_name"))
+
+# Marks compiled statements so metrics can label them without one series per filter combination
+SPEC_MARKER = "/* query_spec */"
+
+SPEC_PAPER_COLUMNS = "p.paper_id, p.title, p.year, p.citation_count"
+SPEC_GROUP_KEYS = {"year": "p.year AS year", "field": "f.field_name AS field_name"}
+SPEC_FIELD_JOIN = "JOIN paper_fields pf ON pf.paper_id = p.paper_id JOIN fields f ON f.field_id = pf.field_id"
+SPEC_AUTHOR_JOIN = "JOIN paper_author_affiliations paa ON paa.paper_id = p.paper_id"
+SPEC_FIELD_FILTER = "p.paper_id IN (SELECT pf.paper_id FROM paper_fields pf JOIN fields f ON f.field_id = pf.field_id WHERE f.field_name IN ({marks}))"
+SPEC_ORDERS = {"year": "p.year, p.citation_count DESC, p.paper_id", "citations": "p.citation_count DESC, p.paper_id"}
+
+def compile_query_spec(spec: QuerySpec, limit: Optional[int] = None) -> Tuple[str, tuple]:
+    """One parameterized statement for a query spec.
+
+    Filters land in the WHERE clause as sargable comparisons on
+    papers.year and papers.citation_count, and field filters as an IN
+    subquery over paper_fields, so the recommended indexes serve them and
+    papers matching several fields are not duplicated.
     """
-    return await execute_query(query)
+    joins: List[str] = []
+    where: List[str] = []
+    params: list = []
+    by_field = spec.group_by == "field"
+    if by_field:
+        joins.append(SPEC_FIELD_JOIN)
+    if AUTHOR_METRICS & set(spec.metrics) and spec.group_by:
+        joins.append(SPEC_AUTHOR_JOIN)
+    if spec.group_by == "year":
+        where.append("p.year IS NOT NULL")
+    if spec.order_by == "citations" and not spec.group_by:
+        where.append("p.citation_count IS NOT NULL")
+    for clause, value in (("p.year >= ?", spec.year_from), ("p.year <= ?", spec.year_to), ("p.citation_count >= ?", spec.min_citations)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    if spec.fields:
+        marks = ", ".join("?" * len(spec.fields))
+        where.append(f"f.field_name IN ({marks})" if by_field else SPEC_FIELD_FILTER.format(marks=marks))
+        params.extend(spec.fields)
+    
+    if spec.group_by:
+        # Joins fan rows out per field or author, so papers are then counted distinctly
+        papers = "COUNT(DISTINCT p.paper_id)" if joins else "COUNT(*)"
+        expressions = {
+            "count": papers,
+            "paper_count": papers,
+            "author_count": "COUNT(DISTINCT paa.author_id)",
+            "citations": "SUM(p.citation_count)",
+            "mean_citations": "AVG(p.citation_count)",
+        }
+        key = SPEC_GROUP_KEYS[spec.group_by]
+        select = ", ".join([key] + [f"{expressions[metric]} AS {metric}" for metric in spec.metrics])
+        group = key.split(" AS ")[0]
+        order = "year" if spec.group_by == "year" else f"{spec.metrics[0]} DESC"
+        tail = f"GROUP BY {group} ORDER BY {order}"
+    else:
+        select = SPEC_PAPER_COLUMNS
+        tail = f"ORDER BY {SPEC_ORDERS[spec.order_by]}"
+    
+    limits = [value for value in (spec.limit, limit) if value is not None]
+    if limits:
+        tail += " LIMIT ?"
+        params.append(min(limits))
+    query = " ".join(
+        [SPEC_MARKER, f"SELECT {select} FROM papers p"] + joins
+        + ([f"WHERE {' AND '.join(where)}"] if where else []) + [tail]
+    )
+    return query, tuple(params)
 
+async def execute_query_spec(
+    spec: QuerySpec,
+    row_limit: Optional[int] = None,
+    columnar: bool = False
+) -> Tuple[Union[List[Dict[str, Any]], ColumnarResult], bool]:
+    """Run a query spec, returning at most `row_limit` rows and whether more matched"""
+    probe = row_limit + 1 if row_limit is not None else None
+    query, params = compile_query_spec(spec, probe)
+    # Aggregates are small and repeat often; paper rows go straight to the caller
+    if spec.group_by:
+        result = await execute_cached_query(query, params, columnar=True)
+    else:
+        result = await execute_query_columnar(query, params)
+    more = probe is not None and len(result) == probe
+    if more:
+        result = result[:row_limit]
+    return (result if columnar else result.to_records()), more
@@ -0,0 +1,78 @@
+import gzip
+import os
+import zlib
+from typing import Any, AsyncIterator, Dict, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from src.utils.columnar import json_default
+
+try:
+    import brotli
+except ImportError:  # optional: install the "compression" extra
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes via orjson, expanding columnar results and NumPy values"""
+    return orjson.dumps(obj, default=json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred content coding from an Accept-Encoding header, favouring brotli on ties"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(payload: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(payload, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)
+    return payload
+
+async def compress_stream(chunks: AsyncIterator[bytes], encoding: Optional[str]) -> AsyncIterator[bytes]:
+    """Compress a streamed body incrementally, flushing after every chunk so clients see rows promptly"""
+    if encoding is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        async for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
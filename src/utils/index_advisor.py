@@ -0,0 +1,105 @@
+"""Index advisor for the SciSciNet schema.
+
+Reports the `EXPLAIN QUERY PLAN` of every registered query, flagging full
+table scans and temporary B-trees, and creates the recommended indexes as an
+offline maintenance step:
+
+    python -m src.utils.index_advisor report --db data/sciscinet_vt_cs_2013_2022.db
+    python -m src.utils.index_advisor apply --db data/sciscinet_vt_cs_2013_2022.db
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from src.utils.database import PAGED_QUERIES, QUERIES
+
+SAMPLE_PARAMS: Dict[str, tuple] = {
+    "top_cited": (10,),
+    "year_range": (2013, 2022),
+    "year_range_page": (2013, 2022, 500),
+    "year_range_page_after_null": (2015, 2022, 2015, 2015, 1000, 500),
+    "year_range_page_after": (2015, 2022, 2015, 2015, 40, 40, 1000, 500),
+}
+
+RECOMMENDED_INDEXES: List[Tuple[str, str, str]] = [
+    ("idx_papers_year_citation", "papers", "year, citation_count DESC"),
+    ("idx_papers_citation", "papers", "citation_count"),
+    ("idx_fields_name", "fields", "field_name, field_id"),
+    ("idx_paper_fields_field_paper", "paper_fields", "field_id, paper_id"),
+    ("idx_paa_paper_author", "paper_author_affiliations", "paper_id, author_id"),
+]
+
+def explain(conn: sqlite3.Connection, query: str, params: tuple = ()) -> List[str]:
+    """Plan steps SQLite chooses for a query"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+def plan_issues(steps: List[str]) -> List[str]:
+    """Full table scans and temporary B-trees found in a plan"""
+    issues = []
+    for step in steps:
+        if step.startswith("SCAN ") and " INDEX " not in step:
+            issues.append(f"full scan: {step[5:]}")
+        elif "USE TEMP B-TREE" in step:
+            issues.append(f"temp b-tree: {step.split('FOR ', 1)[-1]}")
+    return issues
+
+def advise(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    """Plan and issues for every registered query, keyset pages included"""
+    report = {}
+    for name, query in {**QUERIES, **PAGED_QUERIES}.items():
+        steps = explain(conn, query, SAMPLE_PARAMS.get(name, ()))
+        report[name] = {"plan": steps, "issues": plan_issues(steps)}
+    return report
+
+def missing_indexes(conn: sqlite3.Connection) -> List[Tuple[str, str, str]]:
+    """Recommended indexes not yet present in the database"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [idx for idx in RECOMMENDED_INDEXES if idx[0] not in existing and idx[1] in tables]
+
+def create_indexes(conn: sqlite3.Connection) -> List[Tuple[str, float]]:
+    """Create missing recommended indexes and refresh planner statistics"""
+    created = []
+    for name, table, columns in missing_indexes(conn):
+        start = time.perf_counter()
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        created.append((name, time.perf_counter() - start))
+    if created:
+        conn.execute("ANALYZE")
+    conn.commit()
+    return created
+
+def print_report(report: Dict[str, Dict[str, Any]]):
+    for name, entry in report.items():
+        status = "ok" if not entry["issues"] else f"{len(entry['issues'])} issue(s)"
+        print(f"{name}: {status}")
+        for step in entry["plan"]:
+            print(f"    {step}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect query plans and create recommended indexes")
+    parser.add_argument("command", choices=["report", "apply"])
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", "data/sciscinet_vt_cs_2013_2022.db"))
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "apply":
+            for name, seconds in create_indexes(conn):
+                print(f"created {name} in {seconds:.2f}s")
+        print_report(advise(conn))
+        for name, table, columns in missing_indexes(conn):
+            print(f"missing index: {name} ON {table} ({columns})")
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
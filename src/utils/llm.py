@@ -0,0 +1,209 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+import anthropic
+import httpx
+from langchain_core.messages import AIMessage, convert_to_messages
+
+from src.utils.metrics import record_llm
+from src.utils.tracing import span
+
+LLM_MODEL = os.getenv("LLM_MODEL", "claude-sonnet-4-5")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "4096"))
+
+# LangChain message types to Messages API roles; system messages go in their own parameter
+_ROLES = {"human": "user", "ai": "assistant"}
+
+class AnthropicChat:
+    """Chat model calling the Anthropic Messages API through a caller-supplied client.
+
+    Takes the same message lists as LangChain chat models (message objects
+    or role/content dicts) and returns an `AIMessage` with usage metadata,
+    so agents can use either interchangeably.
+    """
+
+    def __init__(self, client: anthropic.AsyncAnthropic, model: str, temperature: float = 0, max_tokens: int = LLM_MAX_TOKENS):
+        self.client = client
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        system, turns = [], []
+        for message in convert_to_messages(messages):
+            if message.type == "system":
+                system.append(message.text)
+            else:
+                turns.append({"role": _ROLES[message.type], "content": message.content})
+        params = {"model": self.model, "max_tokens": self.max_tokens, "temperature": self.temperature, "messages": turns}
+        if system:
+            params["system"] = "\n\n".join(system)
+        response = await self.client.messages.create(**{**params, **kwargs})
+        usage = response.usage
+        return AIMessage(
+            content="".join(block.text for block in response.content if block.type == "text"),
+            response_metadata={"model": response.model, "stop_reason": response.stop_reason},
+            usage_metadata={
+                "input_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
+                "total_tokens": usage.input_tokens + usage.output_tokens,
+            }
+        )
+
+class PooledLLM:
+    """Shared chat model whose calls are bounded by the provider's concurrency limit"""
+
+    def __init__(self, model: Any, provider: "LLMClientProvider"):
+        self.model = model
+        self._provider = provider
+
+    async def ainvoke(self, messages, **kwargs):
+        async with self._provider.semaphore:
+            self._provider.in_flight += 1
+            start = time.perf_counter()
+            response = None
+            try:
+                with span("llm_call"):
+                    response = await self.model.ainvoke(messages, **kwargs)
+                return response
+            finally:
+                elapsed = time.perf_counter() - start
+                self._provider.in_flight -= 1
+                self._provider._record_call(elapsed)
+                record_llm(elapsed, getattr(response, "usage_metadata", None))
+
+class LLMClientProvider:
+    """Process-wide source of chat models sharing one keep-alive HTTP connection pool.
+
+    Models are built once per temperature and reused across requests. Tests
+    can swap the model factory with `override()` or point `base_url` at a
+    local stub server.
+    """
+
+    def __init__(
+        self,
+        model: str = LLM_MODEL,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_MAX_KEEPALIVE,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.model = model
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.max_concurrency = max_concurrency
+        self.base_url = base_url
+        self.transport = transport
+        self._factory: Optional[Callable[[float], Any]] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[anthropic.AsyncAnthropic] = None
+        self._models: Dict[float, PooledLLM] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.reset_stats()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=self.limits,
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            transport=self.transport,
+            event_hooks={"request": [self._on_request]}
+        )
+
+    def _build_model(self, temperature: float) -> Any:
+        if self._factory is not None:
+            return self._factory(temperature)
+        if self._client is None:
+            self._http_client = self._build_http_client()
+            # The SDK takes the HTTP client as a constructor argument, so every model shares its pool
+            kwargs = {"http_client": self._http_client}
+            if self.base_url:
+                kwargs["base_url"] = self.base_url
+            self._client = anthropic.AsyncAnthropic(**kwargs)
+        return AnthropicChat(self._client, self.model, temperature)
+
+    def get(self, temperature: float = 0) -> PooledLLM:
+        """Shared model for a temperature, created on first use"""
+        pooled = self._models.get(temperature)
+        if pooled is None:
+            pooled = PooledLLM(self._build_model(temperature), self)
+            self._models[temperature] = pooled
+        return pooled
+
+    def start(self):
+        """Build the default model and its connection pool ahead of the first request"""
+        self.get(0)
+
+    async def close(self):
+        """Close pooled connections and drop cached models"""
+        self._models.clear()
+        self._client = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def override(self, factory: Optional[Callable[[float], Any]]):
+        """Replace the model factory (e.g. with a stub), or restore the default with None"""
+        self._factory = factory
+        self._models.clear()
+
+    async def _on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def _record_call(self, seconds: float):
+        self.calls += 1
+        self.total_latency += seconds
+        self.max_latency = max(self.max_latency, seconds)
+
+    def reset_stats(self):
+        self.calls = 0
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Call latency and HTTP connection reuse counters"""
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "http_requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(self.requests - self.connections_opened, 0),
+            "tls_handshakes": self.tls_handshakes,
+            "avg_latency_ms": round(self.total_latency * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+        }
+
+llm_provider = LLMClientProvider()
+
+def get_llm(temperature: float = 0) -> PooledLLM:
+    """Shared chat model from the process-wide provider"""
+    return llm_provider.get(temperature)
@@ -0,0 +1,179 @@
+import bisect
+import os
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.tracing import span
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+TOKEN_BUCKETS = (10, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000)
+
+# Name of the workflow node running in the current context, used to label SQL and LLM metrics
+current_node: ContextVar[str] = ContextVar("current_node", default="none")
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class MetricsRegistry:
+    """Process-wide collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric") -> "_Metric":
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> "Histogram":
+        return self.register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> "Counter":
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        """Exposition text (format version 0.0.4) for every registered metric"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labelnames: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.reset()
+
+    def reset(self):
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, *labels: str):
+        if not self.registry.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0]
+        series[0] += amount
+
+    def value(self, *labels: str) -> float:
+        series = self._series.get(labels)
+        return series[0] if series else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (value,) in sorted(self._series.items()):
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; each series keeps per-bucket counts, the sum and the count"""
+
+    kind = "histogram"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value: float, *labels: str):
+        if not self.registry.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            # [bucket counts..., +Inf count, sum]
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def total(self, *labels: str) -> float:
+        series = self._series.get(labels)
+        return series[-1] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+
+node_seconds = metrics.histogram(
+    "sciscinet_workflow_node_seconds", "Wall time of each LangGraph node", ["node"]
+)
+sql_seconds = metrics.histogram(
+    "sciscinet_sql_query_seconds", "Time executing and fetching each SQL query", ["query", "node"]
+)
+sql_rows = metrics.histogram(
+    "sciscinet_sql_rows", "Rows returned per SQL query", ["query", "node"], buckets=ROW_BUCKETS
+)
+llm_seconds = metrics.histogram(
+    "sciscinet_llm_call_seconds", "Latency of each LLM call", ["node"]
+)
+llm_tokens = metrics.histogram(
+    "sciscinet_llm_tokens", "Tokens per LLM call", ["node", "direction"], buckets=TOKEN_BUCKETS
+)
+
+def timed_node(name: str, fn: Callable[[dict], Awaitable[dict]]) -> Callable[[dict], Awaitable[dict]]:
+    """Wrap a workflow node so its wall time is recorded and nested calls know which node they serve"""
+    async def node(state: dict) -> dict:
+        token = current_node.set(name)
+        start = time.perf_counter()
+        try:
+            with span(name):
+                return await fn(state)
+        finally:
+            node_seconds.observe(time.perf_counter() - start, name)
+            current_node.reset(token)
+    node.__name__ = getattr(fn, "__name__", name)
+    node.__doc__ = fn.__doc__
+    return node
+
+def record_sql(query: str, seconds: float, rows: int):
+    node = current_node.get()
+    sql_seconds.observe(seconds, query, node)
+    sql_rows.observe(rows, query, node)
+
+def record_llm(seconds: float, usage: Optional[dict]):
+    node = current_node.get()
+    llm_seconds.observe(seconds, node)
+    if usage:
+        llm_tokens.observe(usage.get("input_tokens", 0), node, "input")
+        llm_tokens.observe(usage.get("output_tokens", 0), node, "output")
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiosqlite
+
+def read_only_uri(path: str) -> str:
+    """Build a read-only SQLite URI for a database file"""
+    return f"file:{Path(path).resolve().as_posix()}?mode=ro"
+
+@dataclass(frozen=True)
+class ReadProfile:
+    """Connection settings for serving reads from a database nobody writes to.
+
+    Pages are memory-mapped up to the file's size (SQLite caps the mapping
+    at its compile-time limit), so hits in the OS page cache are read in
+    place instead of being copied into each connection's page cache; the
+    page cache is enlarged for whatever is still read through it, sorting
+    and grouping temp B-trees stay in memory and writes are refused.
+    """
+    cache_size_kb: int = 65536
+    mmap_limit: int = 1 << 34
+
+    def pragmas(self, database_path: str) -> List[str]:
+        mmap_size = min(os.path.getsize(database_path), self.mmap_limit)
+        return [
+            f"PRAGMA mmap_size = {mmap_size}",
+            f"PRAGMA cache_size = -{self.cache_size_kb}",
+            "PRAGMA temp_store = MEMORY",
+            "PRAGMA query_only = ON",
+        ]
+
+class PoolClosedError(RuntimeError):
+    """Raised to callers still queued for a connection when the pool closes"""
+
+# Handed to queued callers in place of a connection once their pool has closed
+_CLOSED = object()
+
+class _IdleQueue(asyncio.Queue):
+    """Idle connections of one open pool, with the number of callers queued for them"""
+
+    def __init__(self):
+        super().__init__()
+        self.waiters = 0
+        self.closed = False
+
+class ConnectionPool:
+    """Bounded pool of long-lived, read-only aiosqlite connections.
+
+    Connections are opened once at startup and handed out with `acquire()`;
+    each keeps up to `cached_statements` compiled statements for reuse.
+    When every connection is busy, callers queue until one is released; the
+    number of waiters and the time spent waiting are tracked for sizing.
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        size: int = 4,
+        acquire_timeout: Optional[float] = None,
+        cached_statements: int = 128,
+        profile: Optional[ReadProfile] = None
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.database_path = database_path
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.cached_statements = cached_statements
+        self.profile = profile
+        self.settings: Dict[str, Any] = {}
+        self.journal_mode: Optional[str] = None
+        self.file_id: Optional[tuple] = None
+        self._connections: List[aiosqlite.Connection] = []
+        self._idle: Optional[_IdleQueue] = None
+        self._in_use = 0
+        self._waiters = 0
+        self._acquisitions = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._idle is not None
+
+    async def _connect(self, pragmas: Sequence[str] = ()) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            read_only_uri(self.database_path), uri=True, cached_statements=self.cached_statements
+        )
+        conn.row_factory = aiosqlite.Row
+        try:
+            for pragma in pragmas:
+                await conn.execute(pragma)
+        except Exception:
+            await conn.close()
+            raise
+        return conn
+
+    async def _read_settings(self, conn: aiosqlite.Connection) -> Dict[str, Any]:
+        settings = {}
+        for name in ("journal_mode", "mmap_size", "cache_size", "temp_store", "query_only"):
+            async with conn.execute(f"PRAGMA {name}") as cursor:
+                row = await cursor.fetchone()
+                settings[name] = row[0] if row else None
+        return settings
+
+    async def open(self):
+        """Open all pooled connections"""
+        if self.is_open:
+            return
+        idle = _IdleQueue()
+        st = os.stat(self.database_path)
+        # Sized from the file at (re)open time, so a replaced snapshot gets a matching mapping
+        pragmas = self.profile.pragmas(self.database_path) if self.profile else ()
+        try:
+            for _ in range(self.size):
+                conn = await self._connect(pragmas)
+                self._connections.append(conn)
+                idle.put_nowait(conn)
+            self.settings = await self._read_settings(self._connections[0])
+            self.journal_mode = self.settings["journal_mode"]
+        except Exception:
+            await self._close_all()
+            raise
+        self.file_id = (st.st_dev, st.st_ino)
+        self._idle = idle
+
+    async def reopen_if_replaced(self) -> bool:
+        """Reconnect when the database file was swapped out under the open connections"""
+        if not self.is_open:
+            return False
+        try:
+            st = os.stat(self.database_path)
+        except OSError:
+            return False
+        if (st.st_dev, st.st_ino) == self.file_id:
+            return False
+        await self.close()
+        await self.open()
+        return True
+
+    async def close(self, timeout: float = 5.0):
+        """Drain the pool, letting in-flight and queued queries finish first.
+
+        Callers still queued after `timeout` get `PoolClosedError`, and
+        connections still lent out (e.g. to a long stream) are closed when
+        they are returned rather than under their borrower.
+        """
+        if not self.is_open:
+            return
+        idle, self._idle = self._idle, None
+        connections, self._connections = self._connections, []
+        deadline = time.monotonic() + timeout
+        while (idle.qsize() < len(connections) or idle.waiters) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        idle.closed = True
+        returned = []
+        while not idle.empty():
+            returned.append(idle.get_nowait())
+        for _ in range(idle.waiters):
+            idle.put_nowait(_CLOSED)
+        for conn in returned:
+            await conn.close()
+
+    async def _close_all(self):
+        connections, self._connections = self._connections, []
+        for conn in connections:
+            await conn.close()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a connection for the duration of the context"""
+        idle = self._idle
+        if idle is None:
+            raise RuntimeError("Connection pool is not open")
+        start = time.perf_counter()
+        if idle.empty():
+            self._waiters += 1
+            idle.waiters += 1
+            try:
+                conn = await asyncio.wait_for(idle.get(), self.acquire_timeout)
+            finally:
+                self._waiters -= 1
+                idle.waiters -= 1
+        else:
+            conn = idle.get_nowait()
+        if conn is _CLOSED:
+            raise PoolClosedError("Connection pool closed while waiting for a connection")
+        waited = time.perf_counter() - start
+        self._acquisitions += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        self._in_use += 1
+        try:
+            yield conn
+        finally:
+            self._in_use -= 1
+            if idle.closed:
+                await conn.close()
+            else:
+                idle.put_nowait(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool usage and cumulative wait statistics"""
+        return {
+            "open": self.is_open,
+            "size": self.size,
+            "in_use": self._in_use,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "waiters": self._waiters,
+            "acquisitions": self._acquisitions,
+            "total_wait_ms": round(self._total_wait * 1000, 3),
+            "avg_wait_ms": round(self._total_wait * 1000 / self._acquisitions, 3) if self._acquisitions else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 3),
+            "journal_mode": self.journal_mode,
+            "read_profile": self.profile is not None,
+            "settings": dict(self.settings),
+        }
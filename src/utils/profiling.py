@@ -0,0 +1,94 @@
+from collections import Counter
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from src.utils.columnar import column_values
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _round(value: float):
+    """Keep integers exact and round other values to 4 significant digits"""
+    value = float(value)
+    if not np.isfinite(value):
+        return value
+    if value.is_integer():
+        return int(value)
+    return float(f"{value:.4g}")
+
+def _numeric_profile(values: np.ndarray, x: Optional[np.ndarray]) -> Dict[str, Any]:
+    mask = ~np.isnan(values)
+    present = values[mask]
+    if present.size == 0:
+        return {"type": "numeric"}
+    profile = {
+        "type": "numeric",
+        "min": _round(present.min()),
+        "max": _round(present.max()),
+        "mean": _round(present.mean()),
+        "sum": _round(present.sum()),
+        "quantiles": {f"p{int(q * 100)}": _round(v) for q, v in zip(QUANTILES, np.quantile(present, QUANTILES))},
+        "cardinality": int(np.unique(present).size),
+    }
+    if x is not None:
+        paired = mask & ~np.isnan(x)
+        xs = x[paired]
+        if xs.size > 1 and np.ptp(xs) > 0:
+            profile["trend_slope"] = _round(np.polyfit(xs, values[paired], 1)[0])
+    return profile
+
+def _categorical_profile(values: Sequence[Any], top_k: int) -> Dict[str, Any]:
+    counts = Counter(v for v in values if v is not None)
+    if len(counts) > top_k and len(counts) * 2 > len(values):
+        # Near-unique text such as titles: frequencies carry no signal, show examples instead
+        return {
+            "type": "text",
+            "cardinality": len(counts),
+            "examples": [str(value)[:80] for value, _ in counts.most_common(top_k)],
+        }
+    return {
+        "type": "categorical",
+        "cardinality": len(counts),
+        "top": [{"value": value, "count": count} for value, count in counts.most_common(top_k)],
+    }
+
+def profile_columns(data: Sequence[Dict[str, Any]], top_k: int = 5) -> Dict[str, Any]:
+    """Compact per-column statistics computed over every row of a result set.
+
+    Numeric columns get min/max/mean/sum, quantiles, cardinality and, when a
+    `year` column exists, the least-squares trend slope per year (otherwise
+    per row). Other columns get cardinality and their top-k values.
+    """
+    if not data:
+        return {"row_count": 0, "columns": {}}
+
+    names = list(data[0].keys())
+    columns = {name: column_values(data, name) for name in names}
+    numeric = {
+        name for name, values in columns.items()
+        if any(v is not None for v in values) and all(v is None or _is_number(v) for v in values)
+    }
+    arrays = {
+        name: np.array([np.nan if v is None else v for v in columns[name]], dtype=float)
+        for name in numeric
+    }
+
+    if "year" in arrays:
+        x, trend_axis = arrays["year"], "year"
+    else:
+        x, trend_axis = np.arange(len(data), dtype=float), "row"
+
+    profiles = {}
+    for name in names:
+        if name in numeric:
+            axis = None if name == "year" or name.endswith("_id") else x
+            profile = _numeric_profile(arrays[name], axis)
+        else:
+            profile = _categorical_profile(columns[name], top_k)
+        profile["nulls"] = sum(1 for v in columns[name] if v is None)
+        profiles[name] = profile
+
+    return {"row_count": len(data), "trend_axis": trend_axis, "columns": profiles}
@@ -0,0 +1,164 @@
+import re
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+GROUPS = ("year", "field")
+METRICS = ("count", "paper_count", "author_count", "citations", "mean_citations")
+AUTHOR_METRICS = frozenset({"author_count", "paper_count"})
+CITATION_METRICS = frozenset({"citations", "mean_citations"})
+ORDERS = ("year", "citations")
+MIN_YEAR, MAX_YEAR = 1900, 2100
+MAX_LIMIT = 100_000
+
+YEAR = r"(?:19|20)\d{2}"
+_RANGE = re.compile(rf"\b({YEAR})\s*(?:-|–|to|through|until|and)\s*({YEAR})\b")
+_SINCE = re.compile(rf"\b(since|from|after)\s+({YEAR})\b")
+_BEFORE = re.compile(rf"\b(before|until|through)\s+({YEAR})\b")
+_SINGLE = re.compile(rf"\b({YEAR})\b")
+_MIN_CITATIONS = re.compile(r"\b(at least|more than|over|above)\s+(\d[\d,]*)\s+(?:citations?|times)")
+_TOP = re.compile(r"\btop\s+(\d+)\b")
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """Structured description of the data a query needs.
+
+    `group_by` None means paper rows; otherwise one row per year or field
+    with the requested metrics. Filters compile into the WHERE clause of a
+    single statement (see `database.compile_query_spec`).
+    """
+    group_by: Optional[str] = None
+    metrics: Tuple[str, ...] = ("count",)
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    fields: Tuple[str, ...] = ()
+    min_citations: Optional[int] = None
+    order_by: str = "year"
+    limit: Optional[int] = None
+
+    def __post_init__(self):
+        if self.group_by is not None and self.group_by not in GROUPS:
+            raise ValueError(f"Unknown group_by: {self.group_by}")
+        if not self.metrics or any(metric not in METRICS for metric in self.metrics):
+            raise ValueError(f"Unknown metrics: {self.metrics}")
+        if AUTHOR_METRICS & set(self.metrics) and CITATION_METRICS & set(self.metrics):
+            raise ValueError("Author and citation metrics cannot be combined")
+        if self.order_by not in ORDERS:
+            raise ValueError(f"Unknown order_by: {self.order_by}")
+        if self.year_from is not None and self.year_to is not None and self.year_from > self.year_to:
+            raise ValueError("year_from is after year_to")
+
+    @property
+    def filtered(self) -> bool:
+        return any(value is not None for value in (self.year_from, self.year_to, self.min_citations)) or bool(self.fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        spec = asdict(self)
+        spec["metrics"], spec["fields"] = list(self.metrics), list(self.fields)
+        return spec
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "QuerySpec":
+        return cls(**{**spec, "metrics": tuple(spec.get("metrics", ("count",))), "fields": tuple(spec.get("fields", ()))})
+
+CATEGORY_SPECS: Dict[str, QuerySpec] = {
+    "papers_by_year": QuerySpec(group_by="year"),
+    "papers_by_field": QuerySpec(group_by="field"),
+    "top_cited": QuerySpec(order_by="citations", limit=10),
+    "collaboration": QuerySpec(group_by="year", metrics=("author_count", "paper_count")),
+    "year_range": QuerySpec(),
+}
+
+def category_of(query_type: str) -> str:
+    """The canned category named in a classification, defaulting to papers_by_year"""
+    return next((category for category in CATEGORY_SPECS if category in query_type), "papers_by_year")
+
+def _year(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    return min(max(int(value), MIN_YEAR), MAX_YEAR)
+
+def clean_filters(filters: Dict[str, Any], field_names: Iterable[str]) -> Dict[str, Any]:
+    """Validated spec overrides from untrusted input such as LLM output.
+
+    Unknown keys and values are dropped rather than rejected, field names
+    are matched case-insensitively against the database's fields and
+    numbers are clamped to sane bounds.
+    """
+    known = {name.lower(): name for name in field_names}
+    cleaned: Dict[str, Any] = {}
+    try:
+        for key in ("year_from", "year_to"):
+            if filters.get(key) is not None:
+                cleaned[key] = _year(filters[key])
+        if filters.get("min_citations") is not None:
+            cleaned["min_citations"] = max(int(filters["min_citations"]), 0)
+        if filters.get("limit") is not None:
+            cleaned["limit"] = min(max(int(filters["limit"]), 1), MAX_LIMIT)
+    except (TypeError, ValueError):
+        return {}
+    fields = filters.get("fields") or ()
+    if isinstance(fields, str):
+        fields = (fields,)
+    matched = tuple(dict.fromkeys(known[name.lower()] for name in fields if isinstance(name, str) and name.lower() in known))
+    if matched:
+        cleaned["fields"] = matched
+    if filters.get("group_by") in GROUPS:
+        cleaned["group_by"] = filters["group_by"]
+    if filters.get("order_by") in ORDERS:
+        cleaned["order_by"] = filters["order_by"]
+    if cleaned.get("year_from") is not None and cleaned.get("year_to") is not None and cleaned["year_from"] > cleaned["year_to"]:
+        cleaned["year_from"], cleaned["year_to"] = cleaned["year_to"], cleaned["year_from"]
+    return cleaned
+
+def _blank(text: str, spans: Iterable[Tuple[int, int]]) -> str:
+    for start, end in spans:
+        text = text[:start] + " " * (end - start) + text[end:]
+    return text
+
+def extract_filters(query: str, field_names: Iterable[str]) -> Dict[str, Any]:
+    """Filters stated plainly in the query text: years, field names, citation floors and top-N"""
+    text = query.lower()
+    filters: Dict[str, Any] = {}
+    # Counts are read first and blanked out, so "top 2000" or "over 2015 citations" is not taken for a year
+    counted = []
+    match = _MIN_CITATIONS.search(text)
+    if match:
+        floor = int(match.group(2).replace(",", ""))
+        filters["min_citations"] = floor + (match.group(1) in ("more than", "over", "above"))
+        counted.append(match.span(2))
+    match = _TOP.search(text)
+    if match:
+        filters["limit"] = int(match.group(1))
+        counted.append(match.span(1))
+    years = _blank(text, counted)
+    match = _RANGE.search(years)
+    if match:
+        first, last = sorted((int(match.group(1)), int(match.group(2))))
+        filters["year_from"], filters["year_to"] = first, last
+    else:
+        since, before = _SINCE.search(years), _BEFORE.search(years)
+        if since:
+            filters["year_from"] = int(since.group(2)) + (since.group(1) == "after")
+        if before:
+            filters["year_to"] = int(before.group(2)) - (before.group(1) == "before")
+        if not since and not before:
+            single = _SINGLE.findall(years)
+            if len(single) == 1:
+                filters["year_from"] = filters["year_to"] = int(single[0])
+    fields = tuple(
+        name for name in sorted(field_names, key=len, reverse=True)
+        if re.search(rf"\b{re.escape(name.lower())}\b", text)
+    )
+    if fields:
+        filters["fields"] = fields
+    return clean_filters(filters, field_names)
+
+def build_spec(query_type: str, filters: Optional[Dict[str, Any]] = None) -> QuerySpec:
+    """The canned spec for a classification with filters applied on top"""
+    spec = CATEGORY_SPECS[category_of(query_type)]
+    if not filters:
+        return spec
+    try:
+        return replace(spec, **filters)
+    except ValueError:
+        return spec
@@ -0,0 +1,173 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.columnar import ColumnarResult, column_values
+
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
+
+POINT_MARKS = ("point", "circle", "square", "scatter")
+LINE_MARKS = ("line", "area", "trail")
+OTHER_LABEL = "Other"
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _scalar(value: float, integral: bool):
+    return int(value) if integral and float(value).is_integer() else float(value)
+
+def _as_array(values: Sequence[Any]) -> Tuple[Optional[np.ndarray], bool]:
+    """Float array of a numeric column (NULLs as NaN) and whether it is integer-valued, or None"""
+    array = np.asarray(values)
+    if array.dtype.kind in "iu":
+        return array.astype(float), True
+    if array.dtype.kind == "f":
+        return array, False
+    if array.dtype.kind != "O" or not all(v is None or _is_number(v) for v in values):
+        return None, False
+    present = [v for v in values if v is not None]
+    if not present:
+        return None, False
+    integral = all(isinstance(v, int) for v in present)
+    return np.array([np.nan if v is None else v for v in values], dtype=float), integral
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling of a series sorted by x"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[start:end].mean(), y[start:end].mean()
+        lo, hi = int(i * every) + 1, start
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        kept.append(a)
+    kept.append(n - 1)
+    return np.array(kept)
+
+def _group(xs: Sequence[Any], x: Optional[np.ndarray], y: np.ndarray) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+    """Distinct x values with the sum and count of non-null y per value"""
+    present = ~np.isnan(y)
+    weights = np.where(present, y, 0.0)
+    if x is not None:
+        keep = ~np.isnan(x)
+        keys, inverse = np.unique(x[keep], return_inverse=True)
+        sums = np.bincount(inverse, weights=weights[keep], minlength=len(keys))
+        counts = np.bincount(inverse, weights=present[keep].astype(float), minlength=len(keys))
+        return keys.tolist(), sums, counts
+    # Categories keep first-seen order, which preserves the query's ORDER BY
+    index: Dict[Any, int] = {}
+    for value in xs:
+        index.setdefault(value, len(index))
+    inverse = np.fromiter((index[v] for v in xs), dtype=np.int64, count=len(xs))
+    sums = np.bincount(inverse, weights=weights, minlength=len(index))
+    counts = np.bincount(inverse, weights=present.astype(float), minlength=len(index))
+    return list(index), sums, counts
+
+def _aggregate(sums: np.ndarray, counts: np.ndarray, aggregate: str) -> np.ndarray:
+    if aggregate == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return sums
+
+def reduce_for_chart(
+    data: Any,
+    viz_type: str,
+    x_field: str,
+    y_field: str,
+    max_points: Optional[int] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """Shrink a result set to what a chart of this mark and encoding can show.
+
+    Point marks are capped by evenly spaced sampling. Other marks are grouped
+    by x (summed for stacked bars/areas, averaged for lines), then LTTB
+    downsampled for line/area, binned for numeric bars or cut to the top
+    categories plus an "Other" bucket. Small, already one-row-per-x results
+    are returned untouched. Returns the values and a description of the
+    reduction.
+    """
+    max_points = max_points or CHART_MAX_POINTS
+    n = len(data) if data else 0
+    meta: Dict[str, Any] = {"input_rows": n, "output_rows": n, "steps": []}
+    if not n or x_field not in data[0] or y_field not in data[0]:
+        return data, meta
+
+    xs = column_values(data, x_field)
+    y, y_integral = _as_array(column_values(data, y_field))
+
+    if viz_type in POINT_MARKS or y is None:
+        if n <= max_points:
+            return data, meta
+        rows = np.linspace(0, n - 1, max_points).round().astype(int).tolist()
+        if isinstance(data, ColumnarResult):
+            sampled = ColumnarResult(data.names, [tuple(col[i] for i in rows) for col in data.columns])
+        else:
+            sampled = [data[i] for i in rows]
+        meta.update(output_rows=len(sampled), steps=["sample"])
+        return sampled, meta
+
+    x, x_integral = _as_array(xs)
+    x_numeric = x is not None
+    if n <= max_points and len(set(xs)) == n:
+        return data, meta
+
+    aggregate = "mean" if viz_type == "line" else "sum"
+    y_integral = y_integral and aggregate == "sum"
+    keys, sums, counts = _group(xs, x, y)
+    steps = ["group_by"] if len(keys) < n else []
+    meta["aggregate"] = aggregate
+    columns: Dict[str, List[Any]]
+
+    if len(keys) <= max_points:
+        values = _aggregate(sums, counts, aggregate)
+        columns = {x_field: keys, y_field: values.tolist()}
+    elif x_numeric and viz_type in LINE_MARKS:
+        x = np.array(keys, dtype=float)
+        y = _aggregate(sums, counts, aggregate)
+        valid = ~np.isnan(y)
+        x, y = x[valid], y[valid]
+        kept = lttb(x, y, max_points)
+        steps.append("lttb")
+        columns = {x_field: x[kept].tolist(), y_field: y[kept].tolist()}
+    elif x_numeric:
+        x = np.array(keys, dtype=float)
+        span = x.max() - x.min()
+        # Whole-number widths for integer axes such as ids and years
+        width = max(1.0, float(np.ceil((span + 1) / max_points))) if x_integral else span / max_points
+        bins = np.minimum(((x - x.min()) // width).astype(np.int64), max_points - 1)
+        bin_sums = np.bincount(bins, weights=sums, minlength=max_points)
+        bin_counts = np.bincount(bins, weights=counts, minlength=max_points)
+        occupied = np.flatnonzero(bin_counts > 0)
+        starts = x.min() + occupied * width
+        steps.append("bin")
+        meta["bin_width"] = _scalar(width, x_integral)
+        columns = {
+            x_field: starts.tolist(),
+            f"{x_field}_end": (starts + width).tolist(),
+            y_field: _aggregate(bin_sums, bin_counts, aggregate)[occupied].tolist(),
+        }
+    else:
+        values = _aggregate(sums, counts, aggregate)
+        order = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind="stable")
+        top, rest = order[:max_points - 1], order[max_points - 1:]
+        other = _aggregate(np.array([sums[rest].sum()]), np.array([counts[rest].sum()]), aggregate)[0]
+        steps.append("top_k")
+        meta["other_categories"] = int(len(rest))
+        columns = {
+            x_field: [keys[i] for i in top] + [OTHER_LABEL],
+            y_field: values[top].tolist() + [float(other)],
+        }
+
+    for name in (x_field, f"{x_field}_end"):
+        if name in columns:
+            columns[name] = [_scalar(v, x_integral) if _is_number(v) else v for v in columns[name]]
+    columns[y_field] = [None if np.isnan(v) else _scalar(v, y_integral) for v in columns[y_field]]
+    reduced = ColumnarResult(columns.keys(), columns.values())
+    meta.update(output_rows=len(reduced), steps=steps)
+    return reduced, meta
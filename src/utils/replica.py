@@ -0,0 +1,360 @@
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.cache import file_fingerprint
+from src.utils.columnar import ColumnarResult
+from src.utils.pool import read_only_uri
+
+# Statements whose results grow with the table; callers run these off the event loop or stream them
+ROW_STATEMENTS = frozenset({"year_range"})
+PAPER_COLUMNS = ("paper_id", "title", "year", "citation_count")
+
+_NULL_KEY = np.iinfo(np.int64).max
+_CHUNK_ROWS = 1_000_000
+# Integers up to 2**53 survive the trip through float64
+_MAX_EXACT = 2 ** 53
+# Stand-ins for a NULL text value and the separator; chunks where they are ambiguous are re-read row by row
+_NULL_TEXT, _TEXT_SEPARATOR = "\x1e", "\x1f"
+
+def _read_table(conn: sqlite3.Connection, table: str, columns: Sequence[str], text: Optional[str] = None) -> Tuple[List[np.ndarray], List[Any]]:
+    """Integer columns of a rowid table as float64 arrays (NULL as NaN), plus an optional text column.
+
+    Each chunk of rowids is rendered by group_concat into one string per
+    column and parsed by NumPy's C parser, which is over an order of
+    magnitude faster than building a Python tuple per row. All columns of a
+    chunk come from the same scan, so they stay aligned.
+    """
+    select = [f"group_concat(IFNULL({column}, 'nan'))" for column in columns]
+    if text is not None:
+        select += [f"SUM({text} IS NULL)", f"group_concat(IFNULL({text}, char(30)), char(31))"]
+    low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+    parts: List[List[np.ndarray]] = [[] for _ in columns]
+    texts: List[Any] = []
+    for start in range(low or 0, (high or -1) + 1, _CHUNK_ROWS):
+        bounds = (start, start + _CHUNK_ROWS - 1)
+        count, *values = conn.execute(
+            f"SELECT COUNT(*), {', '.join(select)} FROM {table} WHERE rowid BETWEEN ? AND ?", bounds
+        ).fetchone()
+        if not count:
+            continue
+        for part, rendered, column in zip(parts, values, columns):
+            # A column of only NULLs renders as "nan,nan,..."; an empty chunk was skipped above
+            parsed = np.fromstring(rendered, dtype=np.float64, sep=",")
+            if len(parsed) != count:
+                raise ValueError(f"{table}.{column} holds non-numeric values")
+            part.append(parsed)
+        if text is not None:
+            nulls, rendered = values[-2:]
+            chunk = [None if value == _NULL_TEXT else value for value in rendered.split(_TEXT_SEPARATOR)]
+            if len(chunk) != count or chunk.count(None) != nulls:
+                chunk = [row[0] for row in conn.execute(f"SELECT {text} FROM {table} WHERE rowid BETWEEN ? AND ?", bounds)]
+            texts.extend(chunk)
+    arrays = [np.concatenate(part) if part else np.zeros(0) for part in parts]
+    for array, column in zip(arrays, columns):
+        present = array[~np.isnan(array)]
+        if len(present) and (np.abs(present).max() >= _MAX_EXACT or (present != np.floor(present)).any()):
+            raise ValueError(f"{table}.{column} holds values that are not exact integers")
+    return arrays, texts
+
+def _nullable_ints(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer array plus NULL mask; NULLs read as 0"""
+    nulls = np.isnan(values)
+    return np.where(nulls, 0, values).astype(np.int64), nulls
+
+def _distinct_pairs(first: np.ndarray, second: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct (first, second) pairs, sorted by first then second"""
+    if not len(first):
+        return first, second
+    # One int64 sort key is several times faster than lexsort when the value ranges allow it
+    low_first, low_second = int(first.min()), int(second.min())
+    width = int(second.max()) - low_second + 1
+    if (int(first.max()) - low_first + 1) * width < 2 ** 63:
+        key = np.sort((first - low_first) * width + (second - low_second))
+        key = key[np.concatenate(([True], key[1:] != key[:-1]))]
+        return key // width + low_first, key % width + low_second
+    order = np.lexsort((second, first))
+    first, second = first[order], second[order]
+    keep = np.ones(len(first), dtype=bool)
+    keep[1:] = (first[1:] != first[:-1]) | (second[1:] != second[:-1])
+    return first[keep], second[keep]
+
+def _group_counts(sorted_keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct values of a sorted array and how often each occurs"""
+    if not len(sorted_keys):
+        return sorted_keys, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    return sorted_keys[starts], np.diff(np.append(starts, len(sorted_keys)))
+
+class ColumnarReplica:
+    """Read-only, in-process copy of the SciSciNet tables as NumPy columns.
+
+    Papers are held in paper_id order alongside precomputed indexes: a
+    (year, citation_count DESC, paper_id) ordering with per-year offsets, a
+    citation ordering for top-k, distinct (field name, paper) pairs and
+    distinct (year, author) pairs from the author links. The canned
+    statements are answered from these with the same columns, NULL
+    handling and ordering as SQLite; rows tied under a statement's ORDER BY
+    come out in paper_id (or field name) order. `execute` returns None for
+    anything it cannot answer exactly, and callers fall back to SQLite.
+    """
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+        self.fingerprint = file_fingerprint(database_path)
+        self.load_seconds = 0.0
+        self.memory_bytes = 0
+        self.fallbacks = 0
+        self._handlers: Dict[str, Callable[[tuple], Optional[ColumnarResult]]] = {
+            "papers_by_year": self._papers_by_year,
+            "papers_by_field": self._papers_by_field,
+            "top_cited": self._top_cited,
+            "year_range": self._year_range,
+            "year_range_page": self._year_range_page,
+            "collaboration": self._collaboration,
+        }
+        self._stats: Dict[str, List[float]] = {}
+
+    @classmethod
+    def load(cls, database_path: str) -> "ColumnarReplica":
+        """Read the four tables and build the indexes; raises ValueError for data it cannot hold exactly"""
+        start = time.perf_counter()
+        replica = cls(database_path)
+        conn = sqlite3.connect(read_only_uri(database_path), uri=True)
+        try:
+            replica._load_papers(*_read_table(conn, "papers", ("paper_id", "year", "citation_count"), text="title"))
+            (field_id,), field_names = _read_table(conn, "fields", ("field_id",), text="field_name")
+            links, _ = _read_table(conn, "paper_fields", ("paper_id", "field_id"))
+            replica._load_fields(field_id, field_names, *links)
+            replica._load_authors(*_read_table(conn, "paper_author_affiliations", ("paper_id", "author_id"))[0])
+        finally:
+            conn.close()
+        replica.load_seconds = time.perf_counter() - start
+        replica.memory_bytes = replica.nbytes()
+        return replica
+
+    def _load_papers(self, columns: List[np.ndarray], titles: List[Any]):
+        paper_id, year, citations = columns
+        if np.isnan(paper_id).any():
+            raise ValueError("papers.paper_id contains NULLs")
+        # Rowid order is paper_id order when paper_id is the INTEGER PRIMARY KEY
+        order = np.argsort(paper_id, kind="stable")
+        if (order != np.arange(len(order))).any():
+            paper_id, year, citations = paper_id[order], year[order], citations[order]
+            titles = [titles[row] for row in order.tolist()]
+        self.paper_id = paper_id.astype(np.int64)
+        if len(self.paper_id) > 1 and not (np.diff(self.paper_id) > 0).all():
+            raise ValueError("papers.paper_id is not unique")
+        self.titles = titles
+        self.year, self.year_null = _nullable_ints(year)
+        self.citations, self.citations_null = _nullable_ints(citations)
+
+        # Year index: rows in (year, citation_count DESC NULLS LAST, paper_id) order, NULL years at the end
+        year_key = np.where(self.year_null, _NULL_KEY, self.year)
+        citation_key = np.where(self.citations_null, np.inf, -self.citations.astype(np.float64))
+        self.year_order = np.lexsort((self.paper_id, citation_key, year_key))
+        self.year_keys = year_key[self.year_order]
+        self.year_rank = np.empty_like(self.year_order)
+        self.year_rank[self.year_order] = np.arange(len(self.year_order))
+        self.years, self.year_counts = _group_counts(self.year_keys[self.year_keys != _NULL_KEY])
+
+        # Citation index: non-NULL rows by citation_count DESC, then paper_id
+        cited = np.flatnonzero(~self.citations_null)
+        self.citation_order = cited[np.lexsort((self.paper_id[cited], -self.citations[cited]))]
+
+    def _load_fields(self, field_id: np.ndarray, field_name: List[Any], paper_id: np.ndarray, link_field: np.ndarray):
+        # GROUP BY field_name merges fields that share a name
+        names = sorted(set(field_name), key=lambda name: (name is not None, name))
+        code_of = {name: code for code, name in enumerate(names)}
+        known = ~np.isnan(field_id)
+        ids, codes = field_id[known].astype(np.int64), np.array([code_of[name] for name in field_name], dtype=np.int64)[known]
+        by_id = np.argsort(ids, kind="stable")
+        ids, codes = ids[by_id], codes[by_id]
+
+        linked = ~np.isnan(link_field)
+        paper_id, link_field = paper_id[linked], link_field[linked].astype(np.int64)
+        slot = np.minimum(np.searchsorted(ids, link_field), max(len(ids) - 1, 0))
+        joined = (ids[slot] == link_field) if len(ids) else np.zeros(len(link_field), dtype=bool)
+        link_codes, paper_id = codes[slot[joined]], paper_id[joined]
+        # Every joined name forms a group; COUNT(DISTINCT paper_id) skips NULL ids
+        self.field_names = names
+        self.field_groups = np.unique(link_codes)
+        present = ~np.isnan(paper_id)
+        field_codes, _ = _distinct_pairs(link_codes[present], paper_id[present].astype(np.int64))
+        codes, distinct = _group_counts(field_codes)
+        self.field_counts = np.zeros(len(names), dtype=np.int64)
+        self.field_counts[codes] = distinct
+
+    def _load_authors(self, paper_id: np.ndarray, author_id: np.ndarray):
+        present = ~np.isnan(paper_id)
+        paper_id, author_id = paper_id[present].astype(np.int64), author_id[present]
+        row = np.minimum(np.searchsorted(self.paper_id, paper_id), max(len(self.paper_id) - 1, 0))
+        joined = (self.paper_id[row] == paper_id) if len(self.paper_id) else np.zeros(len(paper_id), dtype=bool)
+        joined &= ~self.year_null[row]
+        row, author_id = row[joined], author_id[joined]
+        year = self.year[row]
+        paper_years, _ = _distinct_pairs(year, self.paper_id[row])
+        self.collab_years, self.collab_papers = _group_counts(paper_years)
+        named = ~np.isnan(author_id)
+        author_years, _ = _distinct_pairs(year[named], author_id[named].astype(np.int64))
+        years, counts = _group_counts(author_years)
+        self.collab_authors = np.zeros(len(self.collab_years), dtype=np.int64)
+        self.collab_authors[np.searchsorted(self.collab_years, years)] = counts
+
+    @property
+    def papers(self) -> int:
+        return len(self.paper_id)
+
+    def nbytes(self) -> int:
+        """Approximate memory held, titles included"""
+        arrays = [value for value in vars(self).values() if isinstance(value, np.ndarray)]
+        titles = sys.getsizeof(self.titles) + sum(sys.getsizeof(title) for title in self.titles)
+        return sum(array.nbytes for array in arrays) + titles
+
+    def supports(self, name: Optional[str]) -> bool:
+        return name in self._handlers
+
+    def execute(self, name: str, params: tuple = ()) -> Optional[ColumnarResult]:
+        """Answer a named canned statement, or None when it has to go to SQLite"""
+        start = time.perf_counter()
+        result = self._handlers[name](params)
+        if result is None:
+            self.fallbacks += 1
+            return None
+        stats = self._stats.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+        return result
+
+    def stream(self, name: str, params: tuple, batch_size: int) -> Optional[Iterator[ColumnarResult]]:
+        """Batches of a row statement, each built from its slice of the ordering only when read; None to fall back"""
+        rows = self._year_range_rows(params) if name == "year_range" else None
+        if rows is None:
+            self.fallbacks += 1
+            return None
+        return self._batches(name, rows, batch_size)
+
+    def _batches(self, name: str, rows: np.ndarray, batch_size: int) -> Iterator[ColumnarResult]:
+        stats = self._stats.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        for offset in range(0, len(rows), batch_size):
+            start = time.perf_counter()
+            batch = self._paper_rows(rows[offset:offset + batch_size], PAPER_COLUMNS)
+            stats[1] += time.perf_counter() - start
+            yield batch
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "papers": self.papers,
+            "memory_mb": round(self.memory_bytes / 2**20, 1),
+            "load_seconds": round(self.load_seconds, 3),
+            "fallbacks": self.fallbacks,
+            "statements": {
+                name: {"executions": count, "total_ms": round(seconds * 1000, 3)}
+                for name, (count, seconds) in sorted(self._stats.items())
+            }
+        }
+
+    def _paper_rows(self, rows: np.ndarray, names: Tuple[str, ...]) -> ColumnarResult:
+        columns = {
+            "paper_id": self.paper_id[rows].tolist(),
+            "title": [self.titles[row] for row in rows.tolist()],
+            "year": self._with_nulls(self.year, self.year_null, rows),
+            "citation_count": self._with_nulls(self.citations, self.citations_null, rows),
+        }
+        return ColumnarResult(names, [columns[name] for name in names])
+
+    @staticmethod
+    def _with_nulls(values: np.ndarray, nulls: np.ndarray, rows: np.ndarray) -> List[Any]:
+        out = values[rows].tolist()
+        for index in np.flatnonzero(nulls[rows]).tolist():
+            out[index] = None
+        return out
+
+    def _year_bounds(self, start_year: Any, end_year: Any) -> Optional[Tuple[int, int]]:
+        if not all(isinstance(year, int) for year in (start_year, end_year)):
+            return None
+        low = int(np.searchsorted(self.year_keys, start_year, side="left"))
+        high = int(np.searchsorted(self.year_keys, min(end_year, _NULL_KEY - 1), side="right"))
+        return low, max(low, high)
+
+    def _papers_by_year(self, params: tuple) -> Optional[ColumnarResult]:
+        if params:
+            return None
+        return ColumnarResult(("year", "count"), [self.years.tolist(), self.year_counts.tolist()])
+
+    def _papers_by_field(self, params: tuple) -> Optional[ColumnarResult]:
+        if params:
+            return None
+        groups = self.field_groups
+        order = groups[np.argsort(-self.field_counts[groups], kind="stable")]
+        return ColumnarResult(
+            ("field_name", "count"),
+            [[self.field_names[code] for code in order.tolist()], self.field_counts[order].tolist()]
+        )
+
+    def _top_cited(self, params: tuple) -> Optional[ColumnarResult]:
+        if len(params) != 1 or not isinstance(params[0], int):
+            return None
+        limit = params[0]
+        rows = self.citation_order if limit < 0 else self.citation_order[:limit]
+        return self._paper_rows(rows, ("paper_id", "title", "citation_count", "year"))
+
+    def _year_range_rows(self, params: tuple) -> Optional[np.ndarray]:
+        bounds = self._year_bounds(*params) if len(params) == 2 else None
+        if bounds is None:
+            return None
+        return self.year_order[bounds[0]:bounds[1]]
+
+    def _year_range(self, params: tuple) -> Optional[ColumnarResult]:
+        rows = self._year_range_rows(params)
+        return None if rows is None else self._paper_rows(rows, PAPER_COLUMNS)
+
+    def _year_range_page(self, params: tuple) -> Optional[ColumnarResult]:
+        # Parameter layouts of database._year_range_page: first page, after a NULL citation count, after a count
+        if len(params) == 3:
+            start_year, end_year, limit = params
+            after = None
+        elif len(params) == 6:
+            start_year, end_year, year, _, paper_id, limit = params
+            after = (year, None, paper_id)
+        elif len(params) == 8:
+            start_year, end_year, year, _, citations, _, paper_id, limit = params
+            after = (year, citations, paper_id)
+        else:
+            return None
+        bounds = self._year_bounds(start_year, end_year)
+        if bounds is None or not isinstance(limit, int):
+            return None
+        low, high = bounds
+        if after is not None:
+            position = self._position_of(*after)
+            if position is None:
+                return None
+            low = max(low, position + 1)
+        rows = self.year_order[low:high] if limit < 0 else self.year_order[low:min(high, low + limit)]
+        return self._paper_rows(rows, PAPER_COLUMNS)
+
+    def _position_of(self, year: Any, citations: Any, paper_id: Any) -> Optional[int]:
+        """Place of a keyset cursor in the year ordering, if it names an existing row"""
+        if not isinstance(paper_id, int):
+            return None
+        row = int(np.searchsorted(self.paper_id, paper_id))
+        if row >= len(self.paper_id) or self.paper_id[row] != paper_id:
+            return None
+        if self.year_null[row] or self.year[row] != year:
+            return None
+        if (None if self.citations_null[row] else int(self.citations[row])) != citations:
+            return None
+        return int(self.year_rank[row])
+
+    def _collaboration(self, params: tuple) -> Optional[ColumnarResult]:
+        if params:
+            return None
+        return ColumnarResult(
+            ("year", "author_count", "paper_count"),
+            [self.collab_years.tolist(), self.collab_authors.tolist(), self.collab_papers.tolist()]
+        )
@@ -0,0 +1,472 @@
+"""Catalog of SQLite shards and the merge rules for fanning canned statements out across them.
+
+A catalog is a JSON file listing shard databases, each optionally tagged
+with the institution and year range it covers:
+
+    {
+        "overlapping_papers": false,
+        "shards": [
+            {"name": "vt-2013-2017", "path": "vt_2013_2017.db", "institution": "VT", "year_from": 2013, "year_to": 2017},
+            {"name": "vt-2018-2022", "path": "vt_2018_2022.db", "institution": "VT", "year_from": 2018, "year_to": 2022}
+        ]
+    }
+
+Relative paths resolve against the catalog file. Set `overlapping_papers`
+when a paper can live in more than one shard (e.g. institution shards of
+co-authored papers); paper counts are then deduplicated, not summed. The
+institution tag is reported in the shard stats, but no canned statement
+filters by institution, so queries are routed by year only.
+"""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import (
+    Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+)
+
+import aiosqlite
+import numpy as np
+
+from src.utils.cache import file_fingerprint
+from src.utils.columnar import ColumnarResult
+from src.utils.pool import ConnectionPool, ReadProfile
+
+Runner = Callable[[aiosqlite.Connection, str, tuple], Awaitable[ColumnarResult]]
+Connector = Callable[[str], AsyncContextManager[aiosqlite.Connection]]
+OrderKey = Callable[[tuple], Any]
+
+SHARD_TABLES = ("papers", "fields", "paper_fields", "paper_author_affiliations")
+LINK_TABLES = ("paper_fields", "paper_author_affiliations")
+PAPER_COLUMNS = ("paper_id", "title", "year", "citation_count")
+TOP_CITED_COLUMNS = ("paper_id", "title", "citation_count", "year")
+
+# Distinct (key, id) pairs behind a distinct count, restricted to the keys several shards share
+DISTINCT_QUERIES = {
+    "papers_by_year": """
+        SELECT DISTINCT year, paper_id
+        FROM papers
+        WHERE (year IN ({marks}) OR (year IS NULL AND {nulls})) AND paper_id IS NOT NULL
+    """,
+    "papers_by_field": """
+        SELECT DISTINCT f.field_name, pf.paper_id
+        FROM fields f
+        JOIN paper_fields pf ON f.field_id = pf.field_id
+        WHERE (f.field_name IN ({marks}) OR (f.field_name IS NULL AND {nulls})) AND pf.paper_id IS NOT NULL
+    """,
+    "collaboration_papers": """
+        SELECT DISTINCT p.year, p.paper_id
+        FROM papers p
+        JOIN paper_author_affiliations paa ON p.paper_id = paa.paper_id
+        WHERE (p.year IN ({marks}) OR (p.year IS NULL AND {nulls})) AND p.paper_id IS NOT NULL
+    """,
+    "collaboration_authors": """
+        SELECT DISTINCT p.year, paa.author_id
+        FROM papers p
+        JOIN paper_author_affiliations paa ON p.paper_id = paa.paper_id
+        WHERE (p.year IN ({marks}) OR (p.year IS NULL AND {nulls})) AND paa.author_id IS NOT NULL
+    """,
+}
+
+@dataclass(frozen=True)
+class Shard:
+    name: str
+    path: str
+    institution: Optional[str] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+
+    def covers(self, year_from: Optional[int], year_to: Optional[int]) -> bool:
+        """Whether the shard can hold papers from the given years; unbounded sides always match"""
+        if year_from is not None and self.year_to is not None and self.year_to < year_from:
+            return False
+        if year_to is not None and self.year_from is not None and self.year_from > year_to:
+            return False
+        return True
+
+class ShardCatalog:
+    """Shard databases with one connection pool each, routing and concurrent fan-out.
+
+    `execute` answers the canned statements by sending them to every shard
+    that can hold matching papers at once and merging the partial results:
+    counts are summed where a key comes from one shard (or papers cannot
+    repeat across shards), distinct counts of keys shared between shards
+    are recounted from the union of each shard's distinct ids, and ordered
+    rows are k-way merged with duplicates dropped, so every merged result
+    matches the single file. `stream` runs the same k-way merge over one
+    open cursor per shard, for row statements too large to hold whole.
+    """
+
+    def __init__(
+        self,
+        shards: Sequence[Shard],
+        overlapping_papers: bool = False,
+        pool_size: int = 2,
+        cached_statements: int = 128,
+        profile: Optional[ReadProfile] = None
+    ):
+        if not shards:
+            raise ValueError("A shard catalog needs at least one shard")
+        if len({shard.name for shard in shards}) != len(shards):
+            raise ValueError("Shard names must be unique")
+        self.shards = list(shards)
+        self.overlapping_papers = overlapping_papers
+        self.pools = {
+            shard.name: ConnectionPool(shard.path, size=pool_size, cached_statements=cached_statements, profile=profile)
+            for shard in self.shards
+        }
+        self._runner: Optional[Runner] = None
+        self._merges: Dict[str, Callable[[str, tuple], Awaitable[ColumnarResult]]] = {
+            "papers_by_year": self._papers_by_year,
+            "papers_by_field": self._papers_by_field,
+            "collaboration": self._collaboration,
+            "top_cited": self._top_cited,
+            "year_range": self._year_range,
+            "year_range_page": self._year_range_page,
+            "field_names": self._field_names,
+        }
+        self._queries: Dict[str, List[float]] = {shard.name: [0, 0.0] for shard in self.shards}
+        self.fan_outs = 0
+        self.recounted_keys = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ShardCatalog":
+        with open(path) as catalog_file:
+            catalog = json.load(catalog_file)
+        base = os.path.dirname(os.path.abspath(path))
+        shards = [
+            Shard(**{**entry, "path": os.path.join(base, entry["path"])})
+            for entry in catalog["shards"]
+        ]
+        return cls(shards, overlapping_papers=catalog.get("overlapping_papers", False), **kwargs)
+
+    async def open(self, runner: Runner):
+        """Open every shard's pool; `runner` executes one statement on a borrowed connection"""
+        self._runner = runner
+        try:
+            await asyncio.gather(*(pool.open() for pool in self.pools.values()))
+        except Exception:
+            await self.close()
+            raise
+
+    async def close(self):
+        await asyncio.gather(*(pool.close() for pool in self.pools.values()))
+
+    async def reopen_if_replaced(self):
+        await asyncio.gather(*(pool.reopen_if_replaced() for pool in self.pools.values()))
+
+    def fingerprint(self) -> Optional[tuple]:
+        """Identity of every shard file; None while any is missing"""
+        fingerprints = tuple(file_fingerprint(shard.path) for shard in self.shards)
+        return None if None in fingerprints else fingerprints
+
+    def route(self, year_from: Optional[int] = None, year_to: Optional[int] = None) -> List[Shard]:
+        """Shards that can hold papers from the given years"""
+        return [shard for shard in self.shards if shard.covers(year_from, year_to)]
+
+    def supports(self, name: Optional[str]) -> bool:
+        return name in self._merges
+
+    def streams(self, name: Optional[str]) -> bool:
+        return name in ("top_cited", "year_range", "year_range_page")
+
+    async def execute(self, name: str, query: str, params: tuple = ()) -> ColumnarResult:
+        """Answer a canned statement from every relevant shard"""
+        self.fan_outs += 1
+        return await self._merges[name](query, params)
+
+    async def fan_out(self, shards: Sequence[Shard], query: str, params: tuple = ()) -> List[ColumnarResult]:
+        """Run one statement on each shard concurrently; results come back in shard order"""
+        if self._runner is None:
+            raise RuntimeError("Shard catalog is not open")
+        return list(await asyncio.gather(*(self._run(shard, query, params) for shard in shards)))
+
+    async def _run(self, shard: Shard, query: str, params: tuple) -> ColumnarResult:
+        start = time.perf_counter()
+        async with self.pools[shard.name].acquire() as db:
+            result = await self._runner(db, query, params)
+        stats = self._queries[shard.name]
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "overlapping_papers": self.overlapping_papers,
+            "fan_outs": self.fan_outs,
+            "recounted_keys": self.recounted_keys,
+            "shards": {
+                shard.name: {
+                    "institution": shard.institution,
+                    "year_from": shard.year_from,
+                    "year_to": shard.year_to,
+                    "queries": count,
+                    "total_ms": round(seconds * 1000, 3),
+                    "pool": self.pools[shard.name].stats(),
+                }
+                for shard in self.shards
+                for count, seconds in [self._queries[shard.name]]
+            }
+        }
+
+    async def _distinct_counts(self, query: str, keys: List[Any], shards: Sequence[Shard]) -> Dict[Any, int]:
+        """Exact distinct counts for keys several shards share, from the union of their distinct ids"""
+        if not keys:
+            return {}
+        self.recounted_keys += len(keys)
+        values = tuple(key for key in keys if key is not None)
+        query = query.format(marks=", ".join("?" * len(values)), nulls=int(len(values) < len(keys)))
+        partials = await self.fan_out(shards, query, values)
+        ids: Dict[Any, List[Any]] = {}
+        for partial in partials:
+            for key, value in zip(*partial.columns):
+                ids.setdefault(key, []).append(value)
+        return {key: len(np.unique(np.array(found, dtype=np.int64))) for key, found in ids.items()}
+
+    async def _merge_counts(
+        self,
+        shards: Sequence[Shard],
+        partials: List[ColumnarResult],
+        distinct: Dict[str, Optional[str]]
+    ) -> Tuple[Tuple[str, ...], Dict[Any, List[Any]]]:
+        """Sum per-key counts across shards, recounting distinct counts of shared keys exactly.
+
+        `distinct` maps each count column to the query listing the ids it
+        counts, or None when the column is additive across shards.
+        """
+        names = partials[0].names
+        merged: Dict[Any, List[Any]] = {}
+        holders: Dict[Any, List[Shard]] = {}
+        for shard, partial in zip(shards, partials):
+            for row in zip(*partial.columns):
+                key, counts = row[0], row[1:]
+                if key in merged:
+                    merged[key] = [total + count for total, count in zip(merged[key], counts)]
+                else:
+                    merged[key] = list(counts)
+                holders.setdefault(key, []).append(shard)
+        shared = [key for key, owners in holders.items() if len(owners) > 1]
+        if shared:
+            owners = [shard for shard in shards if any(shard in holders[key] for key in shared)]
+            for position, column in enumerate(names[1:]):
+                query = distinct.get(column)
+                if query is None:
+                    continue
+                for key, count in (await self._distinct_counts(query, shared, owners)).items():
+                    merged[key][position] = count
+        return names, merged
+
+    def _paper_query(self, name: str) -> Optional[str]:
+        return DISTINCT_QUERIES[name] if self.overlapping_papers else None
+
+    async def _papers_by_year(self, query: str, params: tuple) -> ColumnarResult:
+        shards = self.route()
+        partials = await self.fan_out(shards, query, params)
+        names, merged = await self._merge_counts(shards, partials, {"count": self._paper_query("papers_by_year")})
+        rows = sorted((key, *counts) for key, counts in merged.items())
+        return ColumnarResult.from_rows(names, rows)
+
+    async def _papers_by_field(self, query: str, params: tuple) -> ColumnarResult:
+        shards = self.route()
+        partials = await self.fan_out(shards, query, params)
+        names, merged = await self._merge_counts(shards, partials, {"count": self._paper_query("papers_by_field")})
+        # ORDER BY count DESC; ties by name, NULL first as SQLite sorts it
+        rows = sorted(
+            ((key, *counts) for key, counts in merged.items()),
+            key=lambda row: (-row[1], row[0] is not None, row[0] or "")
+        )
+        return ColumnarResult.from_rows(names, rows)
+
+    async def _collaboration(self, query: str, params: tuple) -> ColumnarResult:
+        shards = self.route()
+        partials = await self.fan_out(shards, query, params)
+        # Authors move between shards even when papers do not, so shared years are always recounted
+        names, merged = await self._merge_counts(shards, partials, {
+            "author_count": DISTINCT_QUERIES["collaboration_authors"],
+            "paper_count": self._paper_query("collaboration_papers"),
+        })
+        rows = sorted((key, *counts) for key, counts in merged.items())
+        return ColumnarResult.from_rows(names, rows)
+
+    async def _field_names(self, query: str, params: tuple) -> ColumnarResult:
+        partials = await self.fan_out(self.route(), query, params)
+        names = {name for partial in partials for name in partial.columns[0]}
+        return ColumnarResult(("field_name",), [sorted(names, key=lambda name: (name is not None, name or ""))])
+
+    def _ordered(self, name: str, params: tuple) -> Tuple[List[Shard], Tuple[str, ...], OrderKey, int]:
+        """Shards, columns, merge order and row limit of an ordered row statement"""
+        if name == "top_cited":
+            # A paper in the global top k is in the top k of every shard holding it, so per-shard top k suffices
+            return self.route(), TOP_CITED_COLUMNS, _citation_order, params[0]
+        if name == "year_range":
+            return self.route(*params), PAPER_COLUMNS, _year_order, -1
+        # Each shard returns its first `limit` rows after the cursor; the merged first `limit` are the global page
+        return self.route(params[0], params[1]), PAPER_COLUMNS, _keyset_order, params[-1]
+
+    async def _merged_rows(self, name: str, query: str, params: tuple) -> ColumnarResult:
+        shards, names, key, limit = self._ordered(name, params)
+        partials = await self.fan_out(shards, query, params)
+        filled = [partial for partial in partials if len(partial)]
+        if len(filled) == 1:
+            # Already in order and complete; only the limit may still apply
+            return filled[0] if limit < 0 else filled[0][:limit]
+        streams = [zip(*partial.columns) for partial in filled]
+        rows: Iterator[tuple] = heapq.merge(*streams, key=key)
+        if len(streams) > 1 and self.overlapping_papers:
+            rows = _unique_papers(rows, names.index("paper_id"), key)
+        if limit >= 0:
+            rows = itertools.islice(rows, limit)
+        return ColumnarResult.from_rows(partials[0].names if partials else names, list(rows))
+
+    async def _top_cited(self, query: str, params: tuple) -> ColumnarResult:
+        return await self._merged_rows("top_cited", query, params)
+
+    async def _year_range(self, query: str, params: tuple) -> ColumnarResult:
+        return await self._merged_rows("year_range", query, params)
+
+    async def _year_range_page(self, query: str, params: tuple) -> ColumnarResult:
+        return await self._merged_rows("year_range_page", query, params)
+
+    async def stream(
+        self,
+        name: str,
+        query: str,
+        params: tuple,
+        connect: Connector,
+        batch_size: int
+    ) -> AsyncIterator[ColumnarResult]:
+        """Yield an ordered row statement merged across shards, `batch_size` rows at a time.
+
+        Every relevant shard gets its own connection from `connect(path)`
+        and one open cursor, and a shard is only read again once the merge
+        has used up its previous `fetchmany` batch, so memory stays at
+        about one batch per shard however long the result is.
+        """
+        shards, names, key, limit = self._ordered(name, params)
+        self.fan_outs += 1
+        async with contextlib.AsyncExitStack() as stack:
+            connections = [await stack.enter_async_context(connect(shard.path)) for shard in shards]
+            cursors = await asyncio.gather(*(
+                self._timed(shard, db.execute(query, params)) for shard, db in zip(shards, connections)
+            ))
+            for shard, cursor in zip(shards, cursors):
+                cursor.row_factory = None
+                self._queries[shard.name][0] += 1
+            names = tuple(column[0] for column in cursors[0].description) if cursors else names
+            rows = self._merge_cursors(shards, cursors, key, batch_size)
+            if len(shards) > 1 and self.overlapping_papers:
+                rows = _unique_papers_async(rows, names.index("paper_id"), key)
+            batch: List[tuple] = []
+            emitted = 0
+            async for row in rows:
+                if emitted == limit:
+                    break
+                batch.append(row)
+                emitted += 1
+                if len(batch) == batch_size:
+                    yield ColumnarResult.from_rows(names, batch)
+                    batch = []
+            if batch:
+                yield ColumnarResult.from_rows(names, batch)
+
+    async def _merge_cursors(
+        self,
+        shards: Sequence[Shard],
+        cursors: Sequence[aiosqlite.Cursor],
+        key: OrderKey,
+        batch_size: int
+    ) -> AsyncIterator[tuple]:
+        # Heap entries carry the shard index, so rows with equal keys never get compared
+        pending: List[Iterator[tuple]] = [iter(()) for _ in cursors]
+        heap: List[Tuple[Any, int, tuple]] = []
+
+        async def advance(index: int):
+            row = next(pending[index], None)
+            if row is None:
+                pending[index] = iter(await self._timed(shards[index], cursors[index].fetchmany(batch_size)))
+                row = next(pending[index], None)
+            if row is not None:
+                heapq.heappush(heap, (key(row), index, row))
+
+        await asyncio.gather(*(advance(index) for index in range(len(cursors))))
+        while heap:
+            _, index, row = heapq.heappop(heap)
+            yield row
+            await advance(index)
+
+    async def _timed(self, shard: Shard, operation: Awaitable[Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return await operation
+        finally:
+            self._queries[shard.name][1] += time.perf_counter() - start
+
+def write_shard(source: str, target: str, where: str = "1", params: tuple = (), orphans: bool = False) -> int:
+    """Copy the papers matching `where` with their field and author links into a new shard; returns papers copied.
+
+    `fields` is copied whole and the source's indexes are recreated. Link
+    rows whose paper is missing from the source only go to the shard
+    written with `orphans`, so exactly one shard counts them as SQLite does.
+    """
+    conn = sqlite3.connect(target)
+    try:
+        conn.execute("ATTACH DATABASE ? AS source", (source,))
+        marks = ", ".join("?" * len(SHARD_TABLES))
+        schema = conn.execute(
+            f"SELECT type, sql FROM source.sqlite_master WHERE tbl_name IN ({marks}) AND sql IS NOT NULL",
+            SHARD_TABLES
+        ).fetchall()
+        for kind, sql in schema:
+            if kind == "table":
+                conn.execute(sql)
+        copied = conn.execute(f"INSERT INTO papers SELECT * FROM source.papers WHERE {where}", params).rowcount
+        conn.execute("INSERT INTO fields SELECT * FROM source.fields")
+        for table in LINK_TABLES:
+            keep = "paper_id IN (SELECT paper_id FROM main.papers)"
+            if orphans:
+                keep += " OR paper_id IS NULL OR paper_id NOT IN (SELECT paper_id FROM source.papers)"
+            conn.execute(f"INSERT INTO {table} SELECT * FROM source.{table} WHERE {keep}")
+        for kind, sql in schema:
+            if kind == "index":
+                conn.execute(sql)
+        conn.commit()
+        conn.execute("DETACH DATABASE source")
+        return copied
+    finally:
+        conn.close()
+
+def _citation_order(row: tuple) -> int:
+    return -row[2]
+
+def _year_order(row: tuple) -> tuple:
+    # (year, citation_count DESC) with NULL counts last, matching the year_range statement
+    return (row[2], row[3] is None, -(row[3] or 0))
+
+def _keyset_order(row: tuple) -> tuple:
+    return (row[2], row[3] is None, -(row[3] or 0), row[0])
+
+def _unique_papers(rows: Iterable[tuple], position: int, key: OrderKey) -> Iterator[tuple]:
+    # Copies of a paper sort under the same key, so only the current run of equal keys is remembered
+    run, seen = None, set()
+    for row in rows:
+        row_key = key(row)
+        if row_key != run:
+            run, seen = row_key, set()
+        if row[position] not in seen:
+            seen.add(row[position])
+            yield row
+
+async def _unique_papers_async(rows: AsyncIterator[tuple], position: int, key: OrderKey) -> AsyncIterator[tuple]:
+    run, seen = None, set()
+    async for row in rows:
+        row_key = key(row)
+        if row_key != run:
+            run, seen = row_key, set()
+        if row[position] not in seen:
+            seen.add(row[position])
+            yield row
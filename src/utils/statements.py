@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Any, Dict, Mapping
+from weakref import WeakKeyDictionary
+
+# Python's sqlite3 default for `cached_statements`
+DEFAULT_CACHE_SIZE = 128
+
+class StatementStats:
+    __slots__ = ("executions", "estimated_prepares", "seconds", "rows")
+
+    def __init__(self):
+        self.executions = 0
+        self.estimated_prepares = 0
+        self.seconds = 0.0
+        self.rows = 0
+
+class StatementRegistry:
+    """Named SQL statements with execution statistics and estimated statement-cache reuse.
+
+    Python's sqlite3 keeps compiled statements in a per-connection LRU of
+    `cached_statements` entries keyed by SQL text, so repeats on a
+    long-lived connection skip parsing and planning. That cache is not
+    observable; the registry replays each connection's executions through
+    an LRU of the same size to estimate which ones compiled, and
+    accumulates executions, time and rows under the statement's registered
+    name. Unregistered SQL is counted under a caller-supplied fallback name
+    to keep the set of names bounded.
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        if cache_size < 0:
+            raise ValueError("Statement cache size cannot be negative")
+        self.cache_size = cache_size
+        self._names: Dict[str, str] = {}
+        self._cached: "WeakKeyDictionary[Any, OrderedDict[str, None]]" = WeakKeyDictionary()
+        self._stats: Dict[str, StatementStats] = {}
+
+    def register(self, name: str, sql: str):
+        self._names[sql] = name
+
+    def register_all(self, statements: Mapping[str, str]):
+        """Register a name -> SQL mapping"""
+        for name, sql in statements.items():
+            self.register(name, sql)
+
+    def name_of(self, sql: str, default: str = "adhoc") -> str:
+        return self._names.get(sql, default)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def note_execution(self, conn: Any, sql: str) -> bool:
+        """Note that `sql` is about to run on `conn`; True when it is estimated to compile first"""
+        cache = self._cached.get(conn)
+        if cache is None:
+            cache = self._cached[conn] = OrderedDict()
+        if sql in cache:
+            cache.move_to_end(sql)
+            return False
+        if self.cache_size:
+            cache[sql] = None
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return True
+
+    def record(self, name: str, seconds: float, rows: int, compiled: bool):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = StatementStats()
+        stats.executions += 1
+        stats.estimated_prepares += compiled
+        stats.seconds += seconds
+        stats.rows += rows
+
+    def reset(self):
+        """Forget statistics and every connection's estimated cache"""
+        self._stats.clear()
+        self._cached.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-statement executions, time and rows, with estimated prepares and reuse rate"""
+        return {
+            "cache_size": self.cache_size,
+            "registered": len(self._names),
+            "connections": len(self._cached),
+            "statements": {
+                name: {
+                    "executions": stats.executions,
+                    "estimated_prepares": stats.estimated_prepares,
+                    "estimated_reuse_rate": (
+                        round(1 - stats.estimated_prepares / stats.executions, 4) if stats.executions else 0.0
+                    ),
+                    "total_ms": round(stats.seconds * 1000, 3),
+                    "avg_ms": round(stats.seconds * 1000 / stats.executions, 3) if stats.executions else 0.0,
+                    "rows": stats.rows,
+                }
+                for name, stats in sorted(self._stats.items())
+            }
+        }
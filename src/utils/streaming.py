@@ -0,0 +1,15 @@
+from typing import Any, Dict
+from langgraph.config import get_stream_writer
+from src.utils.encoding import dumps
+
+def emit_event(event: str, payload: Dict[str, Any]):
+    """Send a custom event to LangGraph stream consumers; a no-op outside a streamed run"""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"event": event, "data": payload})
+
+def format_sse(event: str, payload: Any) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {dumps(payload).decode()}\n\n"
@@ -0,0 +1,157 @@
+"""Materialized aggregate tables for the SciSciNet snapshot.
+
+Build them offline into the database file with:
+
+    python -m src.utils.summary_tables build --db data/sciscinet_vt_cs_2013_2022.db
+
+The query layer in `src.utils.database` reads from a summary table only while
+its recorded source signature still matches the raw tables.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+META_TABLE = "summary_meta"
+
+SUMMARIES: Dict[str, Dict[str, object]] = {
+    "papers_by_year": {
+        "table": "summary_papers_by_year",
+        "sources": {"papers": ("year",)},
+        "build": """
+            SELECT year, COUNT(*) as count
+            FROM papers
+            WHERE year IS NOT NULL
+            GROUP BY year
+        """,
+        "select": "SELECT year, count FROM summary_papers_by_year ORDER BY year",
+    },
+    "papers_by_field": {
+        "table": "summary_papers_by_field",
+        "sources": {"fields": ("field_id", "field_name"), "paper_fields": ("paper_id", "field_id")},
+        "build": """
+            SELECT f.field_name, COUNT(DISTINCT pf.paper_id) as count
+            FROM fields f
+            JOIN paper_fields pf ON f.field_id = pf.field_id
+            GROUP BY f.field_name
+        """,
+        "select": "SELECT field_name, count FROM summary_papers_by_field ORDER BY count DESC",
+    },
+    "collaboration": {
+        "table": "summary_collaboration",
+        "sources": {"papers": ("paper_id", "year"), "paper_author_affiliations": ("paper_id", "author_id")},
+        "build": """
+            SELECT p.year, COUNT(DISTINCT paa.author_id) as author_count,
+                   COUNT(DISTINCT p.paper_id) as paper_count
+            FROM papers p
+            JOIN paper_author_affiliations paa ON p.paper_id = paa.paper_id
+            WHERE p.year IS NOT NULL
+            GROUP BY p.year
+        """,
+        "select": "SELECT year, author_count, paper_count FROM summary_collaboration ORDER BY year",
+    },
+}
+
+# Columns hashed with `text_hash`; the rest are integers mixed in SQL
+TEXT_COLUMNS = {"field_name", "title"}
+# Row hashes stay below 2**31, so their sum cannot overflow SQLite's 64-bit integers
+_MODULUS = 2147483647
+_MULTIPLIER = 1000003
+
+def text_hash(value: Optional[str]) -> int:
+    return -1 if value is None else zlib.crc32(value.encode())
+
+def _row_hash(columns: Tuple[str, ...]) -> str:
+    mixed = "0"
+    for column in columns:
+        value = f"text_hash({column})" if column in TEXT_COLUMNS else f"IFNULL({column}, -1)"
+        mixed = f"(({mixed}) * {_MULTIPLIER} + {value} % {_MODULUS}) % {_MODULUS}"
+    # Squaring makes the sum depend on which values share a row, not only on each column's total
+    return f"({mixed}) * ({mixed}) % {_MODULUS}"
+
+def signature_query(sources: Dict[str, Tuple[str, ...]]) -> str:
+    """SQL returning one row that identifies the current contents of the columns the summaries read.
+
+    Row counts alone miss UPDATEs, so each table contributes a checksum
+    over its aggregated columns. The connection needs `text_hash`
+    registered (see `source_signature`).
+    """
+    parts = [
+        f"(SELECT COUNT(*) || ':' || IFNULL(SUM({_row_hash(columns)}), 0) FROM {table})"
+        for table, columns in sources.items()
+    ]
+    return "SELECT " + " || '|' || ".join(parts) + " AS signature"
+
+def source_signature(conn: sqlite3.Connection, sources: Dict[str, Tuple[str, ...]]) -> str:
+    """Current signature of the source columns, read on a plain sqlite3 connection"""
+    conn.create_function("text_hash", 1, text_hash, deterministic=True)
+    return conn.execute(signature_query(sources)).fetchone()[0]
+
+def meta_query() -> str:
+    """SQL returning the recorded signature of one summary table"""
+    return f"SELECT signature FROM {META_TABLE} WHERE name = ?"
+
+def build_summaries(db_path: str, names: List[str] = None) -> List[Tuple[str, int, float]]:
+    """Materialize summary tables inside the database file; returns (name, rows, seconds)"""
+    results = []
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {META_TABLE} "
+            "(name TEXT PRIMARY KEY, signature TEXT NOT NULL, built_at REAL NOT NULL)"
+        )
+        for name in names or list(SUMMARIES):
+            summary = SUMMARIES[name]
+            table = summary["table"]
+            start = time.perf_counter()
+            with conn:
+                conn.execute("BEGIN")
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"CREATE TABLE {table} AS {summary['build']}")
+                signature = source_signature(conn, summary["sources"])
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {META_TABLE} (name, signature, built_at) VALUES (?, ?, ?)",
+                    (name, signature, time.time())
+                )
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            results.append((name, rows, time.perf_counter() - start))
+    finally:
+        conn.close()
+    return results
+
+def drop_summaries(db_path: str):
+    """Remove all summary tables and their metadata"""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            for summary in SUMMARIES.values():
+                conn.execute(f"DROP TABLE IF EXISTS {summary['table']}")
+            conn.execute(f"DROP TABLE IF EXISTS {META_TABLE}")
+    finally:
+        conn.close()
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage materialized summary tables")
+    parser.add_argument("command", choices=["build", "drop"])
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", "data/sciscinet_vt_cs_2013_2022.db"))
+    parser.add_argument("--only", action="append", choices=list(SUMMARIES), help="Build only these summaries")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+
+    if args.command == "drop":
+        drop_summaries(args.db)
+        print(f"Dropped summary tables from {args.db}")
+        return 0
+
+    for name, rows, seconds in build_summaries(args.db, args.only):
+        print(f"{name:<20} {rows:>8} rows  {seconds:8.3f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
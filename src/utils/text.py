@@ -0,0 +1,29 @@
+import re
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "me", "us", "show", "give", "display", "list", "get", "please",
+    "can", "could", "you", "i", "want", "to", "see", "what", "are", "is", "of", "number",
+})
+
+SYNONYMS = {
+    "per": "by",
+    "each": "by",
+    "paper": "papers",
+    "citations": "cited",
+    "citation": "cited",
+    "fields": "field",
+    "years": "year",
+    "yearly": "year",
+}
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a user query for cache keys.
+
+    Lowercases, strips punctuation, drops filler words and folds a few
+    synonyms so that "Show me papers per year" and "papers by year" match.
+    """
+    tokens = [SYNONYMS.get(token, token) for token in _TOKEN.findall(query.lower())]
+    kept = [token for token in tokens if token not in FILLER_WORDS]
+    return " ".join(kept or tokens)
@@ -0,0 +1,89 @@
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+class Span:
+    __slots__ = ("name", "parent", "start", "duration")
+
+    def __init__(self, name: str, parent: Optional[str], start: float, duration: float):
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.duration = duration
+
+class Trace:
+    """Spans and cache outcomes collected while serving one request.
+
+    The trace object is shared by every task spawned under it (LangGraph
+    nodes, coalesced query flights), so spans from parallel nodes land in
+    the same trace; the enclosing span name is tracked per task.
+    """
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.flags: Dict[str, str] = {}
+
+    def timings(self) -> Dict[str, Any]:
+        """Total and per-stage milliseconds, cache outcomes and the span waterfall"""
+        stages: Dict[str, float] = {}
+        for span in self.spans:
+            stages[span.name] = stages.get(span.name, 0.0) + span.duration
+        return {
+            "total_ms": _ms(time.perf_counter() - self.start),
+            "stages": {name: _ms(seconds) for name, seconds in stages.items()},
+            "cache": dict(self.flags),
+            "spans": [
+                {
+                    "name": span.name,
+                    "parent": span.parent,
+                    "start_ms": _ms(span.start - self.start),
+                    "duration_ms": _ms(span.duration)
+                }
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ]
+        }
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+@contextmanager
+def start_trace(enabled: bool = True, trace_id: Optional[str] = None) -> Iterator[Optional[Trace]]:
+    """Collect spans for the enclosed work; yields None and records nothing when disabled"""
+    if not enabled:
+        yield None
+        return
+    trace = Trace(trace_id)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as a named span of the current trace, if any"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append(Span(name, parent, start, time.perf_counter() - start))
+        _current_span.reset(token)
+
+def set_flag(name: str, value: str):
+    """Record an outcome such as a cache hit on the current trace, if any"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.flags[name] = value
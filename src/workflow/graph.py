@@ -1,47 +1,142 @@
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage
 from src.models.state import AgentState
 from src.agents.filtering_agent import filtering_agent
 from src.agents.analysis_agent import analysis_agent
-from src.agents.visualization_agent import visualization_agent
+from src.agents.visualization_agent import visualization_agent, draft_visualization_agent
+from src.utils.metrics import timed_node
+from src.utils.tracing import span
 
 def create_workflow() -> StateGraph:
     """Create the multi-agent workflow using LangGraph"""
     workflow = StateGraph(AgentState)
     
-    workflow.add_node("filtering", filtering_agent)
-    workflow.add_node("analysis", analysis_agent)
-    workflow.add_node("visualization", visualization_agent)
+    workflow.add_node("filtering", timed_node("filtering", filtering_agent))
+    workflow.add_node("analysis", timed_node("analysis", analysis_agent))
+    workflow.add_node("draft_visualization", timed_node("draft_visualization", draft_visualization_agent))
+    workflow.add_node("visualization", timed_node("visualization", visualization_agent))
     
     workflow.set_entry_point("filtering")
     
+    # Fan out: a heuristic chart is drafted while the analysis LLM call is in flight
     workflow.add_edge("filtering", "analysis")
-    workflow.add_edge("analysis", "visualization")
+    workflow.add_edge("filtering", "draft_visualization")
+    workflow.add_edge(["analysis", "draft_visualization"], "visualization")
     workflow.add_edge("visualization", END)
     
     return workflow.compile()
 
-async def process_query(user_query: str) -> dict:
-    """Process user query through the agent workflow"""
-    app = create_workflow()
-    
-    initial_state = {
+class WorkflowRegistry:
+    """Process-wide registry of compiled workflow graphs, keyed by version.
+
+    Each builder is compiled at most once and the compiled graph is shared
+    across requests. Registering a new version and activating it swaps the
+    graph used by `process_query` without restarting the server.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable] = {}
+        self._compiled: Dict[str, object] = {}
+        self.active_version: Optional[str] = None
+
+    def register(self, version: str, builder: Callable, activate: bool = False):
+        """Register a graph builder under a version name"""
+        self._builders[version] = builder
+        self._compiled.pop(version, None)
+        if activate or self.active_version is None:
+            self.active_version = version
+
+    def activate(self, version: str):
+        """Make a registered version the one served to new requests"""
+        if version not in self._builders:
+            raise KeyError(f"Unknown workflow version: {version}")
+        self.active_version = version
+
+    def get(self, version: Optional[str] = None):
+        """Return the compiled graph for a version, compiling it on first use"""
+        version = version or self.active_version
+        if version not in self._builders:
+            raise KeyError(f"Unknown workflow version: {version}")
+        compiled = self._compiled.get(version)
+        if compiled is None:
+            compiled = self._builders[version]()
+            self._compiled[version] = compiled
+        return compiled
+
+    def warmup(self):
+        """Compile every registered version ahead of the first request"""
+        for version in self._builders:
+            self.get(version)
+
+    def versions(self) -> Dict[str, bool]:
+        """Registered versions and whether each one is already compiled"""
+        return {version: version in self._compiled for version in self._builders}
+
+workflow_registry = WorkflowRegistry()
+workflow_registry.register("v1", create_workflow)
+
+def initial_state(user_query: str) -> dict:
+    """Empty agent state for a new query"""
+    return {
         "messages": [HumanMessage(content=user_query)],
         "user_query": user_query,
         "query_type": None,
+        "classification_source": None,
+        "query_spec": None,
         "data": None,
+        "data_has_more": None,
         "analysis_result": None,
+        "draft_vega_spec": None,
         "vega_spec": None,
         "next_step": None
     }
-    
-    result = await app.ainvoke(initial_state)
-    
+
+def build_response(user_query: str, result: dict) -> dict:
+    """Shape the final workflow state into the API response"""
     return {
         "query": user_query,
         "query_type": result.get("query_type"),
+        "classification_source": result.get("classification_source"),
+        "query_spec": result.get("query_spec"),
         "analysis": result.get("analysis_result"),
         "vega_spec": result.get("vega_spec"),
-        "data_count": len(result.get("data", []))
+        "data_count": len(result.get("data") or []),
+        "has_more": bool(result.get("data_has_more"))
     }
 
+async def process_query(user_query: str) -> dict:
+    """Process user query through the agent workflow"""
+    app = workflow_registry.get()
+    with span("workflow"):
+        result = await app.ainvoke(initial_state(user_query))
+    return build_response(user_query, result)
+
+async def stream_query(user_query: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (event, payload) pairs as each stage of the workflow completes"""
+    app = workflow_registry.get()
+    state = initial_state(user_query)
+    
+    async for mode, chunk in app.astream(state, stream_mode=["custom", "updates"]):
+        if mode == "custom":
+            yield chunk["event"], chunk["data"]
+            continue
+        
+        for node, update in chunk.items():
+            state.update(update or {})
+            if node == "filtering":
+                yield "data", {
+                    "query_type": state.get("query_type"),
+                    "data_count": len(state.get("data") or []),
+                    "has_more": bool(state.get("data_has_more")),
+                    "data": state.get("data")
+                }
+            elif node == "draft_visualization":
+                yield "draft_visualization", {"vega_spec": state.get("draft_vega_spec")}
+            elif node == "analysis":
+                yield "analysis", {"analysis": state.get("analysis_result")}
+            elif node == "visualization":
+                yield "visualization", {"vega_spec": state.get("vega_spec")}
+    
+    response = build_response(user_query, state)
+    yield "done", {key: value for key, value in response.items() if key not in ("analysis", "vega_spec")}
@@ -1,5 +1,7 @@
 import pytest
 import os
+import random
+import sqlite3
 import sys
 from pathlib import Path
 
@@ -9,6 +11,23 @@ sys.path.insert(0, str(project_root))
 os.environ["DATABASE_PATH"] = str(project_root / "data" / "sciscinet_vt_cs_2013_2022.db")
 os.environ["ANTHROPIC_API_KEY"] = os.getenv("ANTHROPIC_API_KEY", "test-key-placeholder")
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Keep cached classifications, results, responses and router counters from leaking between tests"""
+    from src.utils.classification_cache import classification_cache
+    from src.utils.database import result_cache
+    from src.agents.query_router import query_router
+    from src.api.routes import response_cache
+    classification_cache.clear()
+    result_cache.clear()
+    response_cache.clear()
+    yield
+    classification_cache.clear()
+    result_cache.clear()
+    result_cache.reset_stats()
+    response_cache.clear()
+    query_router.reset_stats()
+
 @pytest.fixture
 def sample_papers_by_year():
     """Sample data for papers by year"""
@@ -66,3 +85,80 @@ def mock_llm_response():
         return MockResponse(content)
     return _create_response
 
+@pytest.fixture
+def sample_database(tmp_path):
+    """Small SciSciNet-shaped SQLite database on disk"""
+    path = tmp_path / "sample.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE papers (paper_id INTEGER PRIMARY KEY, title TEXT, year INTEGER, citation_count INTEGER);
+        CREATE TABLE fields (field_id INTEGER PRIMARY KEY, field_name TEXT);
+        CREATE TABLE paper_fields (paper_id INTEGER, field_id INTEGER);
+        CREATE TABLE paper_author_affiliations (paper_id INTEGER, author_id INTEGER, affiliation_id INTEGER);
+    """)
+    papers = [(i, f"Paper {i}", 2013 + i % 10, (i * 37) % 101) for i in range(1, 61)]
+    conn.executemany("INSERT INTO papers VALUES (?, ?, ?, ?)", papers)
+    conn.executemany("INSERT INTO fields VALUES (?, ?)", [(1, "Machine Learning"), (2, "Robotics"), (3, "Databases")])
+    conn.executemany("INSERT INTO paper_fields VALUES (?, ?)", [(i, 1 + i % 3) for i in range(1, 61)])
+    conn.executemany(
+        "INSERT INTO paper_author_affiliations VALUES (?, ?, ?)",
+        [(i, 100 + (i + k) % 25, 1) for i in range(1, 61) for k in range(1 + i % 3)]
+    )
+    conn.commit()
+    conn.close()
+    return str(path)
+
+@pytest.fixture
+def awkward_database(tmp_path):
+    """Random SciSciNet-shaped data with NULLs, ties, duplicate field names and dangling links"""
+    from src.utils.index_advisor import create_indexes
+    rng = random.Random(7)
+    path = tmp_path / "awkward.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE papers (paper_id INTEGER PRIMARY KEY, title TEXT, year INTEGER, citation_count INTEGER);
+        CREATE TABLE fields (field_id INTEGER PRIMARY KEY, field_name TEXT);
+        CREATE TABLE paper_fields (paper_id INTEGER, field_id INTEGER);
+        CREATE TABLE paper_author_affiliations (paper_id INTEGER, author_id INTEGER, affiliation_id INTEGER);
+    """)
+    papers = [
+        (
+            paper_id,
+            f"Paper {paper_id}",
+            None if rng.random() < 0.05 else rng.randint(2013, 2022),
+            None if rng.random() < 0.1 else rng.choice([0, 1, 5, 5, 20, rng.randint(0, 500)])
+        )
+        for paper_id in rng.sample(range(1, 5000), 800)
+    ]
+    # Titles that collide with the bulk loader's NULL marker and separator, plus a real NULL
+    papers[:4] = [(paper[0], title) + paper[2:] for paper, title in zip(papers, ["\x1e", "a\x1fb", None, ""])]
+    conn.executemany("INSERT INTO papers VALUES (?, ?, ?, ?)", papers)
+    conn.executemany(
+        "INSERT INTO fields VALUES (?, ?)",
+        [(1, "Robotics"), (2, "Databases"), (3, "Robotics"), (4, "Graphics"), (5, "Unused"), (6, None)]
+    )
+    ids = [paper[0] for paper in papers] + [9001, 9002]
+    conn.executemany(
+        "INSERT INTO paper_fields VALUES (?, ?)",
+        [(rng.choice(ids), rng.choice([1, 2, 3, 4, 6, 7])) for _ in range(1500)] + [(None, 4), (None, 2)]
+    )
+    conn.executemany(
+        "INSERT INTO paper_author_affiliations VALUES (?, ?, ?)",
+        [(rng.choice(ids), None if rng.random() < 0.02 else rng.randint(1, 300), 1) for _ in range(3000)]
+    )
+    conn.commit()
+    create_indexes(conn)
+    conn.close()
+    return str(path)
+
+@pytest.fixture
+def sqlite_rows():
+    """Column names and rows SQLite itself returns for a query on a database file"""
+    def _rows(path, query, params=()):
+        conn = sqlite3.connect(path)
+        try:
+            cursor = conn.execute(query, params)
+            return [column[0] for column in cursor.description], cursor.fetchall()
+        finally:
+            conn.close()
+    return _rows
@@ -1,10 +1,18 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from langchain_core.messages import HumanMessage, AIMessage
 
 from src.agents.filtering_agent import filtering_agent
 from src.agents.analysis_agent import analysis_agent
-from src.agents.visualization_agent import visualization_agent, create_vega_lite_spec
+from src.agents.visualization_agent import (
+    visualization_agent,
+    draft_visualization_agent,
+    create_vega_lite_spec,
+    infer_encoding
+)
+from src.agents.query_router import QueryRouter
+from src.utils.classification_cache import classification_cache
 from src.models.state import AgentState
 
 @pytest.mark.asyncio
@@ -20,7 +28,7 @@ async def test_filtering_agent_papers_by_year(sample_papers_by_year, mock_llm_re
         "next_step": None
     }
     
-    with patch('src.agents.filtering_agent.ChatAnthropic') as mock_llm:
+    with patch('src.agents.filtering_agent.get_llm') as mock_llm:
         mock_instance = AsyncMock()
         mock_instance.ainvoke = AsyncMock(return_value=mock_llm_response("papers_by_year"))
         mock_llm.return_value = mock_instance
@@ -30,7 +38,7 @@ async def test_filtering_agent_papers_by_year(sample_papers_by_year, mock_llm_re
     
     assert result["query_type"] == "papers_by_year"
     assert result["data"] == sample_papers_by_year
-    assert len(result["messages"]) == 2
+    assert [message.content for message in result["messages"]] == [f"Fetched {len(sample_papers_by_year)} records for papers_by_year"]
     assert result["next_step"] == "analysis"
 
 @pytest.mark.asyncio
@@ -46,7 +54,7 @@ async def test_filtering_agent_papers_by_field(sample_papers_by_field, mock_llm_
         "next_step": None
     }
     
-    with patch('src.agents.filtering_agent.ChatAnthropic') as mock_llm:
+    with patch('src.agents.filtering_agent.get_llm') as mock_llm:
         mock_instance = AsyncMock()
         mock_instance.ainvoke = AsyncMock(return_value=mock_llm_response("papers_by_field"))
         mock_llm.return_value = mock_instance
@@ -81,7 +89,7 @@ async def test_analysis_agent_with_data(sample_papers_by_year, mock_llm_response
     }
     '''
     
-    with patch('src.agents.analysis_agent.ChatAnthropic') as mock_llm:
+    with patch('src.agents.analysis_agent.get_llm') as mock_llm:
         mock_instance = AsyncMock()
         mock_instance.ainvoke = AsyncMock(return_value=mock_llm_response(analysis_json))
         mock_llm.return_value = mock_instance
@@ -185,3 +193,188 @@ def test_create_vega_lite_spec_area_chart(sample_papers_by_year):
     assert spec["mark"]["type"] == "area"
     assert spec["mark"]["line"] == True
 
+def test_create_vega_lite_spec_reduces_large_results():
+    """Test paper-level rows are aggregated per year before being embedded in the spec"""
+    papers = [
+        {"paper_id": i, "title": f"Paper {i}", "year": 2013 + i % 10, "citation_count": i % 5}
+        for i in range(5000)
+    ]
+    analysis = {"viz_type": "bar", "x_field": "year", "y_field": "citation_count"}
+    
+    spec = create_vega_lite_spec(papers, analysis, "Citations by year")
+    
+    assert len(spec["data"]["values"]) == 10
+    assert spec["usermeta"]["reduction"]["input_rows"] == 5000
+    assert spec["usermeta"]["reduction"]["steps"] == ["group_by"]
+    assert spec["encoding"]["y"]["title"] == "citation_count (sum)"
+
+
+@pytest.mark.asyncio
+async def test_filtering_agent_caches_classification(sample_papers_by_year, mock_llm_response):
+    """Test repeated phrasings reuse the cached classification"""
+    def make_state(query):
+        return {
+            "messages": [HumanMessage(content=query)],
+            "user_query": query,
+            "query_type": None,
+            "data": None,
+            "analysis_result": None,
+            "vega_spec": None,
+            "next_step": None
+        }
+    
+    with patch('src.agents.filtering_agent.get_llm') as mock_llm:
+        mock_instance = AsyncMock()
+        mock_instance.ainvoke = AsyncMock(return_value=mock_llm_response("papers_by_year"))
+        mock_llm.return_value = mock_instance
+        
+        with patch('src.agents.filtering_agent.get_papers_by_year', return_value=sample_papers_by_year):
+            first = await filtering_agent(make_state("what does the data look like"))
+            second = await filtering_agent(make_state("What does the data look like?"))
+    
+    assert first["query_type"] == second["query_type"] == "papers_by_year"
+    assert first["classification_source"] == "llm"
+    assert second["classification_source"] == "cache"
+    assert mock_instance.ainvoke.await_count == 1
+
+@pytest.mark.asyncio
+async def test_filtering_agent_router_skips_llm(sample_top_cited):
+    """Test confident rule matches bypass the LLM entirely"""
+    state = {
+        "messages": [HumanMessage(content="What are the most cited papers?")],
+        "user_query": "What are the most cited papers?",
+        "query_type": None,
+        "data": None,
+        "analysis_result": None,
+        "vega_spec": None,
+        "next_step": None
+    }
+    
+    with patch('src.agents.filtering_agent.get_llm') as mock_llm, \
+         patch('src.agents.filtering_agent.get_top_cited_papers', return_value=sample_top_cited):
+        result = await filtering_agent(state)
+    
+    assert result["query_type"] == "top_cited"
+    assert result["classification_source"] == "rules"
+    mock_llm.assert_not_called()
+
+def test_query_router_rules_and_fallback():
+    """Test rule confidence and LLM fallback on ambiguous queries"""
+    router = QueryRouter(threshold=0.75)
+    
+    assert router.route("Show me papers by year").query_type == "papers_by_year"
+    assert router.route("papers by field").query_type == "papers_by_field"
+    assert router.route("robotics papers from 2018 to 2020").query_type == "year_range"
+    assert router.route("Show me collaboration statistics").query_type == "collaboration"
+    assert router.route("collaboration trends over time") is None
+    assert router.route("tell me something interesting") is None
+
+def test_query_router_ngram_model():
+    """Test the n-gram model classifies phrasings the rules miss"""
+    router = QueryRouter(threshold=0.75)
+    router.train([
+        ("which works have the biggest impact", "top_cited"),
+        ("biggest impact works", "top_cited"),
+        ("teamwork among researchers", "collaboration"),
+        ("researchers teamwork statistics", "collaboration"),
+    ])
+    
+    decision = router.route("works with the biggest impact")
+    assert decision.query_type == "top_cited"
+    assert decision.source == "model"
+
+def test_query_router_stats():
+    """Test path counters and estimated savings"""
+    router = QueryRouter()
+    router.record("llm", 1.0)
+    router.record("rules", 0.001)
+    router.record("rules", 0.001)
+    
+    stats = router.stats()
+    assert stats["counts"] == {"llm": 1, "rules": 2}
+    assert stats["llm_calls_avoided"] == 2
+    assert stats["estimated_latency_saved_ms"] == pytest.approx(1998.0)
+
+def test_infer_encoding_from_data(sample_papers_by_year, sample_papers_by_field, sample_top_cited):
+    """Test heuristic chart choices made without the analysis LLM"""
+    assert infer_encoding(sample_papers_by_year) == {"viz_type": "line", "x_field": "year", "y_field": "count"}
+    assert infer_encoding(sample_papers_by_field) == {"viz_type": "bar", "x_field": "field_name", "y_field": "count"}
+    assert infer_encoding(sample_top_cited)["y_field"] == "citation_count"
+
+@pytest.mark.asyncio
+async def test_visualization_agent_refines_draft(sample_papers_by_year):
+    """Test analysis choices override the draft and unknown fields are ignored"""
+    state = {
+        "messages": [],
+        "user_query": "Show me papers by year",
+        "query_type": "papers_by_year",
+        "data": sample_papers_by_year,
+        "analysis_result": {"viz_type": "area", "x_field": "year", "y_field": "papers"},
+        "draft_vega_spec": {"mark": "draft"},
+        "vega_spec": None,
+        "next_step": None
+    }
+    
+    result = await visualization_agent(state)
+    
+    assert result["vega_spec"]["mark"]["type"] == "area"
+    assert result["vega_spec"]["encoding"]["y"]["field"] == "count"
+
+@pytest.mark.asyncio
+async def test_analysis_deadline_serves_draft(sample_papers_by_year):
+    """Test a slow analysis call falls back to the heuristic spec after the deadline"""
+    state = {
+        "messages": [],
+        "user_query": "Show me papers by year",
+        "query_type": "papers_by_year",
+        "data": sample_papers_by_year,
+        "analysis_result": None,
+        "draft_vega_spec": None,
+        "vega_spec": None,
+        "next_step": None
+    }
+    
+    async def slow_llm(*args, **kwargs):
+        await asyncio.sleep(1)
+    
+    with patch('src.agents.analysis_agent.get_llm') as mock_llm, \
+         patch('src.agents.analysis_agent.ANALYSIS_DEADLINE', 0.01):
+        mock_instance = AsyncMock()
+        mock_instance.ainvoke = AsyncMock(side_effect=slow_llm)
+        mock_llm.return_value = mock_instance
+        
+        analysis = await analysis_agent(state)
+    
+    draft = await draft_visualization_agent(state)
+    result = await visualization_agent({**state, **draft, "analysis_result": analysis["analysis_result"]})
+    
+    assert analysis["analysis_result"]["timed_out"] is True
+    assert result["vega_spec"] is draft["draft_vega_spec"]
+
+@pytest.mark.asyncio
+async def test_filtering_agent_pushes_planned_filters_into_sql(sample_database, mock_llm_response):
+    """Test filters the LLM plans are applied in SQL and not cached as a bare category"""
+    query = "what did the robotics group publish lately"
+    state = {
+        "messages": [HumanMessage(content=query)],
+        "user_query": query,
+        "query_type": None,
+        "data": None,
+        "analysis_result": None,
+        "vega_spec": None,
+        "next_step": None
+    }
+    plan = '{"query_type": "year_range", "year_from": 2020, "year_to": null, "fields": ["robotics"], "min_citations": null, "limit": null}'
+    
+    with patch('src.agents.filtering_agent.get_llm') as mock_llm, \
+         patch('src.utils.database.DATABASE_PATH', sample_database):
+        mock_instance = AsyncMock()
+        mock_instance.ainvoke = AsyncMock(return_value=mock_llm_response(plan))
+        mock_llm.return_value = mock_instance
+        result = await filtering_agent(state)
+    
+    assert result["query_type"] == "year_range"
+    assert result["query_spec"]["fields"] == ["Robotics"]
+    assert result["query_spec"]["year_from"] == 2020
+    assert result["data"] and all(row["year"] >= 2020 and row["paper_id"] % 3 == 1 for row in result["data"])
+    assert await classification_cache.get(query) is None
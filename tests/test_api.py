@@ -1,3 +1,5 @@
+import asyncio
+import json
 import pytest
 from httpx import AsyncClient, ASGITransport
 from unittest.mock import AsyncMock, patch
@@ -32,8 +34,8 @@ async def test_health_endpoint():
 @pytest.mark.asyncio
 async def test_query_endpoint_papers_by_year(sample_papers_by_year, mock_llm_response):
     """Test query endpoint with papers by year query"""
-    with patch('src.agents.filtering_agent.ChatAnthropic') as mock_filter_llm, \
-         patch('src.agents.analysis_agent.ChatAnthropic') as mock_analysis_llm, \
+    with patch('src.agents.filtering_agent.get_llm') as mock_filter_llm, \
+         patch('src.agents.analysis_agent.get_llm') as mock_analysis_llm, \
          patch('src.agents.filtering_agent.get_papers_by_year', return_value=sample_papers_by_year):
         
         filter_mock = AsyncMock()
@@ -63,8 +65,8 @@ async def test_query_endpoint_papers_by_year(sample_papers_by_year, mock_llm_res
 @pytest.mark.asyncio
 async def test_query_endpoint_papers_by_field(sample_papers_by_field, mock_llm_response):
     """Test query endpoint with papers by field query"""
-    with patch('src.agents.filtering_agent.ChatAnthropic') as mock_filter_llm, \
-         patch('src.agents.analysis_agent.ChatAnthropic') as mock_analysis_llm, \
+    with patch('src.agents.filtering_agent.get_llm') as mock_filter_llm, \
+         patch('src.agents.analysis_agent.get_llm') as mock_analysis_llm, \
          patch('src.agents.filtering_agent.get_papers_by_field', return_value=sample_papers_by_field):
         
         filter_mock = AsyncMock()
@@ -112,3 +114,241 @@ async def test_cors_headers():
     assert response.status_code == 200
     assert "access-control-allow-origin" in response.headers
 
+
+FAKE_RESULT = {
+    "query": "Show me papers by year",
+    "query_type": "papers_by_year",
+    "analysis": {"summary": "Test"},
+    "vega_spec": {"description": "Show me papers by year", "mark": "bar"},
+    "data_count": 10
+}
+
+@pytest.mark.asyncio
+async def test_query_endpoint_memoizes_response():
+    """Test repeated queries are served from the response cache, each wording with its own ETag"""
+    with patch('src.api.routes.process_query', AsyncMock(return_value=FAKE_RESULT)) as mock_process:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/api/v1/query", json={"query": "Show me papers by year"})
+            second = await client.post("/api/v1/query", json={"query": "papers per year"})
+            third = await client.post("/api/v1/query", json={"query": "Show me papers by year"})
+    
+    assert first.status_code == second.status_code == third.status_code == 200
+    assert mock_process.await_count == 1
+    assert first.headers["etag"] == third.headers["etag"]
+    assert first.headers["etag"] != second.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+    assert second.json()["query"] == "papers per year"
+    assert second.json()["vega_spec"]["description"] == "papers per year"
+    assert third.json()["vega_spec"]["description"] == "Show me papers by year"
+
+@pytest.mark.asyncio
+async def test_query_endpoint_cache_keeps_filters_apart():
+    """Test wordings that normalize alike but state different filters are cached separately"""
+    with patch('src.api.routes.process_query', AsyncMock(return_value=FAKE_RESULT)) as mock_process:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/v1/query", json={"query": "papers 2018-2020"})
+            await client.post("/api/v1/query", json={"query": "papers 2018, 2020"})
+            await client.post("/api/v1/query", json={"query": "Papers 2018 - 2020"})
+    
+    assert mock_process.await_count == 2
+
+@pytest.mark.asyncio
+async def test_query_endpoint_conditional_get():
+    """Test If-None-Match with the current ETag returns 304"""
+    with patch('src.api.routes.process_query', AsyncMock(return_value=FAKE_RESULT)):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/api/v1/query", params={"query": "Show me papers by year"})
+            etag = first.headers["etag"]
+            second = await client.get(
+                "/api/v1/query",
+                params={"query": "Show me papers by year"},
+                headers={"If-None-Match": etag}
+            )
+            third = await client.get(
+                "/api/v1/query",
+                params={"query": "Show me papers by year"},
+                headers={"If-None-Match": '"stale"'}
+            )
+    
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert third.status_code == 200
+
+@pytest.mark.asyncio
+async def test_query_endpoint_negotiates_compression():
+    """Test responses are compressed per Accept-Encoding with a validator per coding"""
+    pytest.importorskip("brotli")
+    large = {**FAKE_RESULT, "vega_spec": {"data": {"values": [{"year": 2013 + i % 10, "count": i} for i in range(500)]}}}
+    with patch('src.api.routes.process_query', AsyncMock(return_value=large)):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            plain = await client.post("/api/v1/query", json={"query": "q"}, headers={"Accept-Encoding": "identity"})
+            gzipped = await client.post("/api/v1/query", json={"query": "q"}, headers={"Accept-Encoding": "gzip"})
+            brotli = await client.post("/api/v1/query", json={"query": "q"}, headers={"Accept-Encoding": "gzip;q=0.5, br"})
+            not_modified = await client.get(
+                "/api/v1/query",
+                params={"query": "q"},
+                headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]}
+            )
+    
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert brotli.headers["content-encoding"] == "br"
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    assert plain.json() == gzipped.json() == brotli.json()
+    assert len({plain.headers["etag"], gzipped.headers["etag"], brotli.headers["etag"]}) == 3
+    assert int(gzipped.headers["content-length"]) < len(plain.content) / 3
+    assert not_modified.status_code == 304
+
+@pytest.mark.asyncio
+async def test_query_endpoint_negotiates_gzip_without_brotli():
+    """Test gzip negotiation, Vary and per-coding validators when brotli is not installed"""
+    large = {**FAKE_RESULT, "vega_spec": {"data": {"values": [{"year": 2013 + i % 10, "count": i} for i in range(500)]}}}
+    with patch('src.api.routes.process_query', AsyncMock(return_value=large)), \
+         patch('src.utils.encoding.brotli', None):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            plain = await client.post("/api/v1/query", json={"query": "gz"}, headers={"Accept-Encoding": "identity"})
+            gzipped = await client.post("/api/v1/query", json={"query": "gz"}, headers={"Accept-Encoding": "br, gzip"})
+            br_only = await client.post("/api/v1/query", json={"query": "gz"}, headers={"Accept-Encoding": "br"})
+            not_modified = await client.get(
+                "/api/v1/query",
+                params={"query": "gz"},
+                headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]}
+            )
+    
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in br_only.headers
+    assert plain.headers["vary"] == gzipped.headers["vary"] == "Accept-Encoding"
+    assert plain.json() == gzipped.json() == br_only.json()
+    assert plain.headers["etag"] == br_only.headers["etag"] != gzipped.headers["etag"]
+    assert int(gzipped.headers["content-length"]) < len(plain.content) / 3
+    assert not_modified.status_code == 304
+
+@pytest.mark.asyncio
+async def test_query_endpoint_coalesces_concurrent_requests():
+    """Test concurrent identical queries trigger a single workflow run"""
+    async def slow_process(query):
+        await asyncio.sleep(0.05)
+        return FAKE_RESULT
+    
+    with patch('src.api.routes.process_query', AsyncMock(side_effect=slow_process)) as mock_process:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*[
+                client.post("/api/v1/query", json={"query": "Show me papers by year"})
+                for _ in range(5)
+            ])
+    
+    assert all(response.status_code == 200 for response in responses)
+    assert mock_process.await_count == 1
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+@pytest.mark.asyncio
+async def test_query_stream_emits_stage_events(sample_papers_by_year, mock_llm_response):
+    """Test the streaming endpoint emits one event per workflow stage in order"""
+    with patch('src.agents.analysis_agent.get_llm') as mock_analysis_llm, \
+         patch('src.agents.filtering_agent.get_papers_by_year', return_value=sample_papers_by_year):
+        
+        analysis_mock = AsyncMock()
+        analysis_json = '{"summary": "Test", "key_findings": [], "viz_type": "bar", "x_field": "year", "y_field": "count"}'
+        analysis_mock.ainvoke = AsyncMock(return_value=mock_llm_response(analysis_json))
+        mock_analysis_llm.return_value = analysis_mock
+        
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/v1/query/stream", json={"query": "Show me papers by year"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[:2] == ["classification", "data"]
+    assert set(names[2:4]) == {"analysis", "draft_visualization"}
+    assert names[4:] == ["visualization", "done"]
+    
+    payloads = dict(events)
+    assert payloads["classification"]["query_type"] == "papers_by_year"
+    assert payloads["data"]["data"] == sample_papers_by_year
+    assert payloads["visualization"]["vega_spec"]["mark"]["type"] == "bar"
+    assert payloads["done"]["data_count"] == len(sample_papers_by_year)
+
+@pytest.mark.asyncio
+async def test_query_ndjson_streams_full_year_range(sample_database, mock_llm_response):
+    """Test NDJSON mode sends the response line, then every row beyond the in-memory page"""
+    with patch('src.agents.analysis_agent.get_llm') as mock_analysis_llm, \
+         patch('src.utils.database.DATABASE_PATH', sample_database), \
+         patch('src.agents.filtering_agent.RESULT_ROW_LIMIT', 25):
+        
+        analysis_mock = AsyncMock()
+        analysis_json = '{"summary": "Test", "key_findings": [], "viz_type": "bar", "x_field": "year", "y_field": "citation_count"}'
+        analysis_mock.ainvoke = AsyncMock(return_value=mock_llm_response(analysis_json))
+        mock_analysis_llm.return_value = analysis_mock
+        
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/api/v1/query?format=ndjson",
+                json={"query": "papers from 2013 to 2022"}
+            )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    header, rows = lines[0], lines[1:]
+    assert header["query_type"] == "year_range"
+    assert header["data_count"] == 25
+    assert header["has_more"] is True
+    assert len(rows) == 60
+    keys = [(row["year"], -row["citation_count"], row["paper_id"]) for row in rows]
+    assert keys == sorted(keys)
+
+@pytest.mark.asyncio
+async def test_query_debug_returns_trace_and_timings(sample_database, mock_llm_response):
+    """Test debug mode returns a trace ID with per-stage timings and cache outcomes"""
+    with patch('src.agents.analysis_agent.get_llm') as mock_analysis_llm, \
+         patch('src.utils.database.DATABASE_PATH', sample_database):
+        
+        analysis_mock = AsyncMock()
+        analysis_json = '{"summary": "Test", "key_findings": [], "viz_type": "bar", "x_field": "year", "y_field": "count"}'
+        analysis_mock.ainvoke = AsyncMock(return_value=mock_llm_response(analysis_json))
+        mock_analysis_llm.return_value = analysis_mock
+        
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/api/v1/query?debug=true", json={"query": "Show me papers by year"})
+            second = await client.post("/api/v1/query?debug=true", json={"query": "Show me papers by year"})
+            plain = await client.post("/api/v1/query", json={"query": "Show me papers by year"})
+    
+    body = first.json()
+    assert first.headers["x-trace-id"] == body["trace_id"]
+    assert first.headers["cache-control"] == "no-store"
+    timings = body["timings"]
+    for stage in ("workflow", "classification", "db_fetch", "sql", "analysis", "visualization", "serialization"):
+        assert timings["stages"][stage] >= 0
+    assert timings["cache"]["response_cache"] == "miss"
+    assert timings["cache"]["result_cache"] == "miss"
+    assert {"name": "db_fetch", "parent": "filtering"}.items() <= next(
+        span for span in timings["spans"] if span["name"] == "db_fetch"
+    ).items()
+    
+    repeat = second.json()
+    assert repeat["trace_id"] != body["trace_id"]
+    assert repeat["timings"]["cache"] == {"response_cache": "hit"}
+    assert "workflow" not in repeat["timings"]["stages"]
+    
+    assert "timings" not in plain.json() and "trace_id" not in plain.json()
+    assert "x-trace-id" not in plain.headers
@@ -0,0 +1,93 @@
+import pytest
+from src.utils.cache import TTLCache, file_fingerprint
+from src.utils.classification_cache import ClassificationCache
+from src.utils.text import normalize_query
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_hit_and_miss():
+    """Test basic get/set with hit and miss counters"""
+    cache = TTLCache(maxsize=4)
+    
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+def test_ttl_cache_lru_eviction():
+    """Test least recently used entries are evicted first"""
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.evictions == 1
+
+def test_ttl_cache_expiry():
+    """Test entries expire after their TTL"""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    
+    clock.now = 9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_file_fingerprint(tmp_path):
+    """Test fingerprint changes when the file is rewritten"""
+    path = tmp_path / "data.db"
+    assert file_fingerprint(str(path)) is None
+    
+    path.write_bytes(b"a")
+    first = file_fingerprint(str(path))
+    path.write_bytes(b"ab")
+    
+    assert file_fingerprint(str(path)) != first
+
+def test_normalize_query_folds_phrasings():
+    """Test near-identical phrasings normalize to the same key"""
+    assert normalize_query("papers by year") == normalize_query("Show me papers per year!")
+    assert normalize_query("Top cited papers") != normalize_query("papers by year")
+
+@pytest.mark.asyncio
+async def test_classification_cache_memory_tier():
+    """Test memory tier hits on normalized keys"""
+    cache = ClassificationCache(maxsize=8)
+    assert await cache.get("papers by year") is None
+    
+    await cache.set("papers by year", "papers_by_year")
+    
+    assert await cache.get("Show me papers per year") == "papers_by_year"
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_classification_cache_disk_tier_survives_restart(tmp_path):
+    """Test disk tier answers after the in-memory cache is gone"""
+    path = str(tmp_path / "classifications.db")
+    cache = ClassificationCache(maxsize=8, ttl=60, path=path)
+    await cache.set("most cited papers", "top_cited")
+    
+    restarted = ClassificationCache(maxsize=8, ttl=60, path=path)
+    assert await restarted.get("most cited papers") == "top_cited"
+    assert await restarted.get("most cited papers") == "top_cited"
+    
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
@@ -0,0 +1,33 @@
+import json
+import numpy as np
+from src.utils.columnar import ColumnarResult, json_default
+from src.utils.profiling import profile_columns
+
+def test_columnar_round_trip(sample_top_cited):
+    """Test columnar results behave like the row dicts they were built from"""
+    result = ColumnarResult.from_records(sample_top_cited)
+    
+    assert len(result) == len(sample_top_cited)
+    assert result == sample_top_cited
+    assert result[0] == sample_top_cited[0]
+    assert list(result) == sample_top_cited
+    assert result.column("citation_count") == tuple(row["citation_count"] for row in sample_top_cited)
+    assert result[:2] == sample_top_cited[:2]
+    assert isinstance(result[:2], ColumnarResult)
+    assert ColumnarResult.coerce(result) is result
+
+def test_columnar_from_rows_and_arrays():
+    """Test cursor tuples transpose into columns and NULLs become NaN in arrays"""
+    result = ColumnarResult.from_rows(["year", "count"], [(2013, 5), (2014, None)])
+    
+    assert result.names == ("year", "count")
+    assert result.to_columns() == {"year": [2013, 2014], "count": [5, None]}
+    assert np.isnan(result.array("count")[1])
+    assert len(ColumnarResult.from_rows(["year"], [])) == 0
+
+def test_columnar_json_and_profile(sample_papers_by_year):
+    """Test columnar results encode as row objects and profile like row dicts"""
+    result = ColumnarResult.from_records(sample_papers_by_year)
+    
+    assert json.loads(json.dumps({"values": result}, default=json_default)) == {"values": sample_papers_by_year}
+    assert profile_columns(result) == profile_columns(sample_papers_by_year)
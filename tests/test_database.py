@@ -1,12 +1,32 @@
+import asyncio
+import os
+import sqlite3
 import pytest
+from unittest.mock import patch
 from src.utils.database import (
     get_papers_by_year,
     get_papers_by_field,
     get_top_cited_papers,
     get_papers_by_year_range,
     get_collaboration_stats,
-    execute_query
+    execute_query,
+    execute_query_columnar,
+    get_papers_by_year_range_page,
+    iter_papers_by_year_range,
+    iter_query_batches,
+    execute_query_spec,
+    get_field_names,
+    warm_page_cache,
+    PAGED_QUERIES,
+    QUERIES,
+    result_cache,
+    summary_is_fresh
 )
+from src.utils.query_spec import QuerySpec
+from src.utils.pool import ConnectionPool, PoolClosedError, ReadProfile
+from src.utils.statements import StatementRegistry
+from src.utils.summary_tables import build_summaries
+from src.utils.index_advisor import RECOMMENDED_INDEXES, advise, create_indexes, missing_indexes
 
 @pytest.mark.asyncio
 async def test_get_papers_by_year():
@@ -108,3 +128,339 @@ async def test_execute_query_with_params():
     assert len(result) == 1
     assert "count" in result[0]
 
+
+@pytest.mark.asyncio
+async def test_connection_pool_read_only(sample_database):
+    """Test pooled connections are read-only and returned after use"""
+    pool = ConnectionPool(sample_database, size=2)
+    await pool.open()
+    try:
+        async with pool.acquire() as db:
+            async with db.execute("SELECT COUNT(*) AS total FROM papers") as cursor:
+                row = await cursor.fetchone()
+            assert row["total"] == 60
+            assert pool.stats()["in_use"] == 1
+            
+            with pytest.raises(sqlite3.OperationalError):
+                await db.execute("DELETE FROM papers")
+        
+        stats = pool.stats()
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 2
+        assert stats["acquisitions"] == 1
+    finally:
+        await pool.close()
+    
+    assert not pool.is_open
+
+@pytest.mark.asyncio
+async def test_connection_pool_waiters(sample_database):
+    """Test callers queue when every connection is in use"""
+    pool = ConnectionPool(sample_database, size=1)
+    await pool.open()
+    try:
+        async def hold():
+            async with pool.acquire():
+                await asyncio.sleep(0.05)
+        
+        first = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        assert pool.stats()["waiters"] == 1
+        
+        await asyncio.gather(first, second)
+        stats = pool.stats()
+        assert stats["waiters"] == 0
+        assert stats["acquisitions"] == 2
+        assert stats["max_wait_ms"] > 0
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_connection_pool_close_under_load(sample_database):
+    """Test closing fails queued callers and leaves a lent connection usable until it is returned"""
+    pool = ConnectionPool(sample_database, size=1)
+    await pool.open()
+    release = asyncio.Event()
+    
+    async def hold():
+        async with pool.acquire() as db:
+            await release.wait()
+            async with db.execute("SELECT COUNT(*) FROM papers") as cursor:
+                return (await cursor.fetchone())[0]
+    
+    async def wait():
+        async with pool.acquire():
+            pass
+    
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(wait())
+    await asyncio.sleep(0.01)
+    await pool.close(timeout=0.05)
+    
+    with pytest.raises(PoolClosedError):
+        await waiter
+    release.set()
+    assert await holder == 60
+    assert not pool.is_open
+    assert pool.stats()["in_use"] == 0
+
+@pytest.mark.asyncio
+async def test_execute_query_uses_pool(sample_database):
+    """Test execute_query routes through the shared pool when it is open"""
+    pool = ConnectionPool(sample_database, size=1)
+    await pool.open()
+    try:
+        with patch("src.utils.database.db_pool", pool):
+            result = await execute_query("SELECT COUNT(*) AS total FROM papers")
+        assert result == [{"total": 60}]
+        assert pool.stats()["acquisitions"] == 1
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_columnar_results_match_row_dicts(sample_database):
+    """Test columnar fetches hold the same data as dict rows and share cached entries"""
+    with patch("src.utils.database.DATABASE_PATH", sample_database):
+        result = await execute_query_columnar("SELECT year, COUNT(*) AS count FROM papers GROUP BY year")
+        assert result.names == ("year", "count")
+        assert result == await execute_query("SELECT year, COUNT(*) AS count FROM papers GROUP BY year")
+        
+        columnar = await get_papers_by_year(columnar=True)
+        assert columnar == await get_papers_by_year()
+        assert await get_papers_by_year(columnar=True) is columnar
+        
+        top = await get_top_cited_papers(limit=3, columnar=True)
+        assert len(top) == 3
+        assert list(top.column("citation_count")) == sorted(top.column("citation_count"), reverse=True)
+
+@pytest.mark.asyncio
+async def test_year_range_keyset_pages(sample_database):
+    """Test keyset pages and batched iteration cover a range exactly once, NULL citations included"""
+    conn = sqlite3.connect(sample_database)
+    conn.executemany("INSERT INTO papers VALUES (?, ?, ?, NULL)", [(i, f"Uncited {i}", 2015) for i in range(200, 205)])
+    conn.commit()
+    conn.close()
+    
+    with patch("src.utils.database.DATABASE_PATH", sample_database):
+        full = await execute_query(
+            "SELECT paper_id, title, year, citation_count FROM papers WHERE year >= 2014 AND year <= 2020 "
+            "ORDER BY year, citation_count DESC, paper_id"
+        )
+        
+        pages, after = [], None
+        while True:
+            page, after = await get_papers_by_year_range_page(2014, 2020, after, limit=4)
+            pages.append(page)
+            if after is None:
+                break
+        assert [row for page in pages for row in page] == full
+        assert all(len(page) <= 4 for page in pages)
+        
+        batches = [batch async for batch in iter_papers_by_year_range(2014, 2020, batch_size=3, page_size=7)]
+        assert [row for batch in batches for row in batch] == full
+        assert max(len(batch) for batch in batches) == 3
+        
+        sizes = [len(batch) async for batch in iter_query_batches("SELECT paper_id FROM papers", batch_size=25)]
+        assert sizes == [25, 25, 15]
+
+@pytest.mark.asyncio
+async def test_streams_do_not_hold_pooled_connections(sample_database):
+    """Test a paused row stream leaves every pooled connection free for other queries"""
+    pool = ConnectionPool(sample_database, size=1)
+    await pool.open()
+    try:
+        with patch("src.utils.database.DATABASE_PATH", sample_database), patch("src.utils.database.db_pool", pool):
+            pages = iter_papers_by_year_range(2013, 2022, batch_size=5, page_size=10)
+            await pages.__anext__()
+            assert pool.stats()["in_use"] == 0
+            await pages.aclose()
+            
+            batches = iter_query_batches("SELECT paper_id FROM papers", batch_size=5)
+            await batches.__anext__()
+            assert pool.stats()["in_use"] == 0
+            assert len(await execute_query("SELECT paper_id FROM papers")) == 60
+            await batches.aclose()
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_result_cache_invalidated_on_file_change(sample_database):
+    """Test aggregate results are cached until the database file is replaced"""
+    result_cache.clear()
+    with patch("src.utils.database.DATABASE_PATH", sample_database):
+        first = await get_papers_by_year()
+        second = await get_papers_by_year()
+        assert first == second
+        assert result_cache.hits == 1
+        
+        conn = sqlite3.connect(sample_database)
+        conn.execute("INSERT INTO papers VALUES (1000, 'New', 2013, 5)")
+        conn.commit()
+        conn.close()
+        os.utime(sample_database, ns=(0, 0))
+        
+        third = await get_papers_by_year()
+    
+    assert third[0]["count"] == first[0]["count"] + 1
+    result_cache.clear()
+
+@pytest.mark.asyncio
+async def test_summary_tables_route_when_fresh(sample_database):
+    """Test aggregates read from summary tables only while they match the raw tables"""
+    result_cache.clear()
+    with patch("src.utils.database.DATABASE_PATH", sample_database):
+        raw_by_year = await get_papers_by_year()
+        raw_collab = await get_collaboration_stats()
+        assert not await summary_is_fresh("papers_by_year")
+        
+        build_summaries(sample_database)
+        assert await summary_is_fresh("papers_by_year")
+        assert await get_papers_by_year() == raw_by_year
+        assert await get_collaboration_stats() == raw_collab
+        
+        conn = sqlite3.connect(sample_database)
+        conn.execute("INSERT INTO papers VALUES (1000, 'New', 2013, 5)")
+        conn.commit()
+        conn.close()
+        os.utime(sample_database, ns=(0, 0))
+        
+        assert not await summary_is_fresh("papers_by_year")
+        assert await summary_is_fresh("papers_by_field")
+        by_year = await get_papers_by_year()
+    
+    assert by_year[0]["count"] == raw_by_year[0]["count"] + 1
+    result_cache.clear()
+
+@pytest.mark.asyncio
+async def test_summary_tables_stale_after_update(sample_database):
+    """Test UPDATEs that keep row counts, like a moved paper or a renamed field, make summaries stale"""
+    build_summaries(sample_database)
+    with patch("src.utils.database.DATABASE_PATH", sample_database):
+        assert await summary_is_fresh("papers_by_year")
+        assert await summary_is_fresh("papers_by_field")
+        
+        conn = sqlite3.connect(sample_database)
+        conn.execute("UPDATE papers SET year = year + 1 WHERE paper_id = (SELECT MIN(paper_id) FROM papers)")
+        conn.execute("UPDATE fields SET field_name = field_name || ' (renamed)' WHERE field_id = 1")
+        conn.commit()
+        conn.close()
+        os.utime(sample_database, ns=(0, 0))
+        
+        assert not await summary_is_fresh("papers_by_year")
+        assert not await summary_is_fresh("papers_by_field")
+    result_cache.clear()
+
+def test_index_advisor_flags_and_fixes_scans(sample_database):
+    """Test advisor reports full scans and that recommended indexes remove them"""
+    conn = sqlite3.connect(sample_database)
+    try:
+        before = advise(conn)
+        assert set(before) == {
+            "papers_by_year", "papers_by_field", "top_cited", "year_range", "collaboration",
+            "year_range_page", "year_range_page_after", "year_range_page_after_null"
+        }
+        assert any(issue.startswith("full scan") for issue in before["top_cited"]["issues"])
+        
+        created = create_indexes(conn)
+        assert len(created) == len(RECOMMENDED_INDEXES)
+        assert missing_indexes(conn) == []
+        
+        after = advise(conn)
+        assert after["top_cited"]["issues"] == []
+        assert after["papers_by_year"]["issues"] == []
+        for name in PAGED_QUERIES:
+            assert after[name]["issues"] == []
+            assert any("USING INDEX idx_papers_year_citation" in step for step in after[name]["plan"])
+        assert create_indexes(conn) == []
+    finally:
+        conn.close()
+
+@pytest.mark.asyncio
+async def test_query_spec_compiles_to_filtered_sql(sample_database):
+    """Test compiled specs match filtering in Python and report rows beyond the limit"""
+    conn = sqlite3.connect(sample_database)
+    papers = conn.execute("SELECT paper_id, title, year, citation_count FROM papers").fetchall()
+    robotics = {row[0] for row in conn.execute("SELECT paper_id FROM paper_fields WHERE field_id = 2")}
+    conn.close()
+    expected = sorted(
+        (row for row in papers if 2015 <= row[2] <= 2019 and row[3] >= 20 and row[0] in robotics),
+        key=lambda row: (row[2], -row[3], row[0])
+    )
+    
+    spec = QuerySpec(year_from=2015, year_to=2019, min_citations=20, fields=("Robotics",))
+    with patch("src.utils.database.DATABASE_PATH", sample_database):
+        rows, more = await execute_query_spec(spec)
+        assert [tuple(row.values()) for row in rows] == expected
+        assert more is False
+        
+        page, more = await execute_query_spec(spec, row_limit=3)
+        assert [tuple(row.values()) for row in page] == expected[:3]
+        assert more is True
+        
+        by_year, _ = await execute_query_spec(QuerySpec(group_by="year", fields=("Robotics",)))
+        assert sum(row["count"] for row in by_year) == len(robotics)
+        
+        by_field, _ = await execute_query_spec(QuerySpec(group_by="field", year_from=2020))
+        assert by_field == await execute_query(
+            "SELECT f.field_name, COUNT(DISTINCT p.paper_id) AS count FROM papers p "
+            "JOIN paper_fields pf ON pf.paper_id = p.paper_id JOIN fields f ON f.field_id = pf.field_id "
+            "WHERE p.year >= 2020 GROUP BY f.field_name ORDER BY count DESC"
+        )
+        
+        assert await get_field_names() == ["Databases", "Machine Learning", "Robotics"]
+
+@pytest.mark.asyncio
+async def test_statement_stats_estimate_cache_reuse(sample_database):
+    """Test executions are tracked per name, with prepares estimated from an LRU per connection"""
+    registry = StatementRegistry(cache_size=2)
+    registry.register("top_cited", QUERIES["top_cited"])
+    pool = ConnectionPool(sample_database, size=1, cached_statements=2)
+    await pool.open()
+    try:
+        with patch("src.utils.database.db_pool", pool), patch("src.utils.database.statements", registry):
+            for _ in range(3):
+                assert len(await get_top_cited_papers(limit=5)) == 5
+            await execute_query("SELECT 1")
+            await execute_query("SELECT 2")
+            await get_top_cited_papers(limit=5)
+        
+        stats = registry.stats()["statements"]
+        assert stats["top_cited"]["executions"] == 4
+        # Two ad-hoc statements pushed it out of the two-entry cache
+        assert stats["top_cited"]["estimated_prepares"] == 2
+        assert stats["top_cited"]["rows"] == 20
+        assert stats["adhoc"] == {**stats["adhoc"], "executions": 2, "estimated_prepares": 2}
+    finally:
+        await pool.close()
+    
+    with patch("src.utils.database.DATABASE_PATH", sample_database), patch("src.utils.database.statements", registry):
+        registry.reset()
+        await get_top_cited_papers(limit=5)
+        await get_top_cited_papers(limit=5)
+    assert registry.stats()["statements"]["top_cited"]["estimated_prepares"] == 2
+
+@pytest.mark.asyncio
+async def test_read_profile_and_warmup(sample_database):
+    """Test pooled connections get the read profile and warmup scans tables and their indexes"""
+    conn = sqlite3.connect(sample_database)
+    create_indexes(conn)
+    conn.close()
+    
+    pool = ConnectionPool(sample_database, size=1, profile=ReadProfile(cache_size_kb=1024))
+    await pool.open()
+    try:
+        settings = pool.stats()["settings"]
+        assert settings["mmap_size"] == os.path.getsize(sample_database)
+        assert settings["cache_size"] == -1024
+        assert settings["temp_store"] == 2
+        assert settings["query_only"] == 1
+        
+        with patch("src.utils.database.db_pool", pool):
+            warmed = await warm_page_cache()
+        assert {"papers", "fields", "paper_fields", "paper_author_affiliations"} <= set(warmed)
+        assert {index for index, _, _ in RECOMMENDED_INDEXES} <= set(warmed)
+    finally:
+        await pool.close()
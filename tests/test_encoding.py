@@ -0,0 +1,60 @@
+import gzip
+import pytest
+from unittest.mock import patch
+from src.utils.columnar import ColumnarResult
+from src.utils.encoding import compress, compress_stream, dumps, negotiate_encoding
+
+def test_negotiate_encoding():
+    """Test q-values, wildcards and the brotli preference on ties"""
+    pytest.importorskip("brotli")
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("br;q=0.2, gzip;q=0.8") == "gzip"
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("br;q=0, *;q=0.5") == "gzip"
+
+def test_negotiate_encoding_without_brotli():
+    """Test gzip is chosen, and br alone falls back to identity, when brotli is not installed"""
+    with patch("src.utils.encoding.brotli", None):
+        assert negotiate_encoding("gzip, deflate, br") == "gzip"
+        assert negotiate_encoding("*") == "gzip"
+        assert negotiate_encoding("br") is None
+        assert negotiate_encoding("gzip;q=0") is None
+
+def test_dumps_expands_columnar_results():
+    """Test orjson encoding writes columnar results as row objects"""
+    rows = [{"year": 2013, "count": 5}, {"year": 2014, "count": 7}]
+    assert dumps({"values": ColumnarResult.from_records(rows)}) == b'{"values":[{"year":2013,"count":5},{"year":2014,"count":7}]}'
+
+@pytest.mark.asyncio
+async def test_compress_stream_round_trip():
+    """Test streamed gzip and brotli bodies decode to the concatenated chunks"""
+    brotli = pytest.importorskip("brotli")
+    chunks = [b'{"row":%d}\\n' % i for i in range(200)]
+    
+    async def source():
+        for chunk in chunks:
+            yield chunk
+    
+    gzipped = b"".join([part async for part in compress_stream(source(), "gzip")])
+    brotlied = b"".join([part async for part in compress_stream(source(), "br")])
+    
+    assert gzip.decompress(gzipped) == b"".join(chunks)
+    assert brotli.decompress(brotlied) == b"".join(chunks)
+    assert gzip.decompress(compress(b"x" * 100, "gzip")) == b"x" * 100
+
+@pytest.mark.asyncio
+async def test_compress_stream_gzip_round_trip():
+    """Test a streamed gzip body decodes to the concatenated chunks, flushing as it goes"""
+    chunks = [b'{"row":%d}\\n' % i for i in range(200)]
+    
+    async def source():
+        for chunk in chunks:
+            yield chunk
+    
+    parts = [part async for part in compress_stream(source(), "gzip")]
+    
+    assert gzip.decompress(b"".join(parts)) == b"".join(chunks)
+    assert len(parts) > 1
+    assert [part async for part in compress_stream(source(), None)] == chunks
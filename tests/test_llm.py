@@ -0,0 +1,81 @@
+import json
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.utils.llm import LLMClientProvider
+
+def anthropic_stub(request: httpx.Request) -> httpx.Response:
+    """Minimal Anthropic Messages API response"""
+    body = json.loads(request.content)
+    return httpx.Response(200, json={
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": body["model"],
+        "content": [{"type": "text", "text": "papers_by_year"}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 12, "output_tokens": 3}
+    })
+
+@pytest.mark.asyncio
+async def test_provider_shares_model_and_client():
+    """Test models are built once and calls go through the shared HTTP client"""
+    provider = LLMClientProvider(base_url="http://stub.local", transport=httpx.MockTransport(anthropic_stub))
+    try:
+        llm = provider.get(0)
+        assert provider.get(0) is llm
+        assert provider.get(0.5) is not llm
+        
+        for _ in range(3):
+            response = await llm.ainvoke([HumanMessage(content="Classify")])
+            assert response.content == "papers_by_year"
+        
+        stats = provider.stats()
+        assert stats["calls"] == 3
+        assert stats["http_requests"] == 3
+        assert stats["in_flight"] == 0
+    finally:
+        await provider.close()
+
+@pytest.mark.asyncio
+async def test_model_sends_messages_api_request():
+    """Test message objects and dicts map onto the Messages API, with usage on the response"""
+    requests = []
+    
+    def record(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return anthropic_stub(request)
+    
+    provider = LLMClientProvider(base_url="http://stub.local", transport=httpx.MockTransport(record))
+    try:
+        response = await provider.get(0.5).ainvoke([
+            SystemMessage(content="Be terse"),
+            HumanMessage(content="Classify"),
+            {"role": "assistant", "content": "Which query?"},
+            {"role": "user", "content": "Papers by year"}
+        ])
+    finally:
+        await provider.close()
+    
+    assert requests[0]["system"] == "Be terse"
+    assert requests[0]["temperature"] == 0.5
+    assert [message["role"] for message in requests[0]["messages"]] == ["user", "assistant", "user"]
+    assert response.content == "papers_by_year"
+    assert response.usage_metadata["total_tokens"] == 15
+
+@pytest.mark.asyncio
+async def test_provider_override_factory(mock_llm_response):
+    """Test a stub factory replaces the real model"""
+    class StubModel:
+        async def ainvoke(self, messages, **kwargs):
+            return mock_llm_response("top_cited")
+    
+    provider = LLMClientProvider()
+    provider.override(lambda temperature: StubModel())
+    
+    response = await provider.get().ainvoke([HumanMessage(content="x")])
+    
+    assert response.content == "top_cited"
+    assert provider.stats()["calls"] == 1
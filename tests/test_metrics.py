@@ -0,0 +1,88 @@
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+
+from src.main import app
+from src.utils.llm import LLMClientProvider
+from src.utils.metrics import MetricsRegistry, metrics, node_seconds, sql_rows, sql_seconds, llm_seconds, llm_tokens
+from src.workflow.graph import process_query
+
+ANALYSIS_JSON = '{"summary": "Test", "key_findings": [], "viz_type": "bar", "x_field": "year", "y_field": "citation_count"}'
+
+def analysis_stub(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    return httpx.Response(200, json={
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": body["model"],
+        "content": [{"type": "text", "text": ANALYSIS_JSON}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 420, "output_tokens": 30}
+    })
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histograms render cumulative buckets, sum and count per label set"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo latency", ["node"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(3, "a")
+    
+    lines = registry.render().splitlines()
+    
+    assert lines[:2] == ["# HELP demo_seconds Demo latency", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{node="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{node="a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{node="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{node="a"} 3.55' in lines
+    assert 'demo_seconds_count{node="a"} 3' in lines
+
+def test_disabled_registry_records_nothing():
+    """Test observations are dropped while metrics are disabled"""
+    registry = MetricsRegistry(enabled=False)
+    histogram = registry.histogram("demo_seconds", "Demo latency")
+    counter = registry.counter("demo_requests", "Demo requests")
+    histogram.observe(0.5)
+    counter.inc()
+    
+    assert histogram.count() == 0
+    assert counter.value() == 0
+
+@pytest.mark.asyncio
+async def test_workflow_records_node_sql_and_llm_metrics(sample_database):
+    """Test a query records node timings, SQL rows per statement and LLM tokens per node"""
+    metrics.reset()
+    provider = LLMClientProvider(base_url="http://stub.local", transport=httpx.MockTransport(analysis_stub))
+    try:
+        with patch('src.agents.analysis_agent.get_llm', return_value=provider.get(0)), \
+             patch('src.utils.database.DATABASE_PATH', sample_database):
+            await process_query("papers from 2013 to 2022")
+    finally:
+        await provider.close()
+    
+    for node in ("filtering", "analysis", "draft_visualization", "visualization"):
+        assert node_seconds.count(node) == 1
+    assert sql_seconds.count("year_range_page", "filtering") == 1
+    assert sql_rows.total("year_range_page", "filtering") == 60
+    assert llm_seconds.count("analysis") == 1
+    assert llm_tokens.total("analysis", "input") == 420
+    assert llm_tokens.total("analysis", "output") == 30
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    """Test /metrics serves the Prometheus text format"""
+    metrics.reset()
+    node_seconds.observe(0.2, "filtering")
+    
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'sciscinet_workflow_node_seconds_count{node="filtering"} 1' in response.text
+    assert "# TYPE sciscinet_llm_tokens histogram" in response.text
@@ -0,0 +1,38 @@
+import pytest
+from src.utils.profiling import profile_columns
+
+def test_profile_numeric_columns(sample_papers_by_year):
+    """Test numeric statistics and trend slope over the year axis"""
+    profile = profile_columns(sample_papers_by_year)
+    
+    assert profile["row_count"] == 10
+    assert profile["trend_axis"] == "year"
+    count = profile["columns"]["count"]
+    assert count["type"] == "numeric"
+    assert count["min"] == 1523
+    assert count["max"] == 2687
+    assert count["sum"] == sum(row["count"] for row in sample_papers_by_year)
+    assert count["trend_slope"] > 0
+    assert "trend_slope" not in profile["columns"]["year"]
+
+def test_profile_categorical_and_text_columns():
+    """Test top-k categories for repeated values and examples for near-unique text"""
+    data = [
+        {"paper_id": i, "title": f"Paper {i}", "field_name": "ML" if i % 3 else "Robotics", "citation_count": None if i == 0 else i}
+        for i in range(30)
+    ]
+    profile = profile_columns(data, top_k=2)
+    columns = profile["columns"]
+    
+    assert profile["trend_axis"] == "row"
+    assert columns["field_name"]["type"] == "categorical"
+    assert columns["field_name"]["top"][0] == {"value": "ML", "count": 20}
+    assert columns["title"]["type"] == "text"
+    assert len(columns["title"]["examples"]) == 2
+    assert columns["citation_count"]["nulls"] == 1
+    assert columns["citation_count"]["min"] == 1
+    assert "trend_slope" not in columns["paper_id"]
+
+def test_profile_empty():
+    """Test empty results produce an empty profile"""
+    assert profile_columns([]) == {"row_count": 0, "columns": {}}
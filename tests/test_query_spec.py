@@ -0,0 +1,51 @@
+import pytest
+
+from src.utils.query_spec import CATEGORY_SPECS, QuerySpec, build_spec, clean_filters, extract_filters
+
+FIELDS = ["Machine Learning", "Robotics", "Databases"]
+
+def test_extract_filters_from_text():
+    """Test years, fields, citation floors and top-N are read from plain phrasing"""
+    assert extract_filters("2018–2020 robotics papers", FIELDS) == {
+        "year_from": 2018, "year_to": 2020, "fields": ("Robotics",)
+    }
+    assert extract_filters("machine learning and databases papers since 2019", FIELDS) == {
+        "year_from": 2019, "fields": ("Machine Learning", "Databases")
+    }
+    assert extract_filters("top 20 papers with more than 100 citations before 2016", FIELDS) == {
+        "year_to": 2015, "min_citations": 101, "limit": 20
+    }
+    assert extract_filters("papers published in 2017", FIELDS) == {"year_from": 2017, "year_to": 2017}
+    assert extract_filters("show me papers by year", FIELDS) == {}
+
+def test_extract_filters_counts_are_not_years():
+    """Test numbers read as a top-N or citation floor are not also taken for a year"""
+    assert extract_filters("top 2000 cited papers", FIELDS) == {"limit": 2000}
+    assert extract_filters("papers with more than 2015 citations", FIELDS) == {"min_citations": 2016}
+    assert extract_filters("top 2020 papers from 2019", FIELDS) == {"year_from": 2019, "limit": 2020}
+    assert extract_filters("papers in 2018 with at least 2000 citations", FIELDS) == {
+        "year_from": 2018, "year_to": 2018, "min_citations": 2000
+    }
+
+def test_clean_filters_drops_untrusted_values():
+    """Test LLM-supplied filters are validated, matched to known fields and clamped"""
+    cleaned = clean_filters({
+        "year_from": 2021, "year_to": "2018", "fields": ["robotics", "Astrology"],
+        "min_citations": -5, "limit": 10**9, "group_by": "author; DROP TABLE papers", "extra": 1
+    }, FIELDS)
+    
+    assert cleaned == {"year_from": 2018, "year_to": 2021, "fields": ("Robotics",), "min_citations": 0, "limit": 100_000}
+    assert clean_filters({"year_from": "soon"}, FIELDS) == {}
+
+def test_build_spec_layers_filters_on_category():
+    """Test filters refine the canned category spec and invalid combinations fall back to it"""
+    spec = build_spec("collaboration", {"fields": ("Robotics",)})
+    
+    assert spec.group_by == "year"
+    assert spec.metrics == ("author_count", "paper_count")
+    assert spec.fields == ("Robotics",)
+    assert build_spec("top_cited") == CATEGORY_SPECS["top_cited"]
+    assert build_spec("papers_by_year", {"year_from": 2020, "year_to": 2019}) == CATEGORY_SPECS["papers_by_year"]
+    assert QuerySpec.from_dict(spec.to_dict()) == spec
+    with pytest.raises(ValueError):
+        QuerySpec(group_by="year", metrics=("author_count", "citations"))
@@ -0,0 +1,61 @@
+import numpy as np
+from src.utils.columnar import ColumnarResult
+from src.utils.reduction import lttb, reduce_for_chart
+
+def _papers(n):
+    return ColumnarResult.from_records([
+        {"paper_id": i, "title": f"Paper {i}", "year": 2013 + i % 10, "citation_count": i % 7}
+        for i in range(n)
+    ])
+
+def test_small_results_pass_through(sample_papers_by_year):
+    """Test one-row-per-x results under the cap are returned untouched"""
+    values, meta = reduce_for_chart(sample_papers_by_year, "bar", "year", "count", max_points=50)
+    
+    assert values is sample_papers_by_year
+    assert meta == {"input_rows": 10, "output_rows": 10, "steps": []}
+
+def test_group_by_x_sums_bars_and_averages_lines():
+    """Test repeated x values are grouped, summed for bars and averaged for lines"""
+    papers = _papers(1000)
+    bars, meta = reduce_for_chart(papers, "bar", "year", "citation_count", max_points=50)
+    lines, _ = reduce_for_chart(papers, "line", "year", "citation_count", max_points=50)
+    
+    assert meta["steps"] == ["group_by"] and meta["aggregate"] == "sum"
+    assert bars.column("year") == tuple(range(2013, 2023))
+    assert sum(bars.column("citation_count")) == sum(papers.column("citation_count"))
+    assert all(isinstance(v, float) for v in lines.column("citation_count"))
+    assert abs(lines[0]["citation_count"] - np.mean(papers.column("citation_count")[::10])) < 1e-9
+
+def test_large_results_binned_downsampled_or_capped():
+    """Test numeric bars are binned, categories cut to top-k and points sampled"""
+    papers = _papers(5000)
+    binned, meta = reduce_for_chart(papers, "bar", "paper_id", "citation_count", max_points=100)
+    assert meta["steps"] == ["bin"] and meta["bin_width"] == 50
+    assert len(binned) == 100 and binned.names == ("paper_id", "paper_id_end", "citation_count")
+    assert sum(binned.column("citation_count")) == sum(papers.column("citation_count"))
+    
+    top, meta = reduce_for_chart(papers, "bar", "title", "citation_count", max_points=20)
+    assert len(top) == 20 and top[-1]["title"] == "Other" and meta["other_categories"] == 4981
+    
+    points, meta = reduce_for_chart(papers, "point", "year", "citation_count", max_points=100)
+    assert meta["steps"] == ["sample"] and len(points) == 100
+    assert points[0] == papers[0] and points[-1] == papers[-1]
+
+def test_lttb_keeps_endpoints_and_peaks():
+    """Test LTTB keeps the first and last points and preserves a spike"""
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50.0
+    kept = lttb(x, y, 200)
+    
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == 9999
+    assert 4321 in kept
+    assert np.all(np.diff(kept) > 0)
+    
+    series, meta = reduce_for_chart(
+        ColumnarResult(["paper_id", "citation_count"], [tuple(range(10_000)), tuple(y.tolist())]),
+        "line", "paper_id", "citation_count", max_points=200
+    )
+    assert meta["steps"] == ["lttb"] and len(series) == 200
@@ -0,0 +1,99 @@
+import sqlite3
+import pytest
+from unittest.mock import patch
+from src.utils import database
+from src.utils.database import QUERIES, get_papers_by_year, get_top_cited_papers, iter_papers_by_year_range
+from src.utils.replica import ColumnarReplica
+
+def replica_rows(replica, name, params=()):
+    result = replica.execute(name, params)
+    return list(result.names), list(zip(*result.columns))
+
+def test_load_keeps_awkward_titles(awkward_database, sqlite_rows):
+    """Test titles survive the bulk load, including NULLs and loader control characters"""
+    replica = ColumnarReplica.load(awkward_database)
+    _, rows = sqlite_rows(awkward_database, "SELECT paper_id, title FROM papers ORDER BY paper_id")
+    assert list(zip(replica.paper_id.tolist(), replica.titles)) == rows
+
+@pytest.mark.parametrize("name", ["papers_by_year", "collaboration"])
+def test_aggregates_match_sqlite(awkward_database, name, sqlite_rows):
+    """Test fully ordered aggregates are identical to SQLite's"""
+    replica = ColumnarReplica.load(awkward_database)
+    assert replica_rows(replica, name) == sqlite_rows(awkward_database, QUERIES[name])
+
+def test_papers_by_field_matches_sqlite(awkward_database, sqlite_rows):
+    """Test field counts merge shared names and skip NULL ids; only tied counts may reorder"""
+    replica = ColumnarReplica.load(awkward_database)
+    names, rows = replica_rows(replica, "papers_by_field")
+    expected_names, expected = sqlite_rows(awkward_database, QUERIES["papers_by_field"])
+    assert names == expected_names
+    assert sorted(rows, key=repr) == sorted(expected, key=repr)
+    assert [count for _, count in rows] == [count for _, count in expected]
+
+@pytest.mark.parametrize("limit", [0, 1, 10, 50, -1])
+def test_top_cited_matches_sqlite(awkward_database, limit, sqlite_rows):
+    """Test top-k returns the same citation sequence with rows that exist as returned"""
+    replica = ColumnarReplica.load(awkward_database)
+    names, rows = replica_rows(replica, "top_cited", (limit,))
+    expected_names, expected = sqlite_rows(awkward_database, QUERIES["top_cited"], (limit,))
+    assert names == expected_names
+    assert [row[2] for row in rows] == [row[2] for row in expected]
+    _, everything = sqlite_rows(awkward_database, "SELECT paper_id, title, citation_count, year FROM papers")
+    assert set(rows) <= set(everything)
+    assert len(set(rows)) == len(rows)
+
+@pytest.mark.parametrize("years", [(2013, 2022), (2016, 2018), (2020, 2020), (2019, 2015), (1900, 2100)])
+def test_year_range_matches_sqlite(awkward_database, years, sqlite_rows):
+    """Test year ranges hold the same rows in SQLite's (year, citations DESC) order"""
+    replica = ColumnarReplica.load(awkward_database)
+    names, rows = replica_rows(replica, "year_range", years)
+    expected_names, expected = sqlite_rows(awkward_database, QUERIES["year_range"], years)
+    assert names == expected_names
+    assert sorted(rows) == sorted(expected)
+    assert [(row[2], row[3]) for row in rows] == [(row[2], row[3]) for row in expected]
+
+@pytest.mark.asyncio
+async def test_year_range_streams_batch_by_batch(awkward_database):
+    """Test a replica year range streams in order, each batch built only when it is read"""
+    replica = ColumnarReplica.load(awkward_database)
+    with patch("src.utils.database.DATABASE_PATH", awkward_database), patch("src.utils.database.replica", replica):
+        batches = database.iter_query_batches(QUERIES["year_range"], (2014, 2021), batch_size=30)
+        first = await batches.__anext__()
+        assert len(first) == 30
+        assert replica.stats()["statements"]["year_range"]["executions"] == 1
+        rows = list(zip(*first.columns)) + [row async for batch in batches for row in zip(*batch.columns)]
+    assert rows == replica_rows(replica, "year_range", (2014, 2021))[1]
+    assert replica.stream("year_range", ("2014", 2021), 30) is None
+
+@pytest.mark.asyncio
+async def test_keyset_pages_match_sqlite(awkward_database):
+    """Test every keyset page, including cursors on NULL citation counts, matches SQLite exactly"""
+    with patch("src.utils.database.DATABASE_PATH", awkward_database):
+        from_sqlite = [row async for batch in iter_papers_by_year_range(2014, 2021, page_size=37) for row in batch]
+        with patch("src.utils.database.replica", ColumnarReplica.load(awkward_database)) as replica:
+            from_replica = [row async for batch in iter_papers_by_year_range(2014, 2021, page_size=37) for row in batch]
+            assert replica.stats()["statements"]["year_range_page"]["executions"] > 1
+    assert from_replica == from_sqlite
+
+@pytest.mark.asyncio
+async def test_helpers_use_replica_and_fall_back(awkward_database, sqlite_rows):
+    """Test helpers answer from the replica, and go to SQLite for unknown SQL or a changed file"""
+    replica = ColumnarReplica.load(awkward_database)
+    with patch("src.utils.database.DATABASE_PATH", awkward_database), patch("src.utils.database.replica", replica):
+        assert await get_papers_by_year() == [
+            dict(zip(*[("year", "count"), row])) for row in sqlite_rows(awkward_database, QUERIES["papers_by_year"])[1]
+        ]
+        assert len(await get_top_cited_papers(limit=5)) == 5
+        assert await database.execute_query("SELECT COUNT(*) AS n FROM papers") == [{"n": 800}]
+        assert replica.stats()["statements"].keys() == {"papers_by_year", "top_cited"}
+
+        conn = sqlite3.connect(awkward_database)
+        conn.execute("DELETE FROM papers WHERE year IS NULL")
+        conn.commit()
+        conn.close()
+        database.result_cache.clear()
+        assert database.get_replica_stats()["stale"] is True
+        assert await get_papers_by_year() == [
+            dict(zip(*[("year", "count"), row])) for row in sqlite_rows(awkward_database, QUERIES["papers_by_year"])[1]
+        ]
+        assert replica.stats()["statements"]["papers_by_year"]["executions"] == 1
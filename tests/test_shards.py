@@ -0,0 +1,171 @@
+import json
+import sqlite3
+import pytest
+from unittest.mock import patch
+from src.utils import database
+from src.utils.cache import file_fingerprint
+from src.utils.database import QUERIES, get_collaboration_stats, get_papers_by_year, iter_papers_by_year_range
+from src.utils.shards import Shard, ShardCatalog, write_shard
+
+YEAR_SHARDS = [("early", None, 2015), ("middle", 2016, 2018), ("late", 2019, None)]
+
+@pytest.fixture
+def year_catalog(awkward_database, tmp_path):
+    """The awkward database split into year-range shards, NULL years and dangling links in the first"""
+    shards = []
+    for index, (name, year_from, year_to) in enumerate(YEAR_SHARDS):
+        path = str(tmp_path / f"{name}.db")
+        if index == 0:
+            write_shard(awkward_database, path, "year IS NULL OR year <= ?", (year_to,), orphans=True)
+        elif year_to is None:
+            write_shard(awkward_database, path, "year >= ?", (year_from,))
+        else:
+            write_shard(awkward_database, path, "year BETWEEN ? AND ?", (year_from, year_to))
+        shards.append(Shard(name, path, year_from=year_from, year_to=year_to))
+    return ShardCatalog(shards)
+
+@pytest.fixture
+def institution_catalog(awkward_database, tmp_path):
+    """Shards per affiliation group; papers co-authored across groups live in several shards"""
+    conn = sqlite3.connect(awkward_database)
+    conn.execute("UPDATE paper_author_affiliations SET affiliation_id = author_id % 3")
+    conn.commit()
+    conn.close()
+    where = "paper_id IN (SELECT paper_id FROM source.paper_author_affiliations WHERE affiliation_id = ?)"
+    # Papers without an affiliated author go to the first shard
+    unaffiliated = " OR paper_id NOT IN (SELECT paper_id FROM source.paper_author_affiliations WHERE affiliation_id IS NOT NULL)"
+    shards = []
+    for group in range(3):
+        path = str(tmp_path / f"inst{group}.db")
+        write_shard(awkward_database, path, where + (unaffiliated if group == 0 else ""), (group,), orphans=group == 0)
+        shards.append(Shard(f"inst{group}", path, institution=str(group)))
+    return ShardCatalog(shards, overlapping_papers=True)
+
+async def sharded_rows(catalog, name, params=()):
+    result = await catalog.execute(name, QUERIES[name], params)
+    return list(result.names), list(zip(*result.columns))
+
+def test_route_by_year():
+    """Test shards without a bound match every year, whatever institution they hold"""
+    catalog = ShardCatalog([
+        Shard("a", "a.db", institution="VT", year_from=2013, year_to=2017),
+        Shard("b", "b.db", institution="VT", year_from=2018),
+        Shard("c", "c.db", institution="MIT"),
+    ])
+    assert [shard.name for shard in catalog.route(2019, 2020)] == ["b", "c"]
+    assert [shard.name for shard in catalog.route(2015, 2015)] == ["a", "c"]
+    assert [shard.name for shard in catalog.route(2019, 2015)] == ["c"]
+
+@pytest.mark.asyncio
+async def test_year_shards_match_single_database(awkward_database, year_catalog, sqlite_rows):
+    """Test every canned statement merged across disjoint shards is what SQLite returns for the whole file"""
+    await year_catalog.open(database._fetch_columnar)
+    try:
+        for name in ("papers_by_year", "collaboration"):
+            assert await sharded_rows(year_catalog, name) == sqlite_rows(awkward_database, QUERIES[name])
+        names, rows = await sharded_rows(year_catalog, "papers_by_field")
+        expected_names, expected = sqlite_rows(awkward_database, QUERIES["papers_by_field"])
+        assert names == expected_names
+        assert sorted(rows, key=repr) == sorted(expected, key=repr)
+        assert [count for _, count in rows] == [count for _, count in expected]
+        for limit in (0, 10, 50, -1):
+            _, rows = await sharded_rows(year_catalog, "top_cited", (limit,))
+            _, expected = sqlite_rows(awkward_database, QUERIES["top_cited"], (limit,))
+            assert [row[2] for row in rows] == [row[2] for row in expected]
+        for years in ((2013, 2022), (2016, 2018), (2019, 2015)):
+            _, rows = await sharded_rows(year_catalog, "year_range", years)
+            _, expected = sqlite_rows(awkward_database, QUERIES["year_range"], years)
+            assert sorted(rows) == sorted(expected)
+            assert [(row[2], row[3]) for row in rows] == [(row[2], row[3]) for row in expected]
+        assert year_catalog.stats()["recounted_keys"] == 0
+    finally:
+        await year_catalog.close()
+
+@pytest.mark.asyncio
+async def test_year_range_touches_relevant_shards_only(year_catalog):
+    """Test a range inside one shard's years is not sent to the others"""
+    await year_catalog.open(database._fetch_columnar)
+    try:
+        await sharded_rows(year_catalog, "year_range", (2016, 2017))
+        queries = {name: shard["queries"] for name, shard in year_catalog.stats()["shards"].items()}
+        assert queries == {"early": 0, "middle": 1, "late": 0}
+    finally:
+        await year_catalog.close()
+
+@pytest.mark.asyncio
+async def test_overlapping_shards_dedupe_and_recount(awkward_database, institution_catalog, sqlite_rows):
+    """Test shared papers and authors are counted once, so distinct counts match the single file"""
+    await institution_catalog.open(database._fetch_columnar)
+    try:
+        assert await sharded_rows(institution_catalog, "collaboration") == sqlite_rows(awkward_database, QUERIES["collaboration"])
+        assert await sharded_rows(institution_catalog, "papers_by_year") == sqlite_rows(awkward_database, QUERIES["papers_by_year"])
+        _, rows = await sharded_rows(institution_catalog, "papers_by_field")
+        _, expected = sqlite_rows(awkward_database, QUERIES["papers_by_field"])
+        assert dict(rows) == dict(expected)
+        assert institution_catalog.stats()["recounted_keys"] > 0
+        _, rows = await sharded_rows(institution_catalog, "top_cited", (25,))
+        _, expected = sqlite_rows(awkward_database, QUERIES["top_cited"], (25,))
+        assert [row[2] for row in rows] == [row[2] for row in expected]
+        assert len({row[0] for row in rows}) == 25
+        _, rows = await sharded_rows(institution_catalog, "year_range", (2014, 2019))
+        _, expected = sqlite_rows(awkward_database, QUERIES["year_range"], (2014, 2019))
+        assert sorted(rows) == sorted(expected)
+    finally:
+        await institution_catalog.close()
+
+async def streamed_rows(catalog, name, params, batch_size=7):
+    batches = [
+        batch async for batch in catalog.stream(name, QUERIES[name], params, database._read_connection, batch_size)
+    ]
+    assert all(len(batch) == batch_size for batch in batches[:-1])
+    return [row for batch in batches for row in zip(*batch.columns)]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("catalog", ["year_catalog", "institution_catalog"])
+async def test_streams_merge_shard_cursors(awkward_database, catalog, request, sqlite_rows):
+    """Test ordered statements stream from one cursor per shard in order, deduplicated and limited"""
+    catalog = request.getfixturevalue(catalog)
+    rows = await streamed_rows(catalog, "year_range", (2013, 2022))
+    _, expected = sqlite_rows(awkward_database, QUERIES["year_range"], (2013, 2022))
+    assert sorted(rows) == sorted(expected)
+    assert [(row[2], row[3]) for row in rows] == [(row[2], row[3]) for row in expected]
+    for limit in (0, 25, -1):
+        rows = await streamed_rows(catalog, "top_cited", (limit,))
+        _, expected = sqlite_rows(awkward_database, QUERIES["top_cited"], (limit,))
+        assert [row[2] for row in rows] == [row[2] for row in expected]
+        assert len({row[0] for row in rows}) == len(rows)
+
+@pytest.mark.asyncio
+async def test_helpers_fan_out_from_catalog_file(awkward_database, year_catalog, tmp_path, sqlite_rows):
+    """Test the database helpers answer from a catalog file, keyset pages included, beside the database file"""
+    catalog_path = tmp_path / "catalog.json"
+    catalog_path.write_text(json.dumps({"shards": [
+        {"name": shard.name, "path": shard.path.rsplit("/", 1)[1], "year_from": shard.year_from, "year_to": shard.year_to}
+        for shard in year_catalog.shards
+    ]}))
+    with patch("src.utils.database.DATABASE_PATH", awkward_database):
+        from_sqlite = [row async for batch in iter_papers_by_year_range(2014, 2021, page_size=37) for row in batch]
+    with patch("src.utils.database.DATABASE_PATH", str(tmp_path / "missing.db")):
+        await database.open_shard_catalog(str(catalog_path))
+        assert database.get_shard_stats() == {"configured": False}
+    with patch("src.utils.database.DATABASE_PATH", awkward_database):
+        await database.open_shard_catalog(str(catalog_path))
+        try:
+            database.result_cache.clear()
+            assert await get_papers_by_year() == [
+                dict(zip(*[("year", "count"), row])) for row in sqlite_rows(awkward_database, QUERIES["papers_by_year"])[1]
+            ]
+            assert len(await get_collaboration_stats()) == 10
+            assert await database.get_field_names() == [None, "Databases", "Graphics", "Robotics", "Unused"]
+            from_shards = [row async for batch in iter_papers_by_year_range(2014, 2021, page_size=37) for row in batch]
+            assert from_shards == from_sqlite
+            streamed = [
+                row async for batch in database.iter_query_batches(QUERIES["year_range"], (2014, 2021), batch_size=11)
+                for row in zip(*batch.columns)
+            ]
+            assert sorted(streamed) == sorted(sqlite_rows(awkward_database, QUERIES["year_range"], (2014, 2021))[1])
+            assert database.get_shard_stats()["fan_outs"] > 4
+            assert database.database_fingerprint() == (file_fingerprint(awkward_database), year_catalog.fingerprint())
+        finally:
+            await database.close_db_pool()
+    assert database.get_shard_stats() == {"configured": False}
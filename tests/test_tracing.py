@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+
+from src.utils.tracing import current_trace, set_flag, span, start_trace
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_tasks():
+    """Test spans opened in child tasks join the request's trace under their parent"""
+    async def child(name):
+        with span(name):
+            await asyncio.sleep(0.01)
+    
+    with start_trace() as trace:
+        with span("workflow"):
+            await asyncio.gather(child("analysis"), child("draft_visualization"))
+        set_flag("result_cache", "hit")
+    
+    timings = trace.timings()
+    assert set(timings["stages"]) == {"workflow", "analysis", "draft_visualization"}
+    assert timings["stages"]["analysis"] >= 10
+    assert timings["stages"]["workflow"] >= timings["stages"]["analysis"]
+    assert timings["cache"] == {"result_cache": "hit"}
+    parents = {item["name"]: item["parent"] for item in timings["spans"]}
+    assert parents == {"workflow": None, "analysis": "workflow", "draft_visualization": "workflow"}
+    assert current_trace.get() is None
+
+def test_disabled_trace_records_nothing():
+    """Test spans and flags are no-ops outside a trace"""
+    with start_trace(enabled=False) as trace:
+        with span("workflow"):
+            set_flag("result_cache", "miss")
+    
+    assert trace is None
+    assert current_trace.get() is None